@@ -17,10 +17,14 @@
 import os
 import sys
 import logging
+import shutil
 import subprocess
+import tempfile
+import time
 import ast
 import json
 import re
+from arsenalclient.native_facts import collect_native_facts
 try:
     import libvirt
 
@@ -37,6 +41,27 @@ except ImportError:
 
 LOG = logging.getLogger(__name__)
 
+# Fact providers that can be selected with the fact_provider setting.
+FACT_PROVIDERS = {
+    'facter': '_facter',
+    'native': '_native',
+}
+
+# Seconds each group of facts is kept in the fact cache. Groups that aren't
+# listed, or are 0, are collected on every run. The whole cache is discarded
+# when the host reboots.
+FACT_CACHE_TTLS = {
+    'data_center': 86400,
+    'ec2': 86400,
+    'guest_vms': 300,
+    'hardware': 86400,
+    'memory': 86400,
+    'os': 3600,
+    'processors': 86400,
+}
+
+BOOT_ID_PATH = '/proc/sys/kernel/random/boot_id'
+
 
 class ArsenalFacts(object):
     '''The Arsenal Facts class.
@@ -48,9 +73,23 @@ class ArsenalFacts(object):
       >>> my_facts.resolve()
       >>> print my_facts.facts['uptime']
       20:43 hours
+
+    provider  : The method that collects the facts, '_native' by default.
+        '_facter' collects every fact from facter instead.
+    cache_file: A json file to cache facts that rarely change in between
+        runs. Facts aren't cached if not set.
+    cache_ttls: A dict of fact group to the seconds it is cached for.
+        Defaults to FACT_CACHE_TTLS.
     '''
 
-    def __init__(self):
+    def __init__(self, provider='_native', cache_file=None, cache_ttls=None):
+
+        self.provider = provider
+        self.cache_file = cache_file
+        self.cache_ttls = FACT_CACHE_TTLS if cache_ttls is None else cache_ttls
+        # Groups of facts that were loaded from the cache, and that the
+        # provider doesn't need to collect.
+        self.cached_groups = set()
 
         self.facts = {
             'uptime': None,
@@ -75,6 +114,7 @@ class ArsenalFacts(object):
                 'virtual': None,
                 'is_virtual': None,
                 'serial_number': 'UNKNOWN',
+                'uuid': None,
             },
             'networking': {
                 'fqdn': None,
@@ -101,14 +141,28 @@ class ArsenalFacts(object):
         }
         self.facts_resolved = False
 
-    def resolve(self, provider='_facter'):
+    def resolve(self, provider=None):
         '''Resolve all Arsenal facts to their final values. Allows for swapping out
         facter for another fact collector of your choosing. Each fact collector must
         provide values for all of the facts defined in __init__ in order to
-        function correctly.'''
+        function correctly. Defaults to the provider given to __init__.
+
+        Groups of facts still within their TTL in the cache file are taken
+        from the cache instead.'''
 
         if not self.facts_resolved:
+            provider = provider or self.provider
+            now = time.time()
+            cache = self._load_cache(provider)
+            self.cached_groups = set([group for group, entry in cache.items() if
+                                      now - entry['collected'] < self.cache_ttls.get(group, 0)])
+            LOG.debug('Facts from cache: {0}'.format(sorted(self.cached_groups)))
+
             getattr(self, provider)()
+
+            for group in self.cached_groups:
+                self.facts[group] = cache[group]['facts']
+            self._save_cache(provider, cache, now)
             LOG.debug(json.dumps(self.facts, indent=2, sort_keys=True))
             LOG.debug('Setting facts_resolved = True.')
             self.facts_resolved = True
@@ -119,12 +173,7 @@ class ArsenalFacts(object):
         '''Reads in facts from facter and stores them in a dict.'''
 
         LOG.debug('Gathering facts...')
-        if os.path.isfile('/opt/puppetlabs/bin/facter'):
-            facter_bin = '/opt/puppetlabs/bin/facter'
-            facter_style = 'modern'
-        else:
-            facter_bin = 'facter'
-            facter_style = 'legacy'
+        facter_bin, facter_style = self._find_facter()
 
         LOG.debug('Using {0} facts...'.format(facter_style))
 
@@ -154,6 +203,109 @@ class ArsenalFacts(object):
 
         LOG.debug('Gathering facts complete.')
 
+    @staticmethod
+    def _get_boot_id():
+        '''Return the id of the current boot, or None.'''
+
+        try:
+            with open(BOOT_ID_PATH, 'r') as boot_id:
+                return boot_id.read().strip()
+        except (IOError, OSError):
+            return None
+
+    def _load_cache(self, provider):
+        '''Return the cached fact groups, a dict of group to a dict with the
+        time it was collected and its facts. Returns an empty dict if there is
+        no cache, or it is from another boot or provider.'''
+
+        if not self.cache_file:
+            return {}
+
+        try:
+            with open(self.cache_file, 'r') as cache_file:
+                cache = json.load(cache_file)
+        except (IOError, OSError, ValueError) as ex:
+            LOG.debug('Unable to read fact cache: {0}'.format(repr(ex)))
+            return {}
+
+        boot_id = self._get_boot_id()
+        if not boot_id or cache.get('boot_id') != boot_id:
+            LOG.debug('Host has rebooted, discarding fact cache.')
+            return {}
+        if cache.get('provider') != provider:
+            LOG.debug('Fact cache is from another provider, discarding it.')
+            return {}
+
+        return cache.get('groups', {})
+
+    @staticmethod
+    def _has_values(val):
+        '''Return True if a fact group has any value set. Empty groups, e.g.
+        ec2 facts that failed to collect, aren't cached.'''
+
+        if isinstance(val, dict):
+            return any(ArsenalFacts._has_values(sub_val) for sub_val in val.values())
+        return bool(val) and val != 'UNKNOWN'
+
+    def _save_cache(self, provider, cache, now):
+        '''Write the cached groups and the newly collected groups with a TTL to
+        the cache file. Failing to write the cache is not fatal.'''
+
+        if not self.cache_file:
+            return
+
+        boot_id = self._get_boot_id()
+        if not boot_id:
+            return
+
+        groups = dict((group, cache[group]) for group in self.cached_groups)
+        for group, ttl in self.cache_ttls.items():
+            if ttl and group not in groups and self._has_values(self.facts.get(group)):
+                groups[group] = {
+                    'collected': now,
+                    'facts': self.facts[group],
+                }
+
+        cache_dir = os.path.dirname(os.path.abspath(self.cache_file))
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            # Write to a temp file and rename it so a concurrent run never
+            # reads a partial cache.
+            fd, tmp_file = tempfile.mkstemp(dir=cache_dir, prefix='.facts')
+            with os.fdopen(fd, 'w') as cache_file:
+                json.dump({
+                    'boot_id': boot_id,
+                    'provider': provider,
+                    'groups': groups,
+                }, cache_file, indent=2, sort_keys=True)
+            os.rename(tmp_file, self.cache_file)
+        except (IOError, OSError) as ex:
+            LOG.debug('Unable to write fact cache: {0}'.format(repr(ex)))
+
+    @staticmethod
+    def _find_facter():
+        '''Return the path to facter and the style of facts it reports.'''
+
+        if os.path.isfile('/opt/puppetlabs/bin/facter'):
+            return '/opt/puppetlabs/bin/facter', 'modern'
+        return 'facter', 'legacy'
+
+    def _native(self):
+        '''Reads in facts from /proc, /sys and the ec2 metadata endpoint without
+        running facter. facter is only asked for the site specific facts it
+        alone can provide, if it is installed.'''
+
+        LOG.debug('Gathering native facts...')
+        facter_bin, _ = self._find_facter()
+        facter_bin = shutil.which(facter_bin)
+
+        resp = collect_native_facts(facter_bin=facter_bin,
+                                    skip=self.cached_groups)
+        self._map_facter_modern(resp)
+
+        LOG.debug('Gathering facts complete.')
+
     def _map_facter_modern(self, resp):
         '''Map modern facter facts to arsenal facts for later use in the client
         code.'''
@@ -183,6 +335,10 @@ class ArsenalFacts(object):
             self.facts['hardware']['serial_number'] = resp['dmi']['product']['serial_number'].upper()
         except KeyError:
             LOG.warn('Unable to determine serial number.')
+        try:
+            self.facts['hardware']['uuid'] = resp['dmi']['product']['uuid'].upper()
+        except KeyError:
+            LOG.debug('Unable to determine system uuid.')
         self.facts['networking']['fqdn'] = resp['networking']['fqdn']
         self.facts['networking']['mac_address'] = resp['networking']['mac']
         try:
@@ -230,6 +386,10 @@ class ArsenalFacts(object):
         unique_id: The unique_id of the guest vm.
         '''
 
+        if 'guest_vms' in self.cached_groups:
+            LOG.debug('Guest vms are cached, skipping.')
+            return
+
         # Potential to add other hypervisor types later.
         if 'libvirt' in sys.modules:
             self._map_libvirt_guests()
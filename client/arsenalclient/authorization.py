@@ -68,6 +68,9 @@ class Authorization(object):
             user_password: A string that is the user's password.
             verify_ssl   : Whether or not to verify the ssl connection to the Arsenal
                 server. Defaults to True.
+            session      : A requests.Session to authenticate with. Pass the
+                session the API calls are made with to share its connection
+                pool. A new one is created if not given.
     '''
 
     def __init__(self,
@@ -77,8 +80,11 @@ class Authorization(object):
                  **kwargs
                 ):
 
-        self.session = requests.session()
+        self.session = kwargs.get('session') or requests.session()
         self.cookies = None
+        # The cookie file self.cookies was read from or written to. Used to
+        # only read the cookie file once.
+        self.cookies_source = None
         self.api_protocol = api_protocol
         self.api_host = api_host
         self.cookie_file = kwargs.get('cookie_file')
@@ -88,18 +94,25 @@ class Authorization(object):
 
     def get_cookie_auth(self):
         '''Gets cookies from cookie file or authenticates if no cookie file is
-        present.
+        present. Once read, the cookies are kept in memory and the cookie file
+        is not read again unless cookie_file changes.
 
         Returns:
             A dict of all cookies if successful, raises an exception otherwise.
         '''
 
+        if self.cookies and self.cookies_source == self.cookie_file:
+            LOG.debug('Using cached cookies from: {0}'.format(self.cookie_file))
+            return
+
         try:
+            self.cookies = None
             self.read_cookie()
             if not self.cookies:
                 self.authenticate()
             else:
                 self.cookies = ast.literal_eval(self.cookies)
+                self.cookies_source = self.cookie_file
 
         except Exception as ex:
             LOG.error('Failed to evaluate cookies: {0}'.format(repr(ex)))
@@ -180,6 +193,7 @@ class Authorization(object):
                 LOG.debug('Authentication successful for user: {0}'.format(self.user_login))
 
                 self.cookies = self.session.cookies.get_dict()
+                self.cookies_source = self.cookie_file
                 try:
                     self.write_cookie(self.cookies)
                 except Exception as ex:
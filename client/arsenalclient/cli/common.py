@@ -470,6 +470,41 @@ def print_results(args, results, default_key='name', first_keys=None):
                                                        audit['new_value'],
                                                        width_new,))
 
+def stream_json_results(args, interface, params):
+    '''Search with interface.iter_search() and print the results as a json
+    list as each page arrives, instead of after the whole search is done. The
+    output is the same as print_results() with --json, apart from ordering.
+
+    Params:
+        args     : arsenal.client args namespace object.
+        interface: The client interface to search, e.g. client.nodes.
+        params   : The search parameters from parse_cli_args().
+
+    Returns:
+        True if the results were printed, False if args asks for output that
+        can't be streamed and the caller should use print_results().
+    '''
+
+    if not args.json or args.audit_history:
+        return False
+
+    count = 0
+    for result in interface.iter_search(params):
+        dump = json.dumps(result, indent=2, sort_keys=True)
+        dump = '\n'.join('  {0}'.format(line) for line in dump.splitlines())
+        sys.stdout.write('{0}\n{1}'.format(',' if count else '[', dump))
+        count += 1
+        if count % 100 == 0:
+            sys.stdout.flush()
+
+    if count:
+        sys.stdout.write('\n]\n')
+        sys.stdout.flush()
+    else:
+        LOG.info('No results found for search.')
+
+    return True
+
 def parse_cli_args(search=None, fields=None, exact_get=None, exclude=None):
     '''Parses comma separated argument values passed from the CLI and turns them
     into a dictionary of parameters for the search() function.
@@ -27,6 +27,7 @@ from arsenalclient.cli.common import (
     check_resp,
     parse_cli_args,
     print_results,
+    stream_json_results,
     )
 from arsenalclient.exceptions import NoResultFound
 
@@ -55,6 +56,10 @@ def search_data_centers(args, client):
         search_fields = 'all'
 
     params = parse_cli_args(args.search, search_fields, args.exact_get, args.exclude)
+    if not any(getattr(args, key) for key in action_fields) and \
+            stream_json_results(args, client.data_centers, params):
+        LOG.debug('Complete.')
+        return None
     resp = client.data_centers.search(params)
 
     if not resp.get('results'):
@@ -26,6 +26,7 @@ from arsenalclient.cli.common import (
     check_resp,
     parse_cli_args,
     print_results,
+    stream_json_results,
     )
 
 LOG = logging.getLogger(__name__)
@@ -43,6 +44,10 @@ def search_ip_addresses(args, client):
         search_fields = 'all'
 
     params = parse_cli_args(args.search, search_fields, args.exact_get, args.exclude)
+    if not any(getattr(args, key) for key in update_fields) and \
+            stream_json_results(args, client.ip_addresses, params):
+        LOG.debug('Complete.')
+        return None
     resp = client.ip_addresses.search(params)
 
     if not resp.get('results'):
@@ -29,6 +29,7 @@ from arsenalclient.cli.common import (
     check_resp,
     parse_cli_args,
     print_results,
+    stream_json_results,
     )
 from arsenalclient.authorization import check_root
 from arsenalclient.version import __version__
@@ -205,7 +206,19 @@ def search_nodes(args, client):
         else:
             args.fields = 'tags'
 
+    actions = any((args.set_tags,
+                   args.del_tags,
+                   args.set_status,
+                   args.set_node_groups,
+                   args.del_node_groups,
+                   args.del_all_tags,
+                   args.del_all_node_groups,
+                   args.del_all_guest_vms,))
+
     params = parse_cli_args(args.search, args.fields, args.exact_get, args.exclude)
+    if not actions and stream_json_results(args, client.nodes, params):
+        LOG.debug('Complete.')
+        return None
     resp = client.nodes.search(params)
 
     if not resp.get('results'):
@@ -214,14 +227,7 @@ def search_nodes(args, client):
     results = resp['results']
 
     # Allows for multiple actions to be performed at once.
-    if not any((args.set_tags,
-                args.del_tags,
-                args.set_status,
-                args.set_node_groups,
-                args.del_node_groups,
-                args.del_all_tags,
-                args.del_all_node_groups,
-                args.del_all_guest_vms,)):
+    if not actions:
 
         first_keys = [
             'name',
@@ -27,6 +27,7 @@ from arsenalclient.cli.common import (
     check_resp,
     parse_cli_args,
     print_results,
+    stream_json_results,
     update_object_fields,
     )
 from arsenalclient.exceptions import NoResultFound
@@ -60,6 +61,10 @@ def search_node_groups(args, client):
         search_fields = 'all'
 
     params = parse_cli_args(args.search, search_fields, args.exact_get, args.exclude)
+    if not any(getattr(args, key) for key in action_fields) and \
+            stream_json_results(args, client.node_groups, params):
+        LOG.debug('Complete.')
+        return None
     resp = client.node_groups.search(params)
 
     if not resp.get('results'):
@@ -28,6 +28,7 @@ from arsenalclient.cli.common import (
     check_resp,
     parse_cli_args,
     print_results,
+    stream_json_results,
     update_object_fields,
     )
 
@@ -51,6 +52,10 @@ def search_statuses(args, client):
         search_fields = 'all'
 
     params = parse_cli_args(args.search, search_fields, args.exact_get, args.exclude)
+    if not any(getattr(args, key) for key in update_fields) and \
+            stream_json_results(args, client.statuses, params):
+        LOG.debug('Complete.')
+        return None
     resp = client.statuses.search(params)
 
     if not resp.get('results'):
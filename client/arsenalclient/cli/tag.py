@@ -27,6 +27,7 @@ from arsenalclient.cli.common import (
     check_resp,
     parse_cli_args,
     print_results,
+    stream_json_results,
     )
 
 LOG = logging.getLogger(__name__)
@@ -41,6 +42,9 @@ def search_tags(args, client):
     resp = None
 
     params = parse_cli_args(args.search, args.fields, args.exact_get, args.exclude)
+    if not args.set_tags and stream_json_results(args, client.tags, params):
+        LOG.debug('Complete.')
+        return None
     resp = client.tags.search(params)
 
     if not resp.get('results'):
@@ -36,6 +36,7 @@ from arsenalclient.interface.physical_locations import PhysicalLocations
 from arsenalclient.interface.physical_racks import PhysicalRacks
 from arsenalclient.interface.statuses import Statuses
 from arsenalclient.interface.tags import Tags
+from arsenalclient.transport import Transport
 
 # Log handling
 try:
@@ -108,7 +109,6 @@ class Client(object):
         self.conf_file = conf_file
         self.secret_conf_file = secret_conf_file
         self.args = args
-        self.session = requests.session()
         self.init_log_lines = []
 
         self.settings = Namespace()
@@ -118,6 +118,10 @@ class Client(object):
         self.settings.cookie_file = None
         self.settings.log_file = None
         self.settings.log_level = None
+        self.settings.max_retries = None
+        self.settings.pool_connections = None
+        self.settings.pool_maxsize = None
+        self.settings.retry_backoff_factor = None
         self.settings.user_login = None
         self.settings.user_password = None
         self.settings.verify_ssl = None
@@ -126,8 +130,13 @@ class Client(object):
         self.init_logging()
         self.login_overrides()
 
+        # One connection pool and auth cookie for every interface.
+        self.transport = Transport(self.settings)
+        self.session = self.transport.session
+
         kwargs = {
             'settings': self.settings,
+            'transport': self.transport,
         }
 
         self.data_centers = DataCenters(**kwargs)
@@ -17,11 +17,12 @@
 import logging
 import json
 from abc import ABCMeta
+from concurrent.futures import ThreadPoolExecutor
 from abc import abstractmethod
 
 import requests
 from arsenalclient.exceptions import NoResultFound
-from arsenalclient.authorization import Authorization
+from arsenalclient.transport import Transport
 
 LOG = logging.getLogger(__name__)
 
@@ -36,6 +37,11 @@ def verbose(self, message, *args, **kws):
         self._log(logging.VERBOSE, message, args, **kws)
 logging.Logger.verbose = verbose
 
+# Number of results iter_search() asks for per request.
+DEFAULT_PAGE_SIZE = 500
+# Number of objects get_audit_history() asks for the history of per request.
+AUDIT_CHUNK_SIZE = 200
+
 
 class ArsenalInterface(object):
     '''The arsenal client interface.
@@ -51,16 +57,14 @@ class ArsenalInterface(object):
 
         self.uri = None
 
-        self.session = requests.session()
         self.cookies = None
 
         self.settings = kwargs['settings']
-        self.authorization = Authorization(api_host=self.settings.api_host,
-                                           api_protocol=self.settings.api_protocol,
-                                           cookie_file=self.settings.cookie_file,
-                                           user_login=self.settings.user_login,
-                                           user_password=self.settings.user_password,
-                                           verify_ssl=self.settings.verify_ssl)
+        # Interfaces created by the same Client share one transport, and with
+        # it the connection pool and the cached auth cookie.
+        self.transport = kwargs.get('transport') or Transport(self.settings)
+        self.session = self.transport.session
+        self.authorization = self.transport.authorization
 
     @staticmethod
     def check_response_codes(resp, log_success=True):
@@ -95,7 +99,8 @@ class ArsenalInterface(object):
                                        resp.reason))
             return my_resp
 
-    def api_conn(self, uri, data=None, method='get', log_success=True):
+    def api_conn(self, uri, data=None, method='get', log_success=True,
+                 extra_headers=None):
         ''' Manages http requests to the API.
 
         Usage:
@@ -121,12 +126,16 @@ class ArsenalInterface(object):
                 delete
                 get
                 put
+            extra_headers (dict): Additional http headers to send with put
+                and delete requests.
 
         Returns:
             check_response_codes()
         '''
 
         headers = {'content-type': 'application/json'}
+        if extra_headers:
+            headers.update(extra_headers)
 
         api_url = '{0}://{1}{2}'.format(self.settings.api_protocol,
                                         self.settings.api_host,
@@ -228,6 +237,65 @@ class ArsenalInterface(object):
 
         return resp
 
+    def iter_search(self, params=None, page_size=DEFAULT_PAGE_SIZE, prefetch=True):
+        '''Search for objects in the API, one page at a time. Yields each
+        result as a dict, so only about two pages are ever held in memory
+        however many objects match.
+
+        Usage:
+
+        >>> for node in client.nodes.iter_search({'status': 'inservice'}):
+        ...     print(node['name'])
+
+        Args:
+
+        params (dict): a dictionary of url parameters for the request.
+        page_size (int): The number of results to ask for per request.
+        prefetch (bool): Fetch the next page on a background thread while
+            the current one is being consumed.
+
+        Raises:
+
+        RuntimeError if the API returns an error part way through.
+        '''
+
+        LOG.verbose('Iterating over {0} {1} at a time...'.format(self.uri.split('/')[-1],
+                                                                 page_size))
+
+        params = dict(params or {})
+        params['perpage'] = page_size
+        # The total is not needed to page through the results, and counting
+        # is a full scan on the server.
+        params['count'] = 'false'
+
+        def fetch(after):
+            page_params = dict(params)
+            if after:
+                page_params['after'] = after
+            return self.api_conn(self.uri, page_params, log_success=False)
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            resp = fetch(None)
+            while True:
+                if resp.get('http_status', {}).get('code') != 200:
+                    raise RuntimeError('Search failed: {0}'.format(resp['http_status']))
+
+                after = resp.get('meta', {}).get('next')
+                next_page = None
+                if after and executor:
+                    next_page = executor.submit(fetch, after)
+
+                for result in resp['results']:
+                    yield result
+
+                if not after:
+                    break
+                resp = next_page.result() if next_page else fetch(after)
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
     @abstractmethod
     def create(self, params):
         '''Create a resource.'''
@@ -251,9 +319,57 @@ class ArsenalInterface(object):
         return resp
 
     @abstractmethod
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, limit=None, since=None, until=None):
         '''Retrieve audit history for a list of search results. Returns an
-        updated list with audit history attached.'''
+        updated list with audit history attached.
+
+        The history is fetched from /api/bulk/audit for AUDIT_CHUNK_SIZE
+        results at a time. Falls back to one request per result against
+        servers that don't have the bulk endpoint.
+
+        Args:
+
+        results (list): Search results, each with an id.
+        limit (int): Only fetch the most recent limit audit rows per result.
+        since (str): Only fetch audit rows created at or after this UTC date,
+            in YYYY-MM-DD or YYYY-MM-DD HH:MM:SS format.
+        until (str): Only fetch audit rows created before this UTC date.
+        '''
+
+        object_type = self.uri.split('/')[-1]
+        bulk_uri = '/api/bulk/audit/{0}'.format(object_type)
+        params = {}
+        if limit:
+            params['limit'] = limit
+        if since:
+            params['since'] = since
+        if until:
+            params['until'] = until
+
+        resp = []
+        for i in range(0, len(results), AUDIT_CHUNK_SIZE):
+            chunk = results[i:i + AUDIT_CHUNK_SIZE]
+            params['object_ids'] = ','.join(str(obj['id']) for obj in chunk)
+            my_audit = self.api_conn(bulk_uri, params, log_success=False)
+
+            if my_audit['http_status']['code'] == 404:
+                LOG.debug('Bulk audit history not available, fetching one at a time.')
+                return resp + self.get_audit_history_by_id(results[i:])
+            if my_audit['http_status']['code'] != 200:
+                raise RuntimeError('Audit history failed: {0}'.format(my_audit['http_status']))
+
+            history = dict((str(item['object_id']), item['audit_history']) for
+                           item in my_audit['results'])
+            for obj in chunk:
+                obj['audit_history'] = history.get(str(obj['id']), [])
+                resp.append(obj)
+
+        return resp
+
+    def get_audit_history_by_id(self, results):
+        '''Retrieve audit history for a list of search results with one
+        request per result. Returns an updated list with audit history
+        attached.'''
 
         audit_base_uri = self.uri + '_audit'
         resp = []
@@ -78,9 +78,9 @@ class DataCenters(ArsenalInterface):
 
         return super(DataCenters, self).delete(params)
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for data_centers.'''
-        return super(DataCenters, self).get_audit_history(results)
+        return super(DataCenters, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a single data_center by it's name.
@@ -69,9 +69,9 @@ class HardwareProfiles(ArsenalInterface):
         '''
         pass
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for hardware_profiles.'''
-        return super(HardwareProfiles, self).get_audit_history(results)
+        return super(HardwareProfiles, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a single hardware_profile by it's name.
@@ -45,9 +45,9 @@ class IpAddresses(ArsenalInterface):
         '''We do not allow ip_addresses to be deleted.'''
         pass
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for ip_addresses.'''
-        return super(IpAddresses, self).get_audit_history(results)
+        return super(IpAddresses, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get an ip_addresses by it's name. This is not possible as
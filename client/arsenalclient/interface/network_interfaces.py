@@ -45,9 +45,9 @@ class NetworkInterfaces(ArsenalInterface):
         '''We do not allow network_interfaces to be deleted.'''
         pass
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for network_interfaces.'''
-        return super(NetworkInterfaces, self).get_audit_history(results)
+        return super(NetworkInterfaces, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a network_interface tag by it's name. This is not possible as
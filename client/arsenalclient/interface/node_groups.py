@@ -107,9 +107,9 @@ class NodeGroups(ArsenalInterface):
 
         return super(NodeGroups, self).delete(params)
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for node_groups.'''
-        return super(NodeGroups, self).get_audit_history(results)
+        return super(NodeGroups, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a single node_group by it's name.
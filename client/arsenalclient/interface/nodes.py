@@ -1,22 +1,42 @@
 '''Arsenal client Nodes class.'''
+import hashlib
+import json
 import os
 import re
 import subprocess
 import logging
 from arsenalclient.authorization import check_root
 from arsenalclient.interface.arsenal_interface import ArsenalInterface
-from arsenalclient.arsenal_facts import ArsenalFacts
+from arsenalclient.arsenal_facts import (
+    ArsenalFacts,
+    FACT_PROVIDERS,
+    )
 
 
 LOG = logging.getLogger(__name__)
 
+# Registration payload keys that change on every run and are left out of the
+# registration fingerprint.
+REGISTRATION_VOLATILE_KEYS = [
+    'uptime',
+]
+
+# System uuids that are known not to be unique.
+BOGUS_UUIDS = [
+    '03000200-0400-0500-0006-000700080009',
+    'Not Settable',
+]
+
 class Nodes(ArsenalInterface):
     '''The arsenal client Nodes class.'''
 
     def __init__(self, **kwargs):
         super(Nodes, self).__init__(**kwargs)
         self.uri = '/api/nodes'
-        self.arsenal_facts = ArsenalFacts()
+        provider = getattr(self.settings, 'fact_provider', None) or 'native'
+        self.arsenal_facts = ArsenalFacts(
+            provider=FACT_PROVIDERS[provider],
+            cache_file=getattr(self.settings, 'fact_cache_file', None))
 
     # Overridden methods
     def search(self, params=None):
@@ -118,9 +138,9 @@ class Nodes(ArsenalInterface):
 
         return super(Nodes, self).delete(params)
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for nodes.'''
-        return super(Nodes, self).get_audit_history(results)
+        return super(Nodes, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a single node by it's name.
@@ -138,19 +158,43 @@ class Nodes(ArsenalInterface):
 
         if check_root():
             LOG.debug('Overriding login for node registration to: kaboom')
-            self.authorization.user_login = 'kaboom'
             my_cookie = '/root/.{0}_kaboom_cookie'.format(self.settings.api_host)
             LOG.debug('Overriding setting for user kaboom: '
                       'cookie_file={0}'.format(my_cookie))
-            self.authorization.cookie_file = my_cookie
+            # Only this interface registers as kaboom, the others keep the
+            # shared authorization.
+            self.authorization = self.transport.new_authorization(user_login='kaboom',
+                                                                  cookie_file=my_cookie)
             node = self.collect()
 
             LOG.info('Registering node name: {0} unique_id: {1}'.format(node['name'],
                                                                         node['unique_id']))
-            resp = self.api_conn('/api/register', node, method='put')
+            # Lets the server skip processing the payload if nothing but the
+            # uptime has changed since the last registration.
+            headers = {
+                'X-Arsenal-Fingerprint': self.fingerprint(node),
+                'X-Arsenal-Unique-Id': node['unique_id'],
+                'X-Arsenal-Uptime': str(node['uptime']),
+            }
+            resp = self.api_conn('/api/register',
+                                 node,
+                                 method='put',
+                                 extra_headers=headers)
 
             return resp
 
+    @staticmethod
+    def fingerprint(node):
+        '''Return a sha256 hex digest of a registration payload, minus the
+        volatile keys. Must be computed the same way as the server's
+        registration_fingerprint().'''
+
+        stable = dict((key, val) for key, val in node.items()
+                      if key not in REGISTRATION_VOLATILE_KEYS)
+        stable = json.dumps(stable, sort_keys=True, separators=(',', ':'))
+
+        return hashlib.sha256(stable.encode('utf-8')).hexdigest()
+
     def collect(self):
         '''Collect all data about a node for registering with the server.'''
 
@@ -266,11 +310,6 @@ class Nodes(ArsenalInterface):
         string if found, None otherwise. Also skips known bad output from
         dmidecode that is not unique.'''
 
-        bogus_uuids = [
-            '03000200-0400-0500-0006-000700080009',
-            'Not Settable',
-        ]
-
         unique_id = None
         file_null = open(os.devnull, 'w')
         proc = subprocess.Popen(['/usr/sbin/dmidecode', '-s', 'system-uuid'],
@@ -280,7 +319,7 @@ class Nodes(ArsenalInterface):
         uuid = proc.stdout.readlines()
         if uuid:
             strip_uuid = uuid[-1].rstrip()
-            if strip_uuid in bogus_uuids:
+            if strip_uuid in BOGUS_UUIDS:
                 LOG.warn('unique_id from dmidecode is known bad: {0}'.format(strip_uuid))
             else:
                 unique_id = strip_uuid
@@ -293,7 +332,7 @@ class Nodes(ArsenalInterface):
             for line in dmidecode_out:
                 if re.match(xen_match, line):
                     strip_uuid = line[7:].rstrip()
-                    if strip_uuid in bogus_uuids:
+                    if strip_uuid in BOGUS_UUIDS:
                         LOG.warn('unique_id from dmidecode is known bad: {0}'.format(strip_uuid))
                     else:
                         unique_id = strip_uuid
@@ -323,6 +362,10 @@ class Nodes(ArsenalInterface):
                 LOG.debug('unique_id is from ec2 instance_id: {0}'.format(unique_id))
             elif facts['hardware']['name'] == 'Red Hat KVM':
                 LOG.debug('unique_id is from mac address: {0}'.format(unique_id))
+            elif facts['hardware']['uuid'] and facts['hardware']['uuid'] not in BOGUS_UUIDS:
+                # Already read from sysfs, the same value dmidecode reports.
+                unique_id = facts['hardware']['uuid']
+                LOG.debug('unique_id is from system uuid: {0}'.format(unique_id))
             elif os.path.isfile('/usr/sbin/dmidecode'):
                 unique_id = self.get_uuid_from_dmidecode()
                 if unique_id:
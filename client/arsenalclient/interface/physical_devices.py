@@ -101,9 +101,9 @@ class PhysicalDevices(ArsenalInterface):
 
         return super(PhysicalDevices, self).delete(params)
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for physical_devices.'''
-        return super(PhysicalDevices, self).get_audit_history(results)
+        return super(PhysicalDevices, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a single physical_device by it's name. This is not possible as
@@ -104,9 +104,9 @@ class PhysicalElevations(ArsenalInterface):
 
         return super(PhysicalElevations, self).delete(params)
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for physical_elevations.'''
-        return super(PhysicalElevations, self).get_audit_history(results)
+        return super(PhysicalElevations, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a single physical_elevation by it's name. This is not possible as
@@ -101,9 +101,9 @@ class PhysicalLocations(ArsenalInterface):
 
         return super(PhysicalLocations, self).delete(params)
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for physical_locations.'''
-        return super(PhysicalLocations, self).get_audit_history(results)
+        return super(PhysicalLocations, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a single physical_location by it's name.
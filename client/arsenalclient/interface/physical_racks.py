@@ -97,9 +97,9 @@ class PhysicalRacks(ArsenalInterface):
 
         return super(PhysicalRacks, self).delete(params)
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for physical_racks.'''
-        return super(PhysicalRacks, self).get_audit_history(results)
+        return super(PhysicalRacks, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a single physical_rack by it's name. This is not possible as
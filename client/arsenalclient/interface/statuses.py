@@ -96,9 +96,9 @@ class Statuses(ArsenalInterface):
 
         return super(Statuses, self).delete(params)
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for statuses.'''
-        return super(Statuses, self).get_audit_history(results)
+        return super(Statuses, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a single status by it's name.
@@ -81,9 +81,9 @@ class Tags(ArsenalInterface):
 
         return super(Tags, self).delete(params)
 
-    def get_audit_history(self, results):
+    def get_audit_history(self, results, **kwargs):
         '''Get the audit history for tags.'''
-        return super(Tags, self).get_audit_history(results)
+        return super(Tags, self).get_audit_history(results, **kwargs)
 
     def get_by_name(self, name):
         '''Get a single tag by it's name. This is not possible as a tag's
@@ -0,0 +1,389 @@
+'''Arsenal native fact collection'''
+#
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import fcntl
+import json
+import logging
+import os
+import platform
+import socket
+import struct
+import subprocess
+
+import requests
+
+LOG = logging.getLogger(__name__)
+
+DMI_PATH = '/sys/class/dmi/id'
+NET_PATH = '/sys/class/net'
+EC2_METADATA_URL = 'http://169.254.169.254/latest'
+# Seconds to wait on the ec2 metadata endpoint.
+EC2_METADATA_TIMEOUT = 1
+# Site specific facts that only facter can provide, and the ArsenalFacts
+# group each one fills.
+CUSTOM_FACTS = {
+    'int_datacenter': 'data_center',
+    'int_switchports': 'networking',
+}
+# ioctl to get the IPv4 address of an interface.
+SIOCGIFADDR = 0x8915
+
+# os-release ID to the os name facter reports.
+OS_NAMES = {
+    'almalinux': 'AlmaLinux',
+    'amzn': 'Amazon',
+    'centos': 'CentOS',
+    'debian': 'Debian',
+    'fedora': 'Fedora',
+    'ol': 'OracleLinux',
+    'rhel': 'RedHat',
+    'rocky': 'Rocky',
+    'sles': 'SLES',
+    'ubuntu': 'Ubuntu',
+}
+
+# Machine names as facter reports them on debian based systems.
+DEBIAN_ARCHITECTURES = {
+    'aarch64': 'arm64',
+    'x86_64': 'amd64',
+}
+
+# Strings in the dmi vendor or product name to the virtual fact.
+VIRTUAL_SIGNATURES = [
+    ('VMware', 'vmware'),
+    ('VirtualBox', 'virtualbox'),
+    ('KVM', 'kvm'),
+    ('QEMU', 'kvm'),
+    ('Amazon EC2', 'kvm'),
+    ('Google', 'gce'),
+    ('Virtual Machine', 'hyperv'),
+    ('HVM domU', 'xenhvm'),
+    ('Xen', 'xenhvm'),
+]
+
+
+def read_file(path):
+    '''Return the stripped contents of path, or None if it can't be read.'''
+
+    try:
+        with open(path, 'r') as contents:
+            return contents.read().strip()
+    except (IOError, OSError):
+        return None
+
+def read_key_values(path, separator='='):
+    '''Return a dict of the key/value lines of path, e.g. os-release.'''
+
+    resp = {}
+    for line in (read_file(path) or '').splitlines():
+        if separator in line:
+            key, val = line.split(separator, 1)
+            resp[key.strip()] = val.strip().strip('"')
+    return resp
+
+def format_uptime(seconds):
+    '''Format seconds of uptime the way facter does.'''
+
+    days = seconds // 86400
+    if days > 1:
+        return '{0} days'.format(days)
+    if days == 1:
+        return '1 day'
+    return '{0}:{1:02d} hours'.format(seconds // 3600, (seconds % 3600) // 60)
+
+def format_bytes(size):
+    '''Format a number of bytes the way facter does, e.g. 15.51 GiB.'''
+
+    units = ['bytes', 'KiB', 'MiB', 'GiB', 'TiB', 'PiB']
+    size = float(size)
+    unit = 0
+    while size >= 1024 and unit < len(units) - 1:
+        size /= 1024
+        unit += 1
+    return '{0:.2f} {1}'.format(size, units[unit])
+
+def get_uptime():
+    '''Return the system uptime.'''
+
+    uptime = read_file('/proc/uptime')
+    return format_uptime(int(float(uptime.split()[0])))
+
+def get_memory_total():
+    '''Return the total system memory.'''
+
+    meminfo = read_key_values('/proc/meminfo', separator=':')
+    return format_bytes(int(meminfo['MemTotal'].split()[0]) * 1024)
+
+def get_dmi():
+    '''Return the dmi facts from sysfs. The serial number and uuid are only
+    readable by root.'''
+
+    resp = {'product': {}}
+    manufacturer = read_file(os.path.join(DMI_PATH, 'sys_vendor'))
+    if manufacturer:
+        resp['manufacturer'] = manufacturer
+    for key, path in [('name', 'product_name'),
+                      ('serial_number', 'product_serial'),
+                      ('uuid', 'product_uuid')]:
+        val = read_file(os.path.join(DMI_PATH, path))
+        if val:
+            resp['product'][key] = val
+    return resp
+
+def get_virtual(dmi):
+    '''Return the virtual fact from what the kernel exposes.'''
+
+    if os.path.exists('/.dockerenv'):
+        return 'docker'
+    if os.path.isdir('/proc/xen'):
+        caps = read_file('/proc/xen/capabilities') or ''
+        return 'xen0' if 'control_d' in caps else 'xenu'
+
+    signature = '{0} {1}'.format(dmi.get('manufacturer', ''),
+                                 dmi['product'].get('name', ''))
+    for match, virtual in VIRTUAL_SIGNATURES:
+        if match in signature:
+            return virtual
+    return 'physical'
+
+def get_os():
+    '''Return the os facts from os-release and the distribution release
+    files.'''
+
+    os_release = read_key_values('/etc/os-release')
+    os_id = os_release.get('ID', '')
+    family = [os_id] + os_release.get('ID_LIKE', '').split()
+
+    release = os_release.get('VERSION_ID')
+    description = os_release.get('PRETTY_NAME')
+    redhat_release = read_file('/etc/redhat-release')
+    if redhat_release:
+        # e.g. CentOS Linux release 7.9.2009 (Core)
+        description = redhat_release
+        words = redhat_release.split()
+        if 'release' in words:
+            release = words[words.index('release') + 1]
+    elif os_id == 'debian':
+        release = read_file('/etc/debian_version') or release
+
+    architecture = platform.machine()
+    if 'debian' in family:
+        architecture = DEBIAN_ARCHITECTURES.get(architecture, architecture)
+
+    return {
+        'name': OS_NAMES.get(os_id, os_id.capitalize()),
+        'architecture': architecture,
+        'distro': {
+            'description': description,
+            'release': {
+                'full': release,
+            },
+        },
+    }
+
+def get_ipv4_address(net_if):
+    '''Return the IPv4 address of net_if, or None.'''
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        packed = struct.pack('256s', net_if[:15].encode('utf-8'))
+        resp = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, packed)
+        return socket.inet_ntoa(resp[20:24])
+    except (IOError, OSError):
+        return None
+    finally:
+        sock.close()
+
+def get_bond_permanent_macs():
+    '''Return a dict of bond slave name to its permanent mac address. The
+    address in sysfs is the bond's, not the slave's own.'''
+
+    resp = {}
+    bonding = '/proc/net/bonding'
+    if not os.path.isdir(bonding):
+        return resp
+    for bond in os.listdir(bonding):
+        slave = None
+        for line in (read_file(os.path.join(bonding, bond)) or '').splitlines():
+            if line.startswith('Slave Interface:'):
+                slave = line.split(':', 1)[1].strip()
+            elif line.startswith('Permanent HW addr:') and slave:
+                resp[slave] = line.split(':', 1)[1].strip()
+    return resp
+
+def get_primary_interface():
+    '''Return the name of the interface with the default route, or None.'''
+
+    for line in (read_file('/proc/net/route') or '').splitlines()[1:]:
+        fields = line.split()
+        if len(fields) > 1 and fields[1] == '00000000':
+            return fields[0]
+    return None
+
+def get_networking():
+    '''Return the networking facts from sysfs.'''
+
+    interfaces = {}
+    permanent_macs = get_bond_permanent_macs()
+    for net_if in sorted(os.listdir(NET_PATH)):
+        # Skip attribute files like bonding_masters, only interfaces are
+        # directories.
+        if not os.path.isdir(os.path.join(NET_PATH, net_if)):
+            continue
+        attribs = {}
+        mac = permanent_macs.get(net_if) or \
+              read_file(os.path.join(NET_PATH, net_if, 'address'))
+        if mac and mac != '00:00:00:00:00:00':
+            attribs['mac'] = mac
+        ip_address = get_ipv4_address(net_if)
+        if ip_address:
+            attribs['ip'] = ip_address
+        interfaces[net_if] = attribs
+
+    primary = get_primary_interface()
+    if primary not in interfaces:
+        primary = next((net_if for net_if in sorted(interfaces) if
+                        'mac' in interfaces[net_if]), None)
+
+    return {
+        'fqdn': socket.getfqdn(),
+        'mac': interfaces.get(primary, {}).get('mac'),
+        'interfaces': interfaces,
+    }
+
+def is_ec2(dmi):
+    '''Return True if this looks like an ec2 instance, without touching the
+    network.'''
+
+    hypervisor_uuid = read_file('/sys/hypervisor/uuid') or ''
+    bios_vendor = read_file(os.path.join(DMI_PATH, 'bios_vendor')) or ''
+    return (hypervisor_uuid.lower().startswith('ec2') or
+            'Amazon' in dmi.get('manufacturer', '') or
+            'Amazon' in bios_vendor)
+
+def get_ec2_metadata():
+    '''Return the ec2 metadata facts the client uses, or None. Uses an
+    IMDSv2 token when the endpoint offers one.'''
+
+    headers = {}
+    try:
+        resp = requests.put('{0}/api/token'.format(EC2_METADATA_URL),
+                            headers={'X-aws-ec2-metadata-token-ttl-seconds': '60'},
+                            timeout=EC2_METADATA_TIMEOUT)
+        if resp.status_code == 200:
+            headers['X-aws-ec2-metadata-token'] = resp.text
+    except requests.exceptions.RequestException:
+        return None
+
+    def get(path):
+        resp = requests.get('{0}/meta-data/{1}'.format(EC2_METADATA_URL, path),
+                            headers=headers, timeout=EC2_METADATA_TIMEOUT)
+        resp.raise_for_status()
+        return resp.text
+
+    try:
+        return {
+            'ami-id': get('ami-id'),
+            'hostname': get('hostname'),
+            'instance-id': get('instance-id'),
+            'instance-type': get('instance-type'),
+            'placement': {
+                'availability-zone': get('placement/availability-zone'),
+            },
+            'profile': get('profile'),
+            'reservation-id': get('reservation-id'),
+            'security-groups': get('security-groups'),
+            'identity-credentials': {
+                'ec2': {
+                    'info': get('identity-credentials/ec2/info'),
+                },
+            },
+        }
+    except requests.exceptions.RequestException as ex:
+        LOG.warn('Unable to read ec2 metadata: {0}'.format(repr(ex)))
+        return None
+
+def get_custom_facts(facter_bin, facts):
+    '''Return the site specific facts from facter, or an empty dict if facter
+    isn't installed. Asking for just these is far cheaper than resolving every
+    fact.'''
+
+    if not facter_bin:
+        LOG.debug('facter not found, skipping custom facts.')
+        return {}
+    if not facts:
+        return {}
+
+    try:
+        proc = subprocess.Popen([facter_bin, '-p', '--json'] + sorted(facts),
+                                stdin=open(os.devnull),
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        stdout, stderr = proc.communicate(None)
+        resp = json.loads(stdout)
+    except (OSError, ValueError) as ex:
+        LOG.warn('Unable to collect custom facts: {0}'.format(repr(ex)))
+        return {}
+
+    return dict((key, val) for key, val in resp.items() if val is not None)
+
+def collect_native_facts(facter_bin=None, skip=None):
+    '''Collect facts from /proc, sysfs, os-release and the ec2 metadata
+    endpoint. Returns them in the same shape as modern facter's json so they
+    can be mapped with ArsenalFacts._map_facter_modern().
+
+    facter_bin: The facter to ask for CUSTOM_FACTS, if installed.
+    skip      : ArsenalFacts groups that are already cached. The ec2 metadata
+        endpoint and facter are not asked for the facts of these groups.
+    '''
+
+    skip = skip or set()
+
+    dmi = get_dmi()
+    virtual = get_virtual(dmi)
+    os_facts = get_os()
+
+    resp = {
+        'system_uptime': {
+            'uptime': get_uptime(),
+        },
+        'virtual': virtual,
+        'is_virtual': virtual not in ('physical', 'xen0'),
+        'networking': get_networking(),
+        'os': os_facts,
+        'kernel': platform.system(),
+        'memory': {
+            'system': {
+                'total': get_memory_total(),
+            },
+        },
+        'processors': {
+            'count': os.sysconf('SC_NPROCESSORS_ONLN'),
+        },
+    }
+    if 'manufacturer' in dmi:
+        resp['dmi'] = dmi
+
+    if 'ec2' not in skip and is_ec2(dmi):
+        ec2_metadata = get_ec2_metadata()
+        if ec2_metadata:
+            resp['ec2_metadata'] = ec2_metadata
+
+    resp.update(get_custom_facts(facter_bin, [fact for fact, group in
+                                              CUSTOM_FACTS.items() if
+                                              group not in skip]))
+
+    return resp
@@ -0,0 +1,123 @@
+'''Arsenal client HTTP transport'''
+#
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+try:
+    from urllib3.util.retry import Retry
+except ImportError:
+    from requests.packages.urllib3.util.retry import Retry
+
+from arsenalclient.authorization import Authorization
+
+LOG = logging.getLogger(__name__)
+
+# Defaults for the [http] settings.
+HTTP_DEFAULTS = {
+    'pool_connections': 4,
+    'pool_maxsize': 10,
+    'max_retries': 3,
+    'retry_backoff_factor': 0.5,
+}
+
+# Only GETs are retried after the server has seen the request. PUTs and
+# DELETEs are only retried when the connection could not be made at all.
+RETRY_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+RETRY_STATUSES = frozenset([502, 503, 504])
+
+
+class Transport(object):
+    '''The connection pool and authorization shared by every interface of an
+    Arsenal client.
+
+    All the interfaces of a Client make their calls through one
+    requests.Session, so connections to the server are kept alive and reused
+    across every call instead of being set up per interface. The auth cookie
+    is read from the cookie file once and then kept in memory.
+
+    Usage:
+
+      >>> transport = Transport(settings)
+      >>> nodes = Nodes(settings=settings, transport=transport)
+      >>> tags = Tags(settings=settings, transport=transport)
+
+    Args:
+
+        settings: The client settings Namespace. Uses api_host, api_protocol,
+            cookie_file, user_login, user_password and verify_ssl, along with
+            the optional pool_connections, pool_maxsize, max_retries and
+            retry_backoff_factor.
+    '''
+
+    def __init__(self, settings):
+
+        self.settings = settings
+        self.session = requests.session()
+
+        adapter = HTTPAdapter(pool_connections=self.get_setting('pool_connections', int),
+                              pool_maxsize=self.get_setting('pool_maxsize', int),
+                              max_retries=self.build_retry())
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.authorization = self.new_authorization()
+
+    def get_setting(self, name, cast):
+        '''Return the setting name cast with cast, or its default if it is
+        unset or invalid.'''
+
+        val = getattr(self.settings, name, None)
+        try:
+            return cast(val)
+        except (TypeError, ValueError):
+            return HTTP_DEFAULTS[name]
+
+    def build_retry(self):
+        '''Return the urllib3 Retry to use for every call.'''
+
+        max_retries = self.get_setting('max_retries', int)
+        kwargs = {
+            'total': max_retries,
+            'connect': max_retries,
+            'read': max_retries,
+            'status': max_retries,
+            'backoff_factor': self.get_setting('retry_backoff_factor', float),
+            'status_forcelist': RETRY_STATUSES,
+            'raise_on_status': False,
+        }
+        try:
+            return Retry(allowed_methods=RETRY_METHODS, **kwargs)
+        except TypeError:
+            # urllib3 < 1.26
+            return Retry(method_whitelist=RETRY_METHODS, **kwargs)
+
+    def new_authorization(self, **kwargs):
+        '''Return an Authorization that uses this transport's session. kwargs
+        override the login settings, e.g. user_login and cookie_file.'''
+
+        params = {
+            'api_host': self.settings.api_host,
+            'api_protocol': self.settings.api_protocol,
+            'cookie_file': self.settings.cookie_file,
+            'user_login': self.settings.user_login,
+            'user_password': self.settings.user_password,
+            'verify_ssl': self.settings.verify_ssl,
+        }
+        params.update(kwargs)
+
+        return Authorization(session=self.session, **params)
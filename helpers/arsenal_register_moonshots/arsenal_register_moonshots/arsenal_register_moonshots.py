@@ -50,6 +50,11 @@ def _parse_args():
                        '--arsenal-server',
                        help='The Arsenal server to use.',
                        default='arsenal.las2.fanops.net')
+    parse.add_argument('-b',
+                       '--batch-size',
+                       type=int,
+                       help='The number of chassis to register per request.',
+                       default=100)
     parse.add_argument('-c',
                        '--chassis-type',
                        help="The chassis type to collect. Valid values are \
@@ -287,52 +292,58 @@ def collect_moonshots(args, moonshots):
     return all_moonshots, failed_chassis
 
 def register(args, all_chassis):
-    '''Register all the chasssis with Arsenal.'''
+    '''Register all the chasssis with Arsenal, args.batch_size at a time.'''
 
     headers = {'Content-Type': 'application/json'}
     server = f'https://{args.arsenal_server}'
-    url = f'{server}/api/register'
+    url = f'{server}/api/bulk/register'
     session = arsenal_login(server, 'kaboom', 'password')
 
     global OVERALL_EXIT
 
     total = len(all_chassis)
-    complete = 1
     success = 0
 
-    for chassis in all_chassis:
-        name = chassis['name']
-
-        LOG.info("Registering chassis with Arsenal: %s (%s of %s)...", name,
-                                                                       complete,
-                                                                       total,)
-        complete += 1
-        if args.dry_run:
-            LOG.info('Skipping registration, here is the payload we would have sent:')
+    if args.dry_run:
+        for chassis in all_chassis:
+            LOG.info('Skipping registration of chassis: %s, here is the payload we '
+                     'would have sent:', chassis['name'])
             LOG.info(json.dumps(chassis, sort_keys=True, indent=4))
             success += 1
-            continue
+        return success
 
-        resp = session.put(url, headers=headers, json=chassis, verify=False)
+    for start in range(0, total, args.batch_size):
+        batch = all_chassis[start:start + args.batch_size]
+        LOG.info("Registering chassis with Arsenal: %s to %s of %s...", start + 1,
+                                                                      start + len(batch),
+                                                                      total)
 
-        if resp.status_code == 200:
-            LOG.info('Success.')
-            success += 1
-            assign_node_group(args, resp)
-        else:
+        resp = session.put(url, headers=headers, json={'nodes': batch}, verify=False)
+
+        if resp.status_code != 200:
             OVERALL_EXIT = 1
-            LOG.error('There was a problem registering chassis: %s', name)
+            LOG.error('There was a problem registering chassis: %s',
+                      [chassis['name'] for chassis in batch])
             LOG.error(resp.text)
+            continue
+
+        for result in resp.json()['results']:
+            if result['code'] == 200:
+                LOG.info('Success: %s', result['name'])
+                success += 1
+                assign_node_group(args, result)
+            else:
+                OVERALL_EXIT = 1
+                LOG.error('There was a problem registering chassis: %s', result['name'])
+                LOG.error(result['error'])
 
     return success
 
-def assign_node_group(args, resp):
+def assign_node_group(args, result):
     """
     Assign node group to node if possible.
     """
 
-    results = resp.json()
-    result = results['results'][0]
     node_name = result['name']
     node_id = result['id']
     node_group = f"{node_name[0:3]}_{node_name[5:8]}"
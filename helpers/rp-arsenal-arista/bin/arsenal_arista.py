@@ -37,6 +37,11 @@ def _parse_args():
                      '--arsenal-server',
                      help='The Arenal server to use.',
                      default='https://arsenal.las2.fanops.net')
+    pap.add_argument('-b',
+                     '--batch-size',
+                     type=int,
+                     help='The number of switches to register per request.',
+                     default=100)
     pap.add_argument('-D',
                      '--dry-run',
                      action='store_true',
@@ -163,23 +168,23 @@ def login(args, username, password):
     session.post(f'{args.arsenal_server}/api/login', data=payload, verify=args.ssl_verify)
     return session
 
-def register(args, session, payload):
-    '''Register a node with Arsenal.'''
+def register(args, session, payloads):
+    '''Register a list of nodes with Arsenal in a single request. Returns the
+    list of per node results, or None if the request failed.'''
 
     headers = {'Content-Type': 'application/json'}
-    url = f'{args.arsenal_server}/api/register'
+    url = f'{args.arsenal_server}/api/bulk/register'
 
-    resp = session.put(url, headers=headers, json=payload, verify=False)
+    resp = session.put(url, headers=headers, json={'nodes': payloads}, verify=False)
     if args.debug:
         try:
             LOG.debug(json.dumps(resp.json(), indent=4, sort_keys=True))
         except requests.exceptions.JSONDecodeError:
             LOG.error(resp.text)
     if resp.status_code == 200:
-        LOG.info('  Success.')
-        return True
+        return resp.json()['results']
 
-    return False
+    return None
 
 def get_switch_ips(args):
     '''Return a list of ips of all the switches found in Arsenal as physical devices if they
@@ -216,6 +221,7 @@ def process_all_switches(args, exclude_switches, all_switches):
     session = login(args, 'kaboom', 'password')
     success_switches = []
     failed_switches = []
+    to_register = []
     total_switch_count = len(all_switches)
 
     LOG.info('There are %s total switches to register.', total_switch_count)
@@ -269,15 +275,25 @@ def process_all_switches(args, exclude_switches, all_switches):
             }
             success_switches.append(success)
         else:
-            LOG.info('  Registering switch with Arsenal: %s', switch_ip)
-            resp = register(args, session, payload)
-            if not resp:
-                failed_switches.append(switch_ip)
+            to_register.append((switch_ip, payload))
+
+    for start in range(0, len(to_register), args.batch_size):
+        batch = to_register[start:start + args.batch_size]
+        LOG.info('Registering switches %s to %s of %s with Arsenal...', start + 1,
+                                                                       start + len(batch),
+                                                                       len(to_register))
+        results = register(args, session, [payload for _, payload in batch])
+        if results is None:
+            results = [{'code': 500}] * len(batch)
+        for (switch_ip, payload), result in zip(batch, results):
+            if result['code'] != 200:
                 fail = {
                     'name': switch_ip,
-                    'error': 'Failed to register with Arsenal.'
+                    'error': result.get('error', 'Failed to register with Arsenal.'),
                 }
                 failed_switches.append(fail)
+                continue
+            LOG.info('  Success: %s', switch_ip)
             success = {
                 'name': switch_ip,
                 'serial_number': payload['serial_number'],
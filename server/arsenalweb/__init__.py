@@ -9,6 +9,9 @@ import transaction
 from .models import get_engine, get_session_factory, get_tm_session
 from .models.common import User
 from .models.common import Group
+from .views.api.dimension_cache import configure_dimension_cache
+from .views.api.register_queue import configure_register_queue
+from .views.api.nodes import start_register_queue
 from sqlalchemy import inspect as sa_inspect
 
 LOG = logging.getLogger(__name__)
@@ -55,6 +58,8 @@ def main(global_config, **settings):
         config.include('.routes')
         config.include('.models')
         config.add_renderer('json', JSON(indent=2, sort_keys=True))
+        configure_dimension_cache(settings)
+        configure_register_queue(settings)
 
         # Load our groups and perms from the db and add them to the ACL. I
         # believe we can move this loader into the security policy if we ever
@@ -93,4 +98,7 @@ def main(global_config, **settings):
 
         config.scan()
 
-    return config.make_wsgi_app()
+    app = config.make_wsgi_app()
+    start_register_queue(app.registry)
+
+    return app
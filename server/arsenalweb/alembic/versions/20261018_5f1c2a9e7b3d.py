@@ -0,0 +1,22 @@
+"""Adding registration_fingerprint to nodes
+
+Revision ID: 5f1c2a9e7b3d
+Revises: abc487ea9997
+Create Date: 2026-10-18 09:12:41.227305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = '5f1c2a9e7b3d'
+down_revision = 'abc487ea9997'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('nodes', sa.Column('registration_fingerprint', mysql.VARCHAR(length=64), nullable=True))
+
+def downgrade():
+    op.drop_column('nodes', 'registration_fingerprint')
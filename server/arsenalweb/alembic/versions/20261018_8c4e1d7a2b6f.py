@@ -0,0 +1,45 @@
+"""Adding indexes for node, tag and audit lookups
+
+Revision ID: 8c4e1d7a2b6f
+Revises: 5f1c2a9e7b3d
+Create Date: 2026-10-18 14:03:17.582114
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8c4e1d7a2b6f'
+down_revision = '5f1c2a9e7b3d'
+branch_labels = None
+depends_on = None
+
+AUDIT_TABLES = [
+    'data_centers_audit',
+    'ec2_instances_audit',
+    'hardware_profiles_audit',
+    'ip_addresses_audit',
+    'network_interfaces_audit',
+    'node_groups_audit',
+    'nodes_audit',
+    'operating_systems_audit',
+    'physical_devices_audit',
+    'physical_elevations_audit',
+    'physical_locations_audit',
+    'physical_racks_audit',
+    'statuses_audit',
+    'tags_audit',
+]
+
+def upgrade():
+    op.create_index('idx_node_unique_id', 'nodes', ['unique_id'], unique=False)
+    op.create_index('idx_node_status_last_registered', 'nodes', ['status_id', 'last_registered'], unique=False)
+    op.create_index('idx_tag_name_value', 'tags', ['name', 'value'], unique=False)
+    for table in AUDIT_TABLES:
+        op.create_index('idx_{0}_object_id'.format(table), table, ['object_id', 'created'], unique=False)
+
+def downgrade():
+    for table in AUDIT_TABLES:
+        op.drop_index('idx_{0}_object_id'.format(table), table_name=table)
+    op.drop_index('idx_tag_name_value', table_name='tags')
+    op.drop_index('idx_node_status_last_registered', table_name='nodes')
+    op.drop_index('idx_node_unique_id', table_name='nodes')
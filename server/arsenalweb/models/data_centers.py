@@ -121,3 +121,5 @@ class DataCenterAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_data_centers_audit_object_id', DataCenterAudit.object_id, DataCenterAudit.created, unique=False)
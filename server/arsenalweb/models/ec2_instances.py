@@ -119,3 +119,5 @@ class Ec2InstanceAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_ec2_instances_audit_object_id', Ec2InstanceAudit.object_id, Ec2InstanceAudit.created, unique=False)
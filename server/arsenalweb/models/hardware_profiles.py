@@ -128,3 +128,5 @@ class HardwareProfileAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_hardware_profiles_audit_object_id', HardwareProfileAudit.object_id, HardwareProfileAudit.created, unique=False)
@@ -107,3 +107,5 @@ class IpAddressAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_ip_addresses_audit_object_id', IpAddressAudit.object_id, IpAddressAudit.created, unique=False)
@@ -135,3 +135,5 @@ class NetworkInterfaceAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_network_interfaces_audit_object_id', NetworkInterfaceAudit.object_id, NetworkInterfaceAudit.created, unique=False)
@@ -140,3 +140,5 @@ class NodeGroupAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_node_groups_audit_object_id', NodeGroupAudit.object_id, NodeGroupAudit.created, unique=False)
@@ -71,6 +71,9 @@ class Node(Base):
     os_memory = Column(VARCHAR(255))
     processor_count = Column(Integer)
     last_registered = Column(TIMESTAMP)
+    # Hash of the last full registration payload, minus volatile fields. Lets
+    # registrations that haven't changed skip straight to updating uptime.
+    registration_fingerprint = Column(VARCHAR(64))
     created = Column(TIMESTAMP, server_default=text('CURRENT_TIMESTAMP'), nullable=False)
     updated = Column(TIMESTAMP,
                      server_default=text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'),
@@ -105,6 +108,16 @@ class Node(Base):
                               backref='guest_vms',
                               lazy='dynamic')
 
+    def get_related(self, name):
+        '''Return the objects for one of the dynamic relationships. Uses the
+        list stashed by preload_node_relationships() when a search has already
+        batch loaded it, otherwise falls back to the relationship query.'''
+
+        try:
+            return self._preloaded[name]
+        except (AttributeError, KeyError):
+            return getattr(self, name)
+
     def __json__(self, request):
         try:
             fields = request.params['fields']
@@ -124,17 +137,17 @@ class Node(Base):
                     serial_number=check_null_string(self.serial_number),
                     os_memory=check_null_string(self.os_memory),
                     processor_count=check_null_string(self.processor_count),
-                    node_groups=get_name_id_list(self.node_groups),
-                    tags=get_name_id_list(self.tags, extra_keys=['value']),
-                    network_interfaces=get_name_id_list(self.network_interfaces,
+                    node_groups=get_name_id_list(self.get_related('node_groups')),
+                    tags=get_name_id_list(self.get_related('tags'), extra_keys=['value']),
+                    network_interfaces=get_name_id_list(self.get_related('network_interfaces'),
                                                         extra_keys=[
                                                             'unique_id',
                                                             'port_description',
                                                             'port_vlan',
                                                             'seen_mac_address',
                                                         ]),
-                    guest_vms=get_name_id_list(self.guest_vms),
-                    hypervisor=get_name_id_list(self.hypervisor),
+                    guest_vms=get_name_id_list(self.get_related('guest_vms')),
+                    hypervisor=get_name_id_list(self.get_related('hypervisor')),
                     physical_device=self.physical_device,
                     last_registered=localize_date(self.last_registered),
                     created=localize_date(self.created),
@@ -152,27 +165,27 @@ class Node(Base):
 
             # Dynamic backrefs are not in the instance dict, so we handle them here.
             if 'node_groups' in my_fields:
-                resp['node_groups'] = get_name_id_list(self.node_groups)
+                resp['node_groups'] = get_name_id_list(self.get_related('node_groups'))
             if 'hypervisor' in my_fields:
-                resp['hypervisor'] = get_name_id_list(self.hypervisor)
+                resp['hypervisor'] = get_name_id_list(self.get_related('hypervisor'))
             if 'guest_vms' in my_fields:
-                my_guest_vms = get_name_id_list(self.guest_vms)
+                my_guest_vms = get_name_id_list(self.get_related('guest_vms'))
                 if my_guest_vms:
                     resp['guest_vms'] = my_guest_vms
                 # Need this so we don't return an empty list of guest_vms
                 # for each guest vm.
                 else:
-                    my_hypervisor=get_name_id_list(self.hypervisor)
+                    my_hypervisor=get_name_id_list(self.get_related('hypervisor'))
                     if my_hypervisor:
                         try:
                             del resp['guest_vms']
                         except KeyError:
                             pass
             if 'tags' in my_fields:
-                resp['tags'] = get_name_id_list(self.tags,
+                resp['tags'] = get_name_id_list(self.get_related('tags'),
                                                 extra_keys=['value'])
             if 'network_interfaces' in my_fields:
-                resp['network_interfaces'] = get_name_id_list(self.network_interfaces,
+                resp['network_interfaces'] = get_name_id_list(self.get_related('network_interfaces'),
                                                               extra_keys=[
                                                                   'unique_id',
                                                                   'ip_address',
@@ -230,6 +243,8 @@ Index('idx_node_id', Node.id, unique=False)
 Index('idx_node_name', Node.name, unique=False)
 Index('idx_node_serial_number', Node.serial_number, unique=False)
 Index('idx_node_ec2_id', Node.ec2_id, unique=True)
+Index('idx_node_unique_id', Node.unique_id, unique=False)
+Index('idx_node_status_last_registered', Node.status_id, Node.last_registered, unique=False)
 
 
 class NodeAudit(BaseAudit):
@@ -244,3 +259,5 @@ class NodeAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_nodes_audit_object_id', NodeAudit.object_id, NodeAudit.created, unique=False)
@@ -122,3 +122,5 @@ class OperatingSystemAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_operating_systems_audit_object_id', OperatingSystemAudit.object_id, OperatingSystemAudit.created, unique=False)
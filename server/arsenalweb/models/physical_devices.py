@@ -175,3 +175,5 @@ class PhysicalDeviceAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_physical_devices_audit_object_id', PhysicalDeviceAudit.object_id, PhysicalDeviceAudit.created, unique=False)
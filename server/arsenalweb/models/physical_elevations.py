@@ -131,3 +131,5 @@ class PhysicalElevationAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_physical_elevations_audit_object_id', PhysicalElevationAudit.object_id, PhysicalElevationAudit.created, unique=False)
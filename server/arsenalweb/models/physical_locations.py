@@ -141,3 +141,5 @@ class PhysicalLocationAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_physical_locations_audit_object_id', PhysicalLocationAudit.object_id, PhysicalLocationAudit.created, unique=False)
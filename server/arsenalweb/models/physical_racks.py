@@ -120,3 +120,5 @@ class PhysicalRackAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_physical_racks_audit_object_id', PhysicalRackAudit.object_id, PhysicalRackAudit.created, unique=False)
@@ -118,3 +118,5 @@ class StatusAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_statuses_audit_object_id', StatusAudit.object_id, StatusAudit.created, unique=False)
@@ -118,6 +118,7 @@ class Tag(Base):
             return resp
 
 Index('idx_tag_id', Tag.id, unique=False)
+Index('idx_tag_name_value', Tag.name, Tag.value, unique=False)
 
 class TagAudit(BaseAudit):
     '''Arsenal TagAudit object.'''
@@ -131,3 +132,5 @@ class TagAudit(BaseAudit):
             'mariadb_collate': 'utf8_bin',
         }
     )
+
+Index('idx_tags_audit_object_id', TagAudit.object_id, TagAudit.created, unique=False)
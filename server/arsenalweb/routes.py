@@ -96,7 +96,10 @@ def includeme(config):
     # secirty to control access to node registrations. Don't love it
     # but can't use request_param on a put request.
     config.add_route('api_register', '/api/register')
+    config.add_route('api_b_register', '/api/bulk/register')
     config.add_route('api_enc', '/api/enc')
+    config.add_route('api_b_enc', '/api/bulk/enc')
+    config.add_route('api_b_audit', '/api/bulk/audit/{object_type}')
 
     config.add_route('api_data_centers', '/api/data_centers')
     config.add_route('api_data_center_r', '/api/data_centers/{id}/{resource}')
@@ -218,7 +221,10 @@ def includeme(config):
     config.add_route('api_group_audit', '/api/groups_audit/{id}')
 
     config.add_route('api_reports_db', '/api/reports/db')
+    config.add_route('api_reports_dimension_cache', '/api/reports/dimension_cache')
+    config.add_route('api_reports_enc_cache', '/api/reports/enc_cache')
     config.add_route('api_reports_nodes', '/api/reports/nodes')
+    config.add_route('api_reports_register_queue', '/api/reports/register_queue')
     config.add_route('api_reports_stale_nodes', '/api/reports/stale_nodes')
 
     config.add_route('api_testing', '/api/testing')
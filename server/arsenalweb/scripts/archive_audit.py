@@ -0,0 +1,349 @@
+'''Archive and partition maintenance for the Arsenal audit tables.
+
+archive   : Move audit rows older than their table's retention to gzipped
+            json lines files, in small batches that each commit on their
+            own, then delete them from the live table.
+partition : Keep RANGE partitions on created ahead of time for audit tables
+            that are partitioned, drop the empty ones past retention, and
+            print the DDL to partition the ones that aren't.
+
+Retention is read from the config file:
+
+arsenal.audit.retention_days            : Days to keep rows in every audit
+                                          table. 0 keeps them forever.
+arsenal.audit.retention_days.<table>    : Override for a single table.
+arsenal.audit.archive_dir               : Where archive files are written.
+arsenal.audit.archive_batch_size        : Rows moved per transaction.
+'''
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from pyramid.paster import bootstrap, setup_logging
+from sqlalchemy import text
+
+from ..models.common import BaseAudit
+
+LOG = logging.getLogger(__name__)
+
+# Seconds a DDL statement waits for a metadata lock before giving up, so
+# that it never queues the live traffic behind it.
+DDL_LOCK_WAIT_TIMEOUT = 5
+
+
+def get_audit_models():
+    '''Return every audit model, sorted by table name.'''
+
+    return sorted(BaseAudit.__subclasses__(), key=lambda x: x.__tablename__)
+
+def get_retention_days(settings, table):
+    '''Return the retention in days for table. 0 means keep forever.'''
+
+    for key in ['arsenal.audit.retention_days.{0}'.format(table),
+                'arsenal.audit.retention_days']:
+        try:
+            return int(settings[key])
+        except (KeyError, ValueError):
+            continue
+    return 0
+
+def get_cutoff(settings, table, now=None):
+    '''Return the datetime before which rows of table are past retention, or
+    None if table keeps its rows forever.'''
+
+    days = get_retention_days(settings, table)
+    if not days:
+        return None
+    now = now or datetime.utcnow()
+    return now - timedelta(days=days)
+
+def serialize_row(row):
+    '''Return an audit row as a json string.'''
+
+    resp = {}
+    for key, val in row.items():
+        if isinstance(val, datetime):
+            val = val.isoformat()
+        resp[key] = val
+    return json.dumps(resp, sort_keys=True)
+
+def archive_table(dbsession, model, cutoff, archive_dir, batch_size, sleep,
+                  dry_run=False):
+    '''Move the rows of model created before cutoff to a gzipped json lines
+    file in archive_dir. Each batch is written and synced to the file before
+    it is deleted, and deleted in a transaction of its own. Returns the number
+    of rows archived.'''
+
+    table = model.__table__
+
+    if dry_run:
+        count = dbsession.query(model).filter(model.created < cutoff).count()
+        LOG.info('%s: %s rows older than %s would be archived', table.name,
+                 count, cutoff)
+        dbsession.rollback()
+        return count
+
+    path = os.path.join(archive_dir, '{0}-{1}.jsonl.gz'.format(
+        table.name, datetime.utcnow().strftime('%Y%m%d%H%M%S')))
+    total = 0
+    last_id = 0
+
+    with gzip.open(path, 'at') as archive:
+        while True:
+            # Walking the primary key from the last archived id keeps every
+            # batch a short range read, however large the table is.
+            query = table.select()
+            query = query.where(table.c.id > last_id)
+            query = query.where(table.c.created < cutoff)
+            query = query.order_by(table.c.id)
+            query = query.limit(batch_size)
+            rows = [dict(row._mapping) for row in dbsession.execute(query)]
+            if not rows:
+                dbsession.rollback()
+                break
+
+            for row in rows:
+                archive.write(serialize_row(row) + '\n')
+            archive.flush()
+            os.fsync(archive.fileno())
+
+            ids = [row['id'] for row in rows]
+            dbsession.execute(table.delete().where(table.c.id.in_(ids)))
+            dbsession.commit()
+
+            total += len(rows)
+            last_id = ids[-1]
+            LOG.debug('%s: archived %s rows up to id %s', table.name, total,
+                      last_id)
+            if sleep:
+                time.sleep(sleep)
+
+    if not total:
+        os.remove(path)
+    LOG.info('%s: archived %s rows older than %s to %s', table.name, total,
+             cutoff, path if total else 'nowhere')
+
+    return total
+
+def get_partitions(dbsession, table):
+    '''Return the (name, less_than) RANGE partitions of table, in order.
+    less_than is a unix timestamp, or None for the MAXVALUE partition. Returns
+    an empty list if table isn't partitioned.'''
+
+    rows = dbsession.execute(text(
+        'SELECT PARTITION_NAME, PARTITION_DESCRIPTION '
+        'FROM information_schema.PARTITIONS '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table '
+        'AND PARTITION_NAME IS NOT NULL '
+        'ORDER BY PARTITION_ORDINAL_POSITION'), {'table': table})
+
+    partitions = []
+    for name, description in rows:
+        if description == 'MAXVALUE':
+            partitions.append((name, None))
+        else:
+            partitions.append((name, int(description)))
+    return partitions
+
+def month_starts(start, count):
+    '''Return the first day of count months, starting with start's month.'''
+
+    resp = []
+    year, month = start.year, start.month
+    for _ in range(count):
+        resp.append(datetime(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return resp
+
+def partition_clause(month_start):
+    '''Return the partition holding the month before month_start.'''
+
+    previous = month_start - timedelta(days=1)
+    return "PARTITION p{0} VALUES LESS THAN (UNIX_TIMESTAMP('{1}'))".format(
+        previous.strftime('%Y%m'), month_start.strftime('%Y-%m-%d'))
+
+def partition_ddl(table, oldest, months_ahead, now=None):
+    '''Return the statements that partition table by month of created, from
+    the month of oldest to months_ahead months from now.
+
+    MySQL needs the partitioning column in every unique key, so the primary
+    key becomes (id, created). Both statements rebuild the table. Run them
+    with an online schema change tool on a busy server.'''
+
+    now = now or datetime.utcnow()
+    months = (now.year - oldest.year) * 12 + now.month - oldest.month
+    bounds = month_starts(oldest, months + months_ahead + 2)[1:]
+    clauses = [partition_clause(bound) for bound in bounds]
+    clauses.append('PARTITION pmax VALUES LESS THAN MAXVALUE')
+
+    return [
+        'ALTER TABLE {0} DROP PRIMARY KEY, ADD PRIMARY KEY (id, created)'.format(table),
+        'ALTER TABLE {0} PARTITION BY RANGE (UNIX_TIMESTAMP(created)) (\n    {1}\n)'.format(
+            table, ',\n    '.join(clauses)),
+    ]
+
+def partition_is_empty(dbsession, table, partition):
+    '''Return True if partition of table has no rows.'''
+
+    row = dbsession.execute(text('SELECT 1 FROM {0} PARTITION ({1}) LIMIT 1'.format(
+        table, partition))).first()
+    return row is None
+
+def maintain_partitions(dbsession, model, cutoff, months_ahead, print_ddl,
+                        dry_run=False):
+    '''Add the monthly partitions of model's table for the next months_ahead
+    months by splitting the empty MAXVALUE partition, and drop the empty
+    partitions that are entirely older than cutoff. Both are metadata
+    changes. Tables that aren't partitioned are left alone, and their
+    partitioning DDL is printed if print_ddl is set.'''
+
+    table = model.__tablename__
+    partitions = get_partitions(dbsession, table)
+
+    if not partitions:
+        LOG.info('%s: not partitioned', table)
+        if print_ddl:
+            oldest = dbsession.execute(text(
+                'SELECT MIN(created) FROM {0}'.format(table))).scalar()
+            for statement in partition_ddl(table, oldest or datetime.utcnow(),
+                                           months_ahead):
+                print('{0};'.format(statement))
+        dbsession.rollback()
+        return
+
+    statements = []
+    names = [name for name, _ in partitions]
+    if names[-1] != 'pmax':
+        LOG.warning('%s: has no pmax partition, not adding partitions', table)
+    else:
+        last_bound = max([bound for _, bound in partitions if bound] or [0])
+        wanted = [bound for bound in
+                  month_starts(datetime.utcnow(), months_ahead + 2)[1:]
+                  if time.mktime(bound.timetuple()) > last_bound]
+        if wanted:
+            clauses = [partition_clause(bound) for bound in wanted]
+            clauses.append('PARTITION pmax VALUES LESS THAN MAXVALUE')
+            statements.append(
+                'ALTER TABLE {0} REORGANIZE PARTITION pmax INTO ({1})'.format(
+                    table, ', '.join(clauses)))
+
+    if cutoff:
+        cutoff_ts = time.mktime(cutoff.timetuple())
+        for name, bound in partitions[:-1]:
+            if bound and bound <= cutoff_ts:
+                if partition_is_empty(dbsession, table, name):
+                    statements.append('ALTER TABLE {0} DROP PARTITION {1}'.format(
+                        table, name))
+                else:
+                    LOG.info('%s: partition %s is past retention but not '
+                             'archived yet, keeping it', table, name)
+
+    dbsession.rollback()
+    for statement in statements:
+        LOG.info('%s: %s', table, statement)
+        if dry_run:
+            continue
+        dbsession.execute(text('SET SESSION lock_wait_timeout = {0}'.format(
+            DDL_LOCK_WAIT_TIMEOUT)))
+        dbsession.execute(text(statement))
+        dbsession.commit()
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Archive and partition the Arsenal audit tables.')
+    parser.add_argument(
+        'config_uri',
+        help='Configuration file, e.g., development.ini',
+    )
+    parser.add_argument(
+        '--table',
+        action='append',
+        help='Only work on this audit table. Can be given more than once.',
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Report what would be done without changing anything.',
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    archive = subparsers.add_parser(
+        'archive',
+        help='Move rows past retention to gzipped json lines files.',
+    )
+    archive.add_argument(
+        '--sleep',
+        type=float,
+        default=0.1,
+        help='Seconds to pause between batches. Default: 0.1',
+    )
+
+    partition = subparsers.add_parser(
+        'partition',
+        help='Add upcoming monthly partitions and drop archived ones.',
+    )
+    partition.add_argument(
+        '--months-ahead',
+        type=int,
+        default=3,
+        help='Number of future monthly partitions to keep. Default: 3',
+    )
+    partition.add_argument(
+        '--print-ddl',
+        action='store_true',
+        help='Print the DDL to partition the tables that are not partitioned.',
+    )
+
+    return parser.parse_args(argv[1:])
+
+def main(argv=sys.argv):
+    args = parse_args(argv)
+    setup_logging(args.config_uri)
+    env = bootstrap(args.config_uri)
+    settings = env['registry'].settings
+
+    audit_models = [model for model in get_audit_models() if
+                    not args.table or model.__tablename__ in args.table]
+
+    dbsession = env['registry']['dbsession_factory']()
+    try:
+        for model in audit_models:
+            cutoff = get_cutoff(settings, model.__tablename__)
+
+            if args.command == 'archive':
+                if not cutoff:
+                    LOG.info('%s: no retention set, skipping', model.__tablename__)
+                    continue
+                archive_dir = settings.get('arsenal.audit.archive_dir', '.')
+                batch_size = int(settings.get('arsenal.audit.archive_batch_size', 1000))
+                if not args.dry_run:
+                    os.makedirs(archive_dir, exist_ok=True)
+                archive_table(dbsession, model, cutoff, archive_dir, batch_size,
+                              args.sleep, dry_run=args.dry_run)
+
+            if args.command == 'partition':
+                maintain_partitions(dbsession, model, cutoff, args.months_ahead,
+                                    args.print_ddl, dry_run=args.dry_run)
+    finally:
+        dbsession.close()
+        env['closer']()
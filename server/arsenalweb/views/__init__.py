@@ -17,11 +17,13 @@ import logging
 import grp
 import pwd
 import pam
+from urllib.parse import urlencode
 from pyramid.renderers import get_renderer
 from pyramid.httpexceptions import HTTPFound
 from pyramid.authorization import Authenticated
 #from pyramid.session import signed_deserialize
 #from pyramid_ldap import groupfinder as ldap_groupfinder
+from pyramid.request import Request
 from pyramid.response import Response
 from sqlalchemy.orm.exc import NoResultFound
 import requests
@@ -34,7 +36,9 @@ from arsenalweb.models.common import (
 LOG = logging.getLogger(__name__)
 
 def _api_get(request, uri, payload=None):
-    '''GET request to the API.'''
+    '''GET request to the API. Dispatched in process as a subrequest, so it
+    shares the database session and transaction of the calling request
+    instead of making a new http connection back to ourselves.'''
 
     # Don't override fields if they are passed. Allows large objects to be
     # filtered down if need be without having to specify fields everywhere.
@@ -44,26 +48,31 @@ def _api_get(request, uri, payload=None):
     else:
         payload = {'fields': 'all'}
 
-    verify_ssl = request.registry.settings['arsenal.verify_ssl']
-    if verify_ssl == 'False':
-        verify_ssl = False
-    api_protocol = request.registry.settings['arsenal.api_protocol']
-    api_host = request.host
-
-    api_url = '{0}://{1}{2}'.format(api_protocol, api_host, uri)
-
-    LOG.info('Requesting data from API: {0} params: {1}'.format(api_url, payload))
-    resp = requests.get(api_url, verify=verify_ssl, params=payload)
-
-    if resp.status_code == requests.codes.ok:
-        LOG.debug('Response data: {0}'.format(resp.json()))
-        return resp.json()
-    elif resp.status_code == requests.codes.not_found:
+    api_url = '{0}?{1}'.format(uri, urlencode(payload, doseq=True))
+
+    LOG.info('Requesting data from API: {0}'.format(api_url))
+    subrequest = Request.blank(api_url, base_url=request.application_url)
+    # Same credentials as the calling request.
+    if 'Cookie' in request.headers:
+        subrequest.headers['Cookie'] = request.headers['Cookie']
+    if 'Authorization' in request.headers:
+        subrequest.headers['Authorization'] = request.headers['Authorization']
+    # Picked up by request.dbsession and pyramid_tm in place of new ones.
+    subrequest.environ['app.dbsession'] = request.dbsession
+    subrequest.environ['tm.active'] = True
+    subrequest.environ['tm.manager'] = request.tm
+
+    resp = request.invoke_subrequest(subrequest, use_tweens=False)
+
+    if resp.status_int == 200:
+        LOG.debug('Response data: {0}'.format(resp.json_body))
+        return resp.json_body
+    elif resp.status_int == 404:
         LOG.warn('404: Object not found.')
     else:
         msg = 'There was an error querying the API: ' \
-              'http_status_code={0},reason={1},request={2}'.format(resp.status_code,
-                                                                   resp.reason,
+              'http_status_code={0},reason={1},request={2}'.format(resp.status_int,
+                                                                   resp.status,
                                                                    api_url)
         LOG.error(msg)
         raise RuntimeError(msg)
@@ -163,12 +172,14 @@ def get_pag_params(request):
 
     return (perpage, offset)
 
-def get_nav_urls(path, offset, perpage, total, payload=None):
-    '''Format and return navigation urls.'''
+def get_nav_urls(path, offset, perpage, total, payload=None, next_cursor=None):
+    '''Format and return navigation urls. If the API returned a next_cursor,
+    the next link uses it so the following page is fetched by keyset instead
+    of scanning past the offset. start is still passed along for display.'''
 
     nav_urls = {}
 
-    skip_keys = ['start', 'perpage', 'fields']
+    skip_keys = ['after', 'start', 'perpage', 'fields']
     for key in skip_keys:
         try:
             del payload[key]
@@ -178,7 +189,8 @@ def get_nav_urls(path, offset, perpage, total, payload=None):
     nav_start = '{0}?start={1}'.format(path, 0)
     nav_prev = '{0}?start={1}'.format(path, offset - perpage)
     nav_next = '{0}?start={1}'.format(path, offset + perpage)
-    nav_end = '{0}?start={1}'.format(path, (total-1)/perpage*perpage)
+    if next_cursor:
+        nav_next += '&after={0}'.format(next_cursor)
 
     key_params = ''
     for key, val in payload.items():
@@ -187,6 +199,15 @@ def get_nav_urls(path, offset, perpage, total, payload=None):
     nav_urls['nav_start'] = '{0}{1}'.format(nav_start, key_params)
     nav_urls['nav_prev'] = '{0}{1}'.format(nav_prev, key_params)
     nav_urls['nav_next'] = '{0}{1}'.format(nav_next, key_params)
+
+    # total is None when the count was skipped with count=false. There is no
+    # last page to link to then, and only the next cursor says if there are
+    # more results.
+    if total is None:
+        nav_urls['next_disable'] = not next_cursor
+        return nav_urls
+
+    nav_end = '{0}?start={1}'.format(path, (total-1)//perpage*perpage)
     nav_urls['nav_end'] = '{0}{1}'.format(nav_end, key_params)
 
     nav_urls['next_disable'] = False
@@ -98,13 +98,16 @@ def view_all_audit(request):
     resp = _api_get(request, uri, payload)
 
     total = 0
+    next_cursor = None
     objects_audit = []
 
     if resp:
         total = resp['meta']['total']
+        next_cursor = resp['meta'].get('next')
         objects_audit = resp['results']
 
-    nav_urls = get_nav_urls(request.path, offset, perpage, total, payload)
+    nav_urls = get_nav_urls(request.path, offset, perpage, total, payload,
+                            next_cursor=next_cursor)
 
     # Used by the columns menu to determine what to show/hide.
     column_selectors = [
@@ -0,0 +1,87 @@
+'''Arsenal API audit writer.'''
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import logging
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+LOG = logging.getLogger(__name__)
+
+
+def add_audit(dbsession, model, object_id=None, field=None, old_value=None,
+              new_value=None, updated_by=None, created=None):
+    '''Buffer an audit row for model on dbsession. Buffered rows are written
+    with one multi row INSERT per audit table when the transaction commits,
+    instead of one ORM flush each.
+
+    dbsession : The session making the change.
+    model     : The audit model to write to, e.g. NodeAudit.
+    The rest are the audit columns. created defaults to now.
+    '''
+
+    row = {
+        'object_id': object_id,
+        'field': field,
+        'old_value': old_value,
+        'new_value': new_value,
+        'updated_by': updated_by,
+        'created': created or datetime.utcnow(),
+    }
+    dbsession.info.setdefault('audit_buffer', []).append((model, row))
+
+def write_audits(dbsession):
+    '''Write every buffered audit row now, one INSERT per audit table.'''
+
+    pending = dbsession.info.pop('audit_buffer', None)
+    dbsession.info.pop('audit_marks', None)
+    if not pending:
+        return
+
+    tables = {}
+    for model, row in pending:
+        tables.setdefault(model, []).append(row)
+
+    for model, rows in tables.items():
+        LOG.debug('Writing %s rows to %s', len(rows), model.__tablename__)
+        dbsession.execute(model.__table__.insert(), rows)
+
+@event.listens_for(Session, 'before_commit')
+def flush_audits(session):
+    '''Write the buffered audit rows as part of the commit. A savepoint
+    release leaves them buffered for the outer transaction.'''
+
+    if not session.in_nested_transaction():
+        write_audits(session)
+
+@event.listens_for(Session, 'after_transaction_create')
+def mark_audits(session, session_transaction):
+    '''Remember how many audit rows were buffered when a savepoint began.'''
+
+    if session_transaction.nested:
+        marks = session.info.setdefault('audit_marks', {})
+        marks[session_transaction] = len(session.info.get('audit_buffer', []))
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_audits(session, previous_transaction):
+    '''Drop the audit rows buffered by a transaction that rolled back.'''
+
+    if previous_transaction.nested:
+        mark = session.info.get('audit_marks', {}).pop(previous_transaction, None)
+        if mark is not None:
+            del session.info.get('audit_buffer', [])[mark:]
+    elif previous_transaction.parent is None:
+        session.info.pop('audit_buffer', None)
+        session.info.pop('audit_marks', None)
@@ -0,0 +1,162 @@
+'''Arsenal API bulk audit history.'''
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from pyramid.view import view_config
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from arsenalweb.models.common import (
+    BaseAudit,
+    )
+from arsenalweb.views.api.common import (
+    PRELOAD_CHUNK_SIZE,
+    api_200,
+    api_400,
+    api_404,
+    api_500,
+    )
+
+LOG = logging.getLogger(__name__)
+
+# Formats accepted for the since and until parameters.
+DATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d',
+]
+
+def find_audit_model(object_type):
+    '''Return the audit model for object_type, e.g. nodes, or None.'''
+
+    for model in BaseAudit.__subclasses__():
+        if model.__tablename__ == '{0}_audit'.format(object_type):
+            return model
+    return None
+
+def parse_date(value):
+    '''Return value as a UTC datetime. Raises ValueError if it is not in one
+    of DATE_FORMATS.'''
+
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise ValueError('Invalid date: {0}, expected YYYY-MM-DD or '
+                     'YYYY-MM-DD HH:MM:SS'.format(value))
+
+def parse_object_ids(value):
+    '''Return a list of unique ids from a comma separated string, in order.
+    Raises ValueError if any are not integers.'''
+
+    object_ids = []
+    for object_id in value.split(','):
+        object_id = int(object_id)
+        if object_id not in object_ids:
+            object_ids.append(object_id)
+    return object_ids
+
+def find_audit_history(dbsession, model, object_ids, limit=None, since=None,
+                       until=None):
+    '''Return the audit rows of model for every id in object_ids with one
+    query, oldest first.
+
+    limit: Only return the most recent limit rows for each object.
+    since: Only return rows created at or after this datetime.
+    until: Only return rows created before this datetime.
+    '''
+
+    query = dbsession.query(model)
+    query = query.filter(model.object_id.in_(object_ids))
+    if since:
+        query = query.filter(model.created >= since)
+    if until:
+        query = query.filter(model.created < until)
+
+    if limit:
+        # Number each object's rows newest first and keep the first limit of
+        # them, rather than one query per object.
+        row_number = func.row_number().over(partition_by=model.object_id,
+                                            order_by=(model.created.desc(),
+                                                      model.id.desc()))
+        ranked = query.add_columns(row_number.label('row_number')).subquery()
+        audit = aliased(model, ranked)
+        query = dbsession.query(audit)
+        query = query.filter(ranked.c.row_number <= limit)
+        model = audit
+
+    query = query.order_by(model.object_id, model.created, model.id)
+
+    return query.all()
+
+@view_config(route_name='api_b_audit', request_method='GET', renderer='json')
+def api_b_audit(request):
+    '''Audit history for many objects of one type at once, e.g.
+    /api/bulk/audit/nodes?object_ids=1,2,3. Returns a list with one
+    object_id and its audit_history for every id asked for, in the same
+    order.
+
+    Optional request parameters:
+
+    limit: Only return the most recent limit audit rows for each object.
+    since: Only return audit rows created at or after this UTC date.
+    until: Only return audit rows created before this UTC date.
+    '''
+
+    object_type = request.matchdict['object_type']
+    model = find_audit_model(object_type)
+    if not model:
+        return api_404(msg='No audit history for: {0}'.format(object_type))
+
+    try:
+        try:
+            object_ids = parse_object_ids(request.GET['object_ids'])
+            limit = int(request.GET.get('limit', 0))
+            since = request.GET.get('since')
+            since = parse_date(since) if since else None
+            until = request.GET.get('until')
+            until = parse_date(until) if until else None
+        except KeyError:
+            return api_400(msg='Missing required parameter: object_ids')
+        except ValueError as ex:
+            return api_400(msg='Bad Request. {0}'.format(ex))
+
+        if len(object_ids) > PRELOAD_CHUNK_SIZE:
+            return api_400(msg='Bad Request. At most {0} object_ids can be '
+                           'asked for at once.'.format(PRELOAD_CHUNK_SIZE))
+
+        LOG.debug('Searching %s for %s objects', model.__tablename__,
+                  len(object_ids))
+        audits = find_audit_history(request.dbsession, model, object_ids,
+                                    limit=limit, since=since, until=until)
+
+        history = OrderedDict((object_id, []) for object_id in object_ids)
+        for audit in audits:
+            history[audit.object_id].append(audit.__json__(request))
+
+        results = [{'object_id': object_id, 'audit_history': rows} for
+                   object_id, rows in history.items()]
+
+    except Exception as ex:
+        msg = 'Error querying bulk audit url: {0} exception: {1}'.format(request.url,
+                                                                         repr(ex))
+        LOG.error(msg)
+        return api_500(msg=msg)
+
+    return api_200(total=len(results),
+                   result_count=len(results),
+                   results=results)
@@ -0,0 +1,221 @@
+'''Arsenal API bulk ENC for puppet.'''
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import logging
+from collections import defaultdict
+from pyramid.view import view_config
+from arsenalweb.models.common import (
+    node_group_assignments,
+    tag_data_center_assignments,
+    tag_node_assignments,
+    tag_node_group_assignments,
+    )
+from arsenalweb.models.node_groups import (
+    NodeGroup,
+    )
+from arsenalweb.models.nodes import (
+    Node,
+    )
+from arsenalweb.models.statuses import (
+    Status,
+    )
+from arsenalweb.models.tags import (
+    Tag,
+    )
+from arsenalweb.views.api.common import (
+    PRELOAD_CHUNK_SIZE,
+    api_200,
+    api_400,
+    api_500,
+    api_501,
+    process_search,
+    valiate_parameters,
+    )
+from arsenalweb.views.api.enc import (
+    get_enc_status_ids,
+    merge_enc_tags,
+    new_enc_results,
+    process_tags,
+    )
+
+LOG = logging.getLogger(__name__)
+
+def chunked(ids):
+    '''Split a list of ids into lists small enough for an IN clause.'''
+
+    ids = list(ids)
+    for i in range(0, len(ids), PRELOAD_CHUNK_SIZE):
+        yield ids[i:i + PRELOAD_CHUNK_SIZE]
+
+def find_tags_by_owner(dbsession, assignments, owner_col, owner_ids):
+    '''Return a dict of owner id to list of tags for all owner_ids, using one
+    query per chunk of ids instead of one per owner.'''
+
+    tags = defaultdict(list)
+    for chunk in chunked(owner_ids):
+        query = dbsession.query(owner_col, Tag)
+        query = query.join(Tag, Tag.id == assignments.c.tag_id)
+        query = query.filter(owner_col.in_(chunk))
+        for owner_id, tag in query:
+            tags[owner_id].append(tag)
+
+    return tags
+
+def process_bulk_enc(dbsession, settings, params, param_sources=False):
+    '''Process enc for all nodes matching params, a list of search parameter
+    tuples. Uses the same precedence as process_node_enc, from least to most
+    specific:
+
+        node_group
+        data_center
+        node
+
+    but fetches each level for every node at once. Returns a list of enc
+    results sorted by node name.'''
+
+    status_ids = get_enc_status_ids(settings)
+    exact_get = dict(params).get('exact_get')
+
+    # Same as api_read_by_params, excludes go last.
+    exclude_params = sorted([x for x in params if x[0].startswith('ex_')])
+    include_params = sorted([x for x in params if not x[0].startswith('ex_')])
+
+    query = dbsession.query(Node)
+    query = process_search(query, include_params, 'Node', exact_get)
+    if exclude_params:
+        query = process_search(query, exclude_params, 'Node', exact_get)
+    query = query.filter(Node.status_id.in_(status_ids))
+    query = query.with_entities(Node.id,
+                                Node.name,
+                                Node.data_center_id,
+                                Node.status_id)
+    # Searching on node_group or tags can join more than one row per node.
+    query = query.distinct()
+    query = query.order_by(Node.name)
+
+    LOG.debug('Bulk ENC find the nodes...')
+    nodes = query.all()
+    LOG.debug('Bulk ENC found %s nodes', len(nodes))
+    if not nodes:
+        return []
+
+    statuses = dict(dbsession.query(Status.id, Status.name).filter(
+        Status.id.in_(set([n.status_id for n in nodes]))))
+
+    node_ids = [n.id for n in nodes]
+
+    LOG.debug('Bulk ENC find node_groups...')
+    node_groups = defaultdict(list)
+    for chunk in chunked(node_ids):
+        query = dbsession.query(node_group_assignments.c.node_id,
+                                NodeGroup.id,
+                                NodeGroup.name)
+        query = query.join(NodeGroup,
+                           NodeGroup.id == node_group_assignments.c.node_group_id)
+        query = query.filter(node_group_assignments.c.node_id.in_(chunk))
+        for node_id, node_group_id, node_group_name in query:
+            node_groups[node_id].append((node_group_id, node_group_name))
+
+    node_group_ids = set([ng[0] for ngs in node_groups.values() for ng in ngs])
+    data_center_ids = set([n.data_center_id for n in nodes if n.data_center_id])
+
+    LOG.debug('Bulk ENC find tags...')
+    node_group_tags = find_tags_by_owner(dbsession,
+                                         tag_node_group_assignments,
+                                         tag_node_group_assignments.c.node_group_id,
+                                         node_group_ids)
+    data_center_tags = find_tags_by_owner(dbsession,
+                                          tag_data_center_assignments,
+                                          tag_data_center_assignments.c.data_center_id,
+                                          data_center_ids)
+    node_tags = find_tags_by_owner(dbsession,
+                                   tag_node_assignments,
+                                   tag_node_assignments.c.node_id,
+                                   node_ids)
+    LOG.debug('Bulk ENC find tags complete.')
+
+    # Tags are shared by many nodes, only convert them once per owner.
+    node_group_params = dict((ng_id, process_tags(tags, 'node_group'))
+                             for ng_id, tags in node_group_tags.items())
+    data_center_params = dict((dc_id, process_tags(tags, 'data_center'))
+                              for dc_id, tags in data_center_tags.items())
+
+    all_results = []
+    for node in nodes:
+        results = new_enc_results(param_sources)
+        results['name'] = node.name
+        results['id'] = node.id
+        results['status'] = {
+            'name': statuses.get(node.status_id),
+            'id': node.status_id,
+        }
+
+        for node_group_id, node_group_name in node_groups[node.id]:
+            results['classes'].append(node_group_name)
+            merge_enc_tags(results,
+                           node_group_params.get(node_group_id, {}),
+                           'node_group',
+                           param_sources)
+
+        merge_enc_tags(results,
+                       data_center_params.get(node.data_center_id, {}),
+                       'data_center',
+                       param_sources)
+        merge_enc_tags(results,
+                       process_tags(node_tags[node.id], 'node'),
+                       'node',
+                       param_sources)
+
+        all_results.append(results)
+
+    return all_results
+
+@view_config(route_name='api_b_enc', request_method='GET', renderer='json')
+def api_b_enc(request):
+    '''External node classifier for puppet for many nodes at once. Takes the
+    same search parameters as /api/nodes, for example 'name=web0001,web0002'
+    with 'exact_get=1', or none at all to export the enc for every node.
+    Tags are merged per node as in /api/enc. Optional request parameter
+    'param_sources' will add an additional key to each result that identifies
+    what level of the hierarchy each tag comes from. Returns a list.'''
+
+    settings = request.registry.settings
+    try:
+        # An empty param_sources is false, as it is for /api/enc.
+        param_sources = bool(request.params.get('param_sources'))
+        params = [x for x in request.GET.items() if x[0] != 'param_sources']
+
+        # No search parameters at all is a full export.
+        if params:
+            fail_validate = valiate_parameters(dict(params))
+            if fail_validate:
+                return api_400(msg=fail_validate)
+
+        LOG.debug('Starting bulk enc for: %s', request.url)
+        try:
+            results = process_bulk_enc(request.dbsession,
+                                       settings,
+                                       params,
+                                       param_sources=param_sources)
+        except (AttributeError, KeyError) as ex:
+            return api_501(msg=repr(ex))
+    except Exception as ex:
+        msg = 'Error calling bulk enc! Exception: {0}'.format(repr(ex))
+        LOG.error(msg)
+        return api_500(msg=msg)
+
+    return api_200(total=len(results),
+                   result_count=len(results),
+                   results=results)
@@ -28,6 +28,12 @@ from arsenalweb.views.api.common import (
     api_500,
     enforce_api_change_limit,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
+from arsenalweb.views.api.enc_cache import (
+    queue_enc_invalidation,
+    )
 from arsenalweb.views.api.nodes import (
     find_node_by_id,
     )
@@ -51,27 +57,24 @@ def remove_node_groups(dbsession, node_ids, user):
             for node_group in list(node.node_groups):
                 LOG.debug('Removing node_group: %s', node_group.name)
                 try:
-                    audit = NodeAudit(object_id=node.id,
-                                      field='node_group',
-                                      old_value=node_group.name,
-                                      new_value='deleted',
-                                      updated_by=user['name'],
-                                      created=utcnow)
-                    dbsession.add(audit)
                     LOG.debug('Trying to remove node_group: %s from '
                               'node: %s', node_group.name, node.name)
                     node.node_groups.remove(node_group)
                     LOG.debug('Successfully removed node_group: %s from '
                               'node: %s', node_group.name, node.name)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=node.id,
+                              field='node_group',
+                              old_value=node_group.name,
+                              new_value='deleted',
+                              updated_by=user['name'],
+                              created=utcnow)
                 except (ValueError, AttributeError) as ex:
                     LOG.debug('Died removing node_group: %s', ex)
-                    dbsession.remove(audit)
-                except Exception as ex:
-                    LOG.debug('Died removing node_group: %s', ex)
-                    dbsession.remove(audit)
 
             LOG.debug('Final node_groups: %s', [ng.name for ng in node.node_groups])
             dbsession.add(node)
+            queue_enc_invalidation(dbsession, node_ids=[node.id])
         dbsession.flush()
 
     except (NoResultFound, AttributeError):
@@ -0,0 +1,154 @@
+'''Arsenal API bulk node registration.'''
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import logging
+from pyramid.view import view_config
+from arsenalweb.models.nodes import (
+    Node,
+    )
+from arsenalweb.views.api.common import (
+    api_200,
+    api_400,
+    api_500,
+    )
+from arsenalweb.views.api.nodes import (
+    register_node,
+    )
+
+LOG = logging.getLogger(__name__)
+
+def get_bulk_register_chunk_size(settings):
+    '''Return the number of registrations that share their lookups from
+    arsenal.register.bulk_chunk_size. 0 processes a whole request as one
+    chunk.'''
+
+    try:
+        return int(settings['arsenal.register.bulk_chunk_size'])
+    except (KeyError, ValueError):
+        return 100
+
+def register_nodes(request, payloads, user_id, chunk_size):
+    '''Register a list of node registration payloads. Each payload runs in its
+    own savepoint so a bad one doesn't undo the rest. Payloads are processed
+    in chunks of chunk_size, which only bounds how long hardware_profile,
+    operating_system and data_center lookups are shared and how many
+    unchanged nodes have their ids fetched by one query. Every registration
+    is flushed as it is made. Returns a list with the outcome of every
+    payload, in order.
+
+    pyramid_tm commits the whole request in one transaction. Committing
+    chunks along the way would leave them applied if the request failed
+    later, and a retry of the request would apply them again.'''
+
+    dbsession = request.dbsession
+    settings = request.registry.settings
+    results = []
+
+    if not chunk_size:
+        chunk_size = len(payloads) or 1
+
+    for start in range(0, len(payloads), chunk_size):
+        chunk = payloads[start:start + chunk_size]
+        lookups = {}
+        unchanged = {}
+        LOG.info('Registering nodes %s to %s of %s', start + 1,
+                                                     start + len(chunk),
+                                                     len(payloads))
+
+        for payload in chunk:
+            try:
+                result = {
+                    'name': payload.get('name'),
+                    'unique_id': payload.get('unique_id'),
+                }
+            except AttributeError:
+                results.append({
+                    'code': 400,
+                    'error': 'Registration payload must be an object.',
+                    'result': 'failed',
+                })
+                continue
+
+            savepoint = dbsession.begin_nested()
+            try:
+                node = register_node(dbsession, settings, payload, user_id,
+                                     lookups=lookups)
+                savepoint.commit()
+                result['code'] = 200
+                if node is None:
+                    result['result'] = 'unchanged'
+                    unchanged[payload['unique_id'].lower().rstrip()] = result
+                else:
+                    result['result'] = 'registered'
+                    result['id'] = node.id
+                    result['name'] = node.name
+            except Exception as ex:
+                savepoint.rollback()
+                # Anything looked up or created in the savepoint is gone.
+                lookups.clear()
+                LOG.error('Error registering node: %s exception: %s',
+                          result['name'], repr(ex))
+                if isinstance(ex, (KeyError, TypeError, ValueError)):
+                    result['code'] = 400
+                else:
+                    result['code'] = 500
+                result['result'] = 'failed'
+                result['error'] = repr(ex)
+
+            results.append(result)
+
+        # One query to report the ids of all the nodes that took the fast path.
+        if unchanged:
+            query = dbsession.query(Node.unique_id, Node.id, Node.name)
+            query = query.filter(Node.unique_id.in_(list(unchanged)))
+            for unique_id, node_id, node_name in query:
+                unchanged[unique_id]['id'] = node_id
+                unchanged[unique_id]['name'] = node_name
+
+    return results
+
+@view_config(route_name='api_b_register', permission='api_register', request_method='PUT', renderer='json', require_csrf=False)
+def api_b_register(request):
+    '''Process registration requests for the /api/bulk/register route. Takes
+    a list of node registration payloads under the key 'nodes', the same as
+    would be sent to /api/register one at a time. Returns the outcome of each
+    one, in order.'''
+
+    try:
+        try:
+            payloads = request.json_body['nodes']
+            if not isinstance(payloads, list):
+                raise TypeError
+        except (KeyError, TypeError, ValueError):
+            msg = "Bad Request. Parameter 'nodes' must be a list of " \
+                  "registration payloads."
+            LOG.error(msg)
+            return api_400(msg=msg)
+
+        user = request.identity
+        chunk_size = get_bulk_register_chunk_size(request.registry.settings)
+
+        LOG.info('Bulk registering %s nodes', len(payloads))
+        results = register_nodes(request, payloads, user['name'], chunk_size)
+
+        return api_200(total=len(payloads),
+                       result_count=len(results),
+                       results=results)
+
+    except Exception as ex:
+        msg = 'Error bulk registering nodes API: {0} exception: ' \
+              '{1}'.format(request.url, repr(ex))
+        LOG.error(msg)
+        return api_500(msg=msg)
@@ -28,6 +28,12 @@ from arsenalweb.views.api.common import (
     api_500,
     enforce_api_change_limit,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
+from arsenalweb.views.api.enc_cache import (
+    queue_enc_invalidation,
+    )
 from arsenalweb.views.api.nodes import (
     find_node_by_id,
     )
@@ -51,27 +57,24 @@ def remove_tags(dbsession, node_ids, user):
             for tag in list(node.tags):
                 LOG.debug('Removing tag: %s=%s', tag.name, tag.value)
                 try:
-                    audit = NodeAudit(object_id=node.id,
-                                      field='tag',
-                                      old_value='{0}={1}'.format(tag.name, tag.value),
-                                      new_value='deleted',
-                                      updated_by=user['name'],
-                                      created=utcnow)
-                    dbsession.add(audit)
                     LOG.debug('Trying to remove tag: %s=%s from '
                               'node: %s', tag.name, tag.value, node.name)
                     node.tags.remove(tag)
                     LOG.debug('Successfully removed tag: %s=%s from '
                               'node: %s', tag.name, tag.value, node.name)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=node.id,
+                              field='tag',
+                              old_value='{0}={1}'.format(tag.name, tag.value),
+                              new_value='deleted',
+                              updated_by=user['name'],
+                              created=utcnow)
                 except (ValueError, AttributeError) as ex:
                     LOG.debug('Died removing tag: %s', ex)
-                    dbsession.remove(audit)
-                except Exception as ex:
-                    LOG.debug('Died removing tag: %s', ex)
-                    dbsession.remove(audit)
 
             LOG.debug('Final tags: %s', [tag.name for tag in node.tags])
             dbsession.add(node)
+            queue_enc_invalidation(dbsession, node_ids=[node.id])
         dbsession.flush()
 
     except (NoResultFound, AttributeError):
@@ -26,8 +26,12 @@ from arsenalweb.views.api.common import (
     api_400,
     api_404,
     api_500,
+    clear_registration_fingerprints,
     enforce_api_change_limit,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
 from arsenalweb.views.api.nodes import (
     find_node_by_id,
     )
@@ -51,34 +55,32 @@ def remove_guest_vms(dbsession, node_ids, user):
             for guest_vm in list(node.guest_vms):
                 LOG.debug('Removing guest_vm : %s', guest_vm.name)
                 try:
-                    audit_hv = NodeAudit(object_id=node.id,
-                                         field='guest_vm',
-                                         old_value=guest_vm.name,
-                                         new_value='deassigned',
-                                         updated_by=user['name'],
-                                         created=utcnow)
-                    audit_guest = NodeAudit(object_id=guest_vm.id,
-                                            field='hypervisor',
-                                            old_value=node.name,
-                                            new_value='deassigned',
-                                            updated_by=user['name'],
-                                            created=utcnow)
-                    dbsession.add(audit_hv)
-                    dbsession.add(audit_guest)
-
                     LOG.debug('Trying to remove guest_vm: %s from '
                               'node: %s', guest_vm.name, node.name)
                     node.guest_vms.remove(guest_vm)
                     LOG.debug('Successfully removed guest_vm: %s from '
                               'node: %s', guest_vm.name, node.name)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=node.id,
+                              field='guest_vm',
+                              old_value=guest_vm.name,
+                              new_value='deassigned',
+                              updated_by=user['name'],
+                              created=utcnow)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=guest_vm.id,
+                              field='hypervisor',
+                              old_value=node.name,
+                              new_value='deassigned',
+                              updated_by=user['name'],
+                              created=utcnow)
                 except (ValueError, AttributeError) as ex:
-                    LOG.debug('Died removing node_group: %s', ex)
-                    dbsession.remove(audit_hv)
-                    dbsession.remove(audit_guest)
+                    LOG.debug('Died removing guest_vm: %s', ex)
 
             LOG.debug('Final guest_vms: %s', [gvm.name for gvm in node.guest_vms])
             dbsession.add(node)
         dbsession.flush()
+        clear_registration_fingerprints(dbsession, node_ids)
 
     except (NoResultFound, AttributeError):
         return api_404(msg='node not found')
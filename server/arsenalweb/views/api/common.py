@@ -14,19 +14,34 @@
 #  limitations under the License.
 #
 import re
+import json
+import base64
 import logging
 from datetime import datetime
 from pyramid.view import view_config
 from pyramid.response import Response
+from pyramid.threadlocal import RequestContext
 from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy import and_
 from sqlalchemy import or_
+from sqlalchemy import inspect
+from sqlalchemy.orm import (
+    Bundle,
+    joinedload,
+    lazyload,
+    load_only,
+    )
 from sqlalchemy.orm.dynamic import AppenderQuery
 #import arsenalweb.models
 from arsenalweb.models.common import (
     Group,
     User,
     get_name_id_list,
+    hypervisor_vm_assignments,
     localize_date,
+    network_interface_assignments,
+    node_group_assignments,
+    tag_node_assignments,
     )
 from arsenalweb.models.data_centers import (
     DataCenter,
@@ -87,6 +102,15 @@ from arsenalweb.models.tags import (
 from arsenalweb.views import (
     get_pag_params,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
+from arsenalweb.views.api.dimension_cache import (
+    queue_dimension_invalidation,
+    )
+from arsenalweb.views.api.enc_cache import (
+    queue_enc_invalidation,
+    )
 
 LOG = logging.getLogger(__name__)
 # Add fields to this list to enable > < filtering on search results. All fields
@@ -98,9 +122,27 @@ DATETIME_FIELDS = [
     'received_date',
     'updated',
 ]
+# Characters that make a search value a regular expression instead of a
+# literal string.
+REGEX_META_CHARS = set('.^$*+?()[]{}|\\')
+# Number of rows fetched from the database at a time when streaming results.
+STREAM_CHUNK_SIZE = 500
+# Maximum number of ids in a single IN () when preloading relationships.
+PRELOAD_CHUNK_SIZE = 1000
+# The fields each model's __json__() always returns. Searches on these models
+# only load the columns and joined relationships that are asked for in the
+# fields parameter. Models that are not listed are always fully loaded.
+PROJECTION_DEFAULT_FIELDS = {
+    'Node': [
+        'id',
+        'name',
+        'unique_id',
+    ],
+}
 
 # Common functions
-def api_return_json(http_code, msg, total=0, result_count=0, results=None):
+def api_return_json(http_code, msg, total=0, result_count=0, results=None,
+                    next_cursor=None):
     '''Json format http responses with metadata added. If passed a tuple,
     list, dict or set, return a Response object. Otherwise return a
     dictionary that can be filtered through the model to render objects. Allows
@@ -115,6 +157,8 @@ def api_return_json(http_code, msg, total=0, result_count=0, results=None):
       total        : An int that is the total number of results.
       result_count : An int that is the number of results returned by the
           current query. This is a subset of the total when pagination is used.
+      next_cursor  : An opaque string the client can pass back as the after
+          parameter to fetch the next page. Only included in the meta when set.
     '''
 
     if not results:
@@ -137,6 +181,9 @@ def api_return_json(http_code, msg, total=0, result_count=0, results=None):
         'results': res
     }
 
+    if next_cursor:
+        resp['meta']['next'] = next_cursor
+
     try:
         if not results or isinstance(res[0], (tuple, list, dict, set)):
             LOG.debug('Returning requests.Response...')
@@ -149,10 +196,17 @@ def api_return_json(http_code, msg, total=0, result_count=0, results=None):
         LOG.debug('Returning single model rendered instance type: {0}'.format(type(results)))
         return resp
 
-def api_200(msg='Command Successful', total=1, result_count=1, results=None):
+def api_200(msg='Command Successful', total=1, result_count=1, results=None,
+            next_cursor=None):
     '''Return json formatted 200.'''
 
-    return api_return_json(200, msg, total=total, result_count=result_count, results=results)
+    return api_return_json(200, msg, total=total, result_count=result_count,
+                           results=results, next_cursor=next_cursor)
+
+def api_202(msg='Accepted', results=None):
+    '''Return json formatted 202.'''
+
+    return api_return_json(202, msg, total=1, result_count=1, results=results)
 
 def api_400(msg='Bad Request'):
     '''Return json formatted 400.'''
@@ -294,14 +348,280 @@ def enforce_api_change_limit(request, item_count):
     LOG.debug('Item count %d is fewer than change_limit: %d, allowing.')
     return False
 
+def encode_cursor(sort_key, sort_val, obj_id):
+    '''Build the opaque keyset pagination token returned in meta['next'].
+
+    Args:
+        sort_key: The name of the column the results are sorted on.
+        sort_val: The value of sort_key on the last row of the current page.
+        obj_id  : The id of the last row of the current page.
+    '''
+
+    if isinstance(sort_val, datetime):
+        sort_val = sort_val.strftime('%Y-%m-%d %H:%M:%S')
+
+    token = json.dumps([sort_key, sort_val, obj_id])
+
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+
+def decode_cursor(token):
+    '''Decode a keyset pagination token created by encode_cursor(). Returns a
+    tuple of (sort_key, sort_val, obj_id), raises ValueError if the token is
+    not valid.'''
+
+    try:
+        sort_key, sort_val, obj_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        obj_id = int(obj_id)
+    except (TypeError, ValueError, UnicodeEncodeError):
+        raise ValueError('Invalid pagination cursor: {0}'.format(token))
+
+    return sort_key, sort_val, obj_id
+
+def project_query(query, model_type, fields, sort_key='id'):
+    '''Limit what a search loads to what the fields parameter asks for. Only
+    the default and requested columns are selected, and the model's joined
+    relationships are only joined when requested. Everything else is left to
+    load lazily on access. Return a sqlalchemy query object.'''
+
+    if fields == 'all' or model_type not in PROJECTION_DEFAULT_FIELDS:
+        return query
+
+    global_model = globals()[model_type]
+    mapper = inspect(global_model)
+    requested = fields.split(',') if fields else []
+
+    columns = set(PROJECTION_DEFAULT_FIELDS[model_type])
+    columns.add(sort_key)
+    columns.update(field for field in requested if field in mapper.columns)
+
+    options = []
+    for rel in mapper.relationships:
+        if rel.lazy != 'joined':
+            continue
+        if rel.key in requested:
+            # The foreign keys are needed to serialize the relationship.
+            columns.update(col.key for col in rel.local_columns)
+            options.append(joinedload(getattr(global_model, rel.key)))
+        else:
+            options.append(lazyload(getattr(global_model, rel.key)))
+
+    LOG.debug('Projecting %s search to columns: %s', model_type, sorted(columns))
+    options.append(load_only(*[getattr(global_model, col) for col in sorted(columns)]))
+
+    return query.options(*options)
+
+def preload_relationships(dbsession, model_type, objs, fields):
+    '''Batch load the dynamic relationships that will be serialized for a
+    list of search results. Currently only Node has relationships that are
+    worth preloading.'''
+
+    if model_type == 'Node':
+        preload_node_relationships(dbsession, objs, fields)
+
+def preload_node_relationships(dbsession, nodes, fields):
+    '''Load the dynamic relationships serialized by Node.__json__() for a list
+    of nodes with one IN query per relationship, instead of one query per node
+    per relationship. The results are stashed on each node and picked up by
+    Node.get_related().
+
+    Args:
+        dbsession: The session the nodes were loaded with.
+        nodes    : A list of Node objects.
+        fields   : The fields request parameter, or None if it was not passed.
+    '''
+
+    if not fields or not nodes:
+        return
+
+    # relationship: (association table, node column, target column, target
+    # model, what to select). guest_vms and hypervisor only need name and id,
+    # so skip loading full Node objects with all their joins.
+    relationships = {
+        'guest_vms': (hypervisor_vm_assignments,
+                      hypervisor_vm_assignments.c.hypervisor_id,
+                      hypervisor_vm_assignments.c.guest_vm_id,
+                      Node,
+                      Bundle('guest_vm', Node.id, Node.name)),
+        'hypervisor': (hypervisor_vm_assignments,
+                       hypervisor_vm_assignments.c.guest_vm_id,
+                       hypervisor_vm_assignments.c.hypervisor_id,
+                       Node,
+                       Bundle('hypervisor', Node.id, Node.name)),
+        'network_interfaces': (network_interface_assignments,
+                               network_interface_assignments.c.node_id,
+                               network_interface_assignments.c.network_interface_id,
+                               NetworkInterface,
+                               NetworkInterface),
+        'node_groups': (node_group_assignments,
+                        node_group_assignments.c.node_id,
+                        node_group_assignments.c.node_group_id,
+                        NodeGroup,
+                        NodeGroup),
+        'tags': (tag_node_assignments,
+                 tag_node_assignments.c.node_id,
+                 tag_node_assignments.c.tag_id,
+                 Tag,
+                 Tag),
+    }
+
+    if fields == 'all':
+        wanted = list(relationships)
+    else:
+        wanted = [f for f in fields.split(',') if f in relationships]
+        # Node.__json__() checks the hypervisor when there are no guest_vms.
+        if 'guest_vms' in wanted and 'hypervisor' not in wanted:
+            wanted.append('hypervisor')
+
+    if not wanted:
+        return
+
+    nodes_by_id = {}
+    for node in nodes:
+        node._preloaded = dict((rel, []) for rel in wanted)
+        nodes_by_id[node.id] = node
+    node_ids = list(nodes_by_id)
+
+    LOG.debug('Preloading %s for %s nodes', wanted, len(node_ids))
+    for rel in wanted:
+        assoc, node_col, target_col, target_model, target = relationships[rel]
+        for index in range(0, len(node_ids), PRELOAD_CHUNK_SIZE):
+            chunk = node_ids[index:index + PRELOAD_CHUNK_SIZE]
+            query = dbsession.query(node_col, target).select_from(assoc)
+            query = query.join(target_model, target_model.id == target_col)
+            query = query.filter(node_col.in_(chunk))
+            for node_id, obj in query:
+                nodes_by_id[node_id]._preloaded[rel].append(obj)
+
+def stream_ndjson(request, query, model_type, sort_key='id', after=None,
+                  limit=None, offset=0):
+    '''Return a Response that streams the results of query as newline
+    delimited json, one object per line. Rows are fetched STREAM_CHUNK_SIZE at a
+    time and serialized as they are written so that large result sets are
+    never held in memory all at once.
+
+    Each chunk is an ordinary buffered query that picks up after the last row
+    of the previous chunk with filter_keyset(), so the relationship queries
+    run while serializing a chunk never interleave with an open cursor on the
+    same connection.
+
+    The body is generated after the view returns and pyramid_tm has closed
+    request.dbsession, so the query is run on its own read only session.
+
+    Args:
+        query : The search query, unordered and unlimited.
+        after : A cursor to start after, as for paginated searches.
+        limit : The maximum number of rows to return. All of them if None.
+        offset: The number of rows to skip. Ignored when after is set.
+    '''
+
+    session_factory = request.registry['dbsession_factory']
+    fields = request.GET.get('fields', None)
+    # Build the first chunk's query here so a bad cursor is reported by the
+    # view instead of in the middle of the body.
+    first_query = filter_keyset(query, model_type, sort_key, after)
+    if offset and not after:
+        first_query = first_query.offset(offset)
+
+    def dump(dbsession, batch):
+        preload_relationships(dbsession, model_type, batch, fields)
+        for obj in batch:
+            line = json.dumps(obj,
+                              default=lambda o: o.__json__(request),
+                              sort_keys=True)
+            yield '{0}\n'.format(line).encode('utf-8')
+
+    def generate():
+        dbsession = session_factory(info={'request': request})
+        try:
+            # localize_date() looks up the timezone via the threadlocal
+            # registry, which has already been popped at this point.
+            with RequestContext(request):
+                chunk_query = first_query
+                remaining = limit
+                while remaining is None or remaining > 0:
+                    chunk_size = STREAM_CHUNK_SIZE
+                    if remaining is not None:
+                        chunk_size = min(chunk_size, remaining)
+                        remaining -= chunk_size
+                    batch = chunk_query.with_session(dbsession).limit(chunk_size).all()
+                    for line in dump(dbsession, batch):
+                        yield line
+                    if len(batch) < chunk_size:
+                        break
+                    cursor = encode_cursor(sort_key,
+                                           getattr(batch[-1], sort_key),
+                                           batch[-1].id)
+                    # Serialized objects are no longer needed.
+                    dbsession.expunge_all()
+                    chunk_query = filter_keyset(query, model_type, sort_key,
+                                                cursor)
+        finally:
+            dbsession.rollback()
+            dbsession.close()
+
+    LOG.debug('Streaming ndjson results')
+    return Response(app_iter=generate(),
+                    content_type='application/x-ndjson',
+                    charset='utf-8')
+
+def get_sort_key(request, model_type):
+    '''Return the column name to sort paginated results on. Defaults to id.
+    Raises ValueError if the requested sort column does not exist on the
+    model.'''
+
+    sort_key = request.GET.get('sort', 'id')
+    global_model = globals()[model_type]
+
+    if sort_key not in global_model.__table__.columns:
+        raise ValueError('Invalid sort field for {0}: {1}'.format(model_type,
+                                                                 sort_key))
+
+    return sort_key
+
+def filter_keyset(query, model_type, sort_key, after):
+    '''Order a query by sort_key and id, and if passed a cursor token, only
+    return rows that come after it. This lets clients walk large result sets
+    without the database scanning every row before the requested offset.
+    Return a sqlalchemy query object.'''
+
+    global_model = globals()[model_type]
+    id_col = getattr(global_model, 'id')
+
+    if sort_key == 'id':
+        if after:
+            _, _, last_id = decode_cursor(after)
+            query = query.filter(id_col > last_id)
+        return query.order_by(id_col)
+
+    sort_col = getattr(global_model, sort_key)
+
+    if after:
+        cursor_key, last_val, last_id = decode_cursor(after)
+        if cursor_key != sort_key:
+            raise ValueError('Pagination cursor does not match sort field: '
+                             '{0}'.format(sort_key))
+        # MySQL sorts NULL first in ascending order.
+        if last_val is None:
+            query = query.filter(or_(sort_col.isnot(None),
+                                     and_(sort_col.is_(None), id_col > last_id)))
+        else:
+            query = query.filter(or_(sort_col > last_val,
+                                     and_(sort_col == last_val, id_col > last_id)))
+
+    return query.order_by(sort_col, id_col)
+
 def process_search(query, params, model_type, exact_get):
     '''Handle searches and delegate to exact or regex.'''
 
     # List of metaparams
     metaparams = [
+        'after',
+        'count',
         'exact_get',
         'fields',
+        'format',
         'perpage',
+        'sort',
         'start',
     ]
 
@@ -420,8 +740,9 @@ def filter_regex(query, model_type, key, val):
                                      key,
                                      val,
                                      operator))
-    query = query.filter(getattr(global_model,
-                                 key).op(operator)(r'{0}'.format(val)))
+    query = query.filter(regex_predicate(getattr(global_model, key),
+                                         operator,
+                                         r'{0}'.format(val)))
 
     LOG.debug('RETURN: filter_regex()')
     return query
@@ -438,8 +759,9 @@ def filter_regex_multi_val(query, model_type, key, val):
                                      operator))
     multi_val = val.replace(',', '|')
     global_model = globals()[model_type]
-    query = query.filter(((getattr(global_model,
-                                   key).op(operator)((r'{0}'.format(multi_val))))))
+    query = query.filter(regex_predicate(getattr(global_model, key),
+                                         operator,
+                                         r'{0}'.format(multi_val)))
 
     LOG.debug('RETURN: filter_regex_multi_val()')
     return query
@@ -512,6 +834,164 @@ def filter_regex_subparam(query, model_type, key, val):
     LOG.debug('RETURN: filter_regex_subparam()')
     return query
 
+def parse_regex_literal(pattern):
+    '''Check whether a search pattern is a literal string with optional
+    anchors, escaped metacharacters and . wildcards. Leading or trailing .* on
+    an unanchored side is dropped, since it does not change what a substring
+    match finds.
+
+    Returns a tuple of (like, anchored_start, anchored_end, literal), or None
+    if the pattern needs a real regular expression. like is the pattern as a
+    LIKE expression without the surrounding %, with each . turned into the _
+    wildcard. literal is the plain string, or None if the pattern has a .
+    wildcard.'''
+
+    anchored_start = False
+    anchored_end = False
+
+    if pattern.startswith('^'):
+        anchored_start = True
+        pattern = pattern[1:]
+    elif pattern.startswith('.*'):
+        pattern = pattern[2:]
+
+    if pattern.endswith('$') and not pattern.endswith('\\$'):
+        anchored_end = True
+        pattern = pattern[:-1]
+    elif pattern.endswith('.*') and not pattern.endswith('\\.*'):
+        pattern = pattern[:-2]
+
+    if not pattern:
+        return None
+
+    like = []
+    literal = []
+    wildcard = False
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == '\\':
+            index += 1
+            # Anything but an escaped metacharacter, e.g. \d, is a class.
+            if index == len(pattern) or pattern[index] not in REGEX_META_CHARS:
+                return None
+            char = pattern[index]
+            like.append(escape_like(char))
+            literal.append(char)
+        elif char == '.':
+            # . matches exactly one character, just like _ does.
+            like.append('_')
+            wildcard = True
+        elif char in REGEX_META_CHARS:
+            return None
+        else:
+            like.append(escape_like(char))
+            literal.append(char)
+        index += 1
+
+    return (''.join(like), anchored_start, anchored_end,
+            None if wildcard else ''.join(literal))
+
+def escape_like(literal):
+    '''Escape the LIKE wildcards in a literal string.'''
+
+    return literal.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def regex_predicate(column, operator, pattern):
+    '''Build the filter for a regex search on column. Patterns that are
+    really literals are rewritten to predicates that can use an index:
+
+        ^web01$          -> = 'web01'
+        ^web01$|^db01$   -> IN ('web01', 'db01')
+        ^web01\\.docker$  -> = 'web01.docker'
+        ^web01.docker$   -> LIKE 'web01_docker'
+        ^web             -> LIKE 'web%'
+        web              -> LIKE '%web%'
+
+    Anything else falls back to REGEXP. Returns a sqlalchemy expression.
+
+    Args:
+        column  : The model attribute to filter on.
+        operator: 'regexp' or 'not regexp', as returned by check_regex_excludes().
+        pattern : The regex to search for. Multiple values are separated by |.
+    '''
+
+    parsed = None
+    # Only split on | when it can't be inside a group or character class.
+    if not any(char in pattern for char in '()[]'):
+        parsed = [parse_regex_literal(alt) for alt in
+                  re.split(r'(?<!\\)\|', pattern)]
+
+    if not parsed or None in parsed:
+        LOG.debug('Using %s for pattern: %s', operator, pattern)
+        return column.op(operator)(pattern)
+
+    exact = [literal for _, start, end, literal in parsed if start and end and
+             literal is not None]
+    if len(exact) == len(parsed):
+        if len(exact) == 1:
+            predicate = column == exact[0]
+        else:
+            predicate = column.in_(exact)
+    else:
+        clauses = []
+        for like, start, end, literal in parsed:
+            if start and end and literal is not None:
+                clauses.append(column == literal)
+                continue
+            if not start:
+                like = '%' + like
+            if not end:
+                like += '%'
+            clauses.append(column.like(like, escape='\\'))
+        predicate = or_(*clauses)
+
+    LOG.debug('Rewrote pattern: %s to: %s', pattern, predicate)
+    if operator == 'not regexp':
+        return ~predicate
+
+    return predicate
+
+def clear_registration_fingerprints(dbsession, node_ids=None):
+    '''Forget the registration fingerprint of the given node ids, or of every
+    node if node_ids is None, so that their next registration goes through
+    the full path and puts back anything that was changed outside of it.'''
+
+    query = dbsession.query(Node)
+    query = query.filter(Node.registration_fingerprint != None)
+    if node_ids is not None:
+        query = query.filter(Node.id.in_(node_ids))
+    query.update({Node.registration_fingerprint: None},
+                 synchronize_session=False)
+
+def find_registered_node_ids(dbsession, model_type, obj):
+    '''Return the ids of the nodes that node registration assigned obj to,
+    for the types of objects registration creates and assigns. Returns None
+    for any other type.'''
+
+    node_columns = {
+        'DataCenter': Node.data_center_id,
+        'Ec2Instance': Node.ec2_id,
+        'HardwareProfile': Node.hardware_profile_id,
+        'OperatingSystem': Node.operating_system_id,
+    }
+    if model_type in node_columns:
+        query = dbsession.query(Node.id).filter(node_columns[model_type] == obj.id)
+    elif model_type == 'PhysicalDevice':
+        query = dbsession.query(Node.id).filter(Node.serial_number == obj.serial_number)
+    elif model_type == 'NetworkInterface':
+        query = dbsession.query(network_interface_assignments.c.node_id)
+        query = query.filter(network_interface_assignments.c.network_interface_id == obj.id)
+    elif model_type == 'IpAddress':
+        query = dbsession.query(network_interface_assignments.c.node_id)
+        query = query.join(NetworkInterface, NetworkInterface.id ==
+                           network_interface_assignments.c.network_interface_id)
+        query = query.filter(NetworkInterface.ip_address_id == obj.id)
+    else:
+        return None
+
+    return [row[0] for row in query]
+
 def check_regex_excludes(key):
     '''Checks a key to see if it's an exclude (starts with 'ex_'). Returns a
     not operator for regexp and a key.'''
@@ -959,14 +1439,48 @@ def api_read_by_params(request):
         if exclude_params:
             query = process_search(query, exclude_params, model_type, exact_get)
 
+        sort_key = get_sort_key(request, model_type)
+        query = project_query(query,
+                              model_type,
+                              request.GET.get('fields', None),
+                              sort_key)
+
+        response_format = request.GET.get('format', 'json')
+        if response_format == 'ndjson':
+            if perpage:
+                return stream_ndjson(request, query, model_type, sort_key,
+                                     after=request.GET.get('after', None),
+                                     limit=perpage, offset=offset)
+            return stream_ndjson(request, query, model_type, sort_key)
+        if response_format != 'json':
+            return api_400(msg='Bad Request. Invalid format: {0}'.format(response_format))
+
+        next_cursor = None
         if perpage:
-            LOG.debug('Query count START')
-            total = query.count()
-            LOG.debug('Query count END')
+            # Setting count=false skips the COUNT(*), which is a full scan on
+            # large tables. total is returned as null in that case.
+            total = None
+            if request.GET.get('count', 'true').lower() != 'false':
+                LOG.debug('Query count START')
+                total = query.count()
+                LOG.debug('Query count END')
+
+            after = request.GET.get('after', None)
+            query = filter_keyset(query, model_type, sort_key, after)
+
             LOG.debug('Query limit START')
-            LOG.debug('Query limit: %s offset: %s', perpage, offset)
-            myob = query.limit(perpage).offset(offset).all()
+            if after:
+                LOG.debug('Query limit: %s after: %s', perpage, after)
+                myob = query.limit(perpage).all()
+            else:
+                LOG.debug('Query limit: %s offset: %s', perpage, offset)
+                myob = query.limit(perpage).offset(offset).all()
             LOG.debug('Query limit END')
+
+            if len(myob) == perpage:
+                next_cursor = encode_cursor(sort_key,
+                                            getattr(myob[-1], sort_key),
+                                            myob[-1].id)
         else:
             LOG.debug('Query all START')
             myob = query.all()
@@ -975,8 +1489,17 @@ def api_read_by_params(request):
 
         result_count = len(myob)
 
+        preload_relationships(request.dbsession, model_type, myob,
+                              request.GET.get('fields', None))
+
         LOG.debug('Returning Query results')
-        return api_200(total=total, result_count=result_count, results=myob)
+        return api_200(total=total,
+                       result_count=result_count,
+                       results=myob,
+                       next_cursor=next_cursor)
+
+    except ValueError as ex:
+        return api_400(msg='Bad Request. {0}'.format(ex))
 
     # FIXME: Should AttributeError return something different?
     except (NoResultFound, AttributeError):
@@ -1044,15 +1567,31 @@ def api_delete_by_id(request):
         except KeyError:
             deleted_key = 'name'
 
-        audit = globals()['{0}Audit'.format(model_type)]()
-        setattr(audit, 'object_id', query.id)
-        setattr(audit, 'field', deleted_key)
-        setattr(audit, 'old_value', getattr(query, deleted_key))
-        setattr(audit, 'new_value', 'deleted')
-        setattr(audit, 'updated_by', user['name'])
-        setattr(audit, 'created', utcnow)
+        add_audit(request.dbsession, globals()['{0}Audit'.format(model_type)],
+                  object_id=query.id,
+                  field=deleted_key,
+                  old_value=getattr(query, deleted_key),
+                  new_value='deleted',
+                  updated_by=user['name'],
+                  created=utcnow)
+
+        enc_invalidations = {
+            'DataCenter': {'data_center_ids': [query.id]},
+            'Node': {'node_ids': [query.id]},
+            'NodeGroup': {'node_group_ids': [query.id]},
+            'Tag': {'everything': True},
+        }
+        if model_type in enc_invalidations:
+            queue_enc_invalidation(request.dbsession, **enc_invalidations[model_type])
+
+        # Objects that node registration creates and assigns. Deleting one
+        # has to make the nodes it was assigned to register in full again.
+        node_ids = find_registered_node_ids(request.dbsession, model_type, query)
+        if node_ids:
+            clear_registration_fingerprints(request.dbsession, node_ids)
 
-        request.dbsession.add(audit)
+        if model_type in ['DataCenter', 'HardwareProfile', 'OperatingSystem', 'Status']:
+            queue_dimension_invalidation(request.dbsession, globals()[model_type])
 
         LOG.info('Deleting %s: %s id: %s', unique_field, object_name, resource_id)
         request.dbsession.delete(query)
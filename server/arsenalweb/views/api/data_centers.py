@@ -27,6 +27,13 @@ from arsenalweb.views.api.common import (
     collect_params,
     enforce_api_change_limit,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
+from arsenalweb.views.api.dimension_cache import (
+    find_dimension_by_name,
+    queue_dimension_invalidation,
+    )
 from arsenalweb.models.data_centers import (
     DataCenter,
     DataCenterAudit,
@@ -44,12 +51,9 @@ LOG = logging.getLogger(__name__)
 
 # Functions
 def find_status_by_name(dbsession, status_name):
-    '''Find a status by name.'''
+    '''Find a status by name. Returns a Dimension with its id and name.'''
 
-    status = dbsession.query(Status)
-    status = status.filter(Status.name == status_name)
-
-    return status.one()
+    return find_dimension_by_name(dbsession, Status, status_name)
 
 def find_data_center_by_name(dbsession, name):
     '''Find a data_center by name. Returns a data_center object if found,
@@ -118,14 +122,15 @@ def create_data_center(dbsession, name=None, updated_by=None, **kwargs):
 
         dbsession.add(data_center)
         dbsession.flush()
-
-        audit = DataCenterAudit(object_id=data_center.id,
-                                field='name',
-                                old_value='created',
-                                new_value=data_center.name,
-                                updated_by=updated_by,
-                                created=utcnow)
-        dbsession.add(audit)
+        queue_dimension_invalidation(dbsession, DataCenter)
+
+        add_audit(dbsession, DataCenterAudit,
+                  object_id=data_center.id,
+                  field='name',
+                  old_value='created',
+                  new_value=data_center.name,
+                  updated_by=updated_by,
+                  created=utcnow)
         dbsession.flush()
 
         return api_200(results=data_center)
@@ -172,13 +177,13 @@ def update_data_center(dbsession, data_center, **kwargs):
 
                 LOG.debug('Updating data_center: %s attribute: '
                           '%s new_value: %s', data_center.name, attribute, new_value)
-                audit = DataCenterAudit(object_id=data_center.id,
-                                        field=attribute,
-                                        old_value=old_value,
-                                        new_value=new_value,
-                                        updated_by=my_attribs['updated_by'],
-                                        created=utcnow)
-                dbsession.add(audit)
+                add_audit(dbsession, DataCenterAudit,
+                          object_id=data_center.id,
+                          field=attribute,
+                          old_value=old_value,
+                          new_value=new_value,
+                          updated_by=my_attribs['updated_by'],
+                          created=utcnow)
                 setattr(data_center, attribute, new_value)
 
         dbsession.flush()
@@ -228,13 +233,13 @@ def assign_data_center(dbsession, data_center, actionables, resource, user):
 
                     if resource == 'physical_locations':
 
-                        pd_audit = PhysicalLocationAudit(object_id=my_obj.id,
-                                                         field='data_center',
-                                                         old_value=orig_data_center_name,
-                                                         new_value=data_center.name,
-                                                         updated_by=user,
-                                                         created=utcnow)
-                        dbsession.add(pd_audit)
+                        add_audit(dbsession, PhysicalLocationAudit,
+                                  object_id=my_obj.id,
+                                  field='data_center',
+                                  old_value=orig_data_center_name,
+                                  new_value=data_center.name,
+                                  updated_by=user,
+                                  created=utcnow)
 
                     LOG.debug('END assign_data_center() create audit')
 
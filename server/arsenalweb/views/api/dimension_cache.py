@@ -0,0 +1,167 @@
+'''Arsenal API dimension cache.'''
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import logging
+import threading
+import time
+from collections import namedtuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+LOG = logging.getLogger(__name__)
+
+# What the cache hands back in place of a model instance. Callers of the
+# cached lookups only ever need the id and name.
+Dimension = namedtuple('Dimension', ['id', 'name'])
+
+
+class DimensionCache(object):
+    '''Per process cache of name to id for small tables that rarely change,
+    such as hardware_profiles, operating_systems, data_centers and statuses.
+
+    Changes are queued on the session making them and drop every entry for
+    that table once its outermost transaction commits. Lookups made inside a
+    savepoint, by a session with a pending change to the table, or while an
+    invalidation happened, are not cached, since they may see rows that are
+    never committed.
+    Other processes see changes once their entries expire, which is bounded
+    by arsenal.dimension_cache.ttl.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.generation = 0
+        self.ttl = 300
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, table, name):
+        '''Return the cached Dimension for name in table, or None.'''
+
+        with self.lock:
+            entry = self.entries.get(table, {}).get(name)
+            if entry and time.time() - entry[1] < self.ttl:
+                self.stats['hits'] += 1
+                return entry[0]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, table, name, dimension, generation):
+        '''Store dimension, unless an invalidation has happened since
+        generation was read.'''
+
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries.setdefault(table, {})[name] = (dimension, time.time())
+
+    def invalidate(self, tables):
+        '''Drop every entry for the given tables.'''
+
+        with self.lock:
+            self.generation += 1
+            self.stats['invalidations'] += 1
+            for table in tables:
+                self.entries.pop(table, None)
+
+    def report(self):
+        '''Return the cache counters.'''
+
+        with self.lock:
+            resp = dict(self.stats)
+            resp['entries'] = sum(len(v) for v in self.entries.values())
+            resp['ttl'] = self.ttl
+            return resp
+
+
+DIMENSION_CACHE = DimensionCache()
+
+def configure_dimension_cache(settings):
+    '''Set the cache ttl in seconds from arsenal.dimension_cache.ttl. 0
+    disables the cache.'''
+
+    try:
+        DIMENSION_CACHE.ttl = int(settings['arsenal.dimension_cache.ttl'])
+    except (KeyError, ValueError):
+        pass
+
+def find_dimension_by_name(dbsession, model, name):
+    '''Find a row of model by name. Returns a Dimension with its id and name,
+    raises NoResultFound if there is no such row.'''
+
+    table = model.__tablename__
+    if DIMENSION_CACHE.ttl:
+        dimension = DIMENSION_CACHE.get(table, name)
+        if dimension:
+            return dimension
+
+    generation = DIMENSION_CACHE.generation
+    query = dbsession.query(model.id, model.name)
+    query = query.filter(model.name == name)
+    dimension = Dimension(*query.one())
+
+    if (DIMENSION_CACHE.ttl and
+            not dbsession.in_nested_transaction() and
+            table not in dbsession.info.get('dimension_invalidations', ())):
+        DIMENSION_CACHE.put(table, name, dimension, generation)
+
+    return dimension
+
+def queue_dimension_invalidation(dbsession, model):
+    '''Queue dropping the cached entries for model's table once dbsession
+    commits. Call it whenever a row of model is created, renamed or
+    deleted.'''
+
+    dbsession.info.setdefault('dimension_invalidations', []).append(model.__tablename__)
+
+@event.listens_for(Session, 'after_transaction_create')
+def mark_dimension_invalidations(session, session_transaction):
+    '''Remember how many invalidations were queued when a savepoint began.'''
+
+    if session_transaction.nested:
+        marks = session.info.setdefault('dimension_invalidation_marks', {})
+        marks[session_transaction] = len(session.info.get('dimension_invalidations', []))
+
+@event.listens_for(Session, 'after_commit')
+def apply_dimension_invalidations(session):
+    '''Apply dimension cache invalidations queued during the transaction. A
+    savepoint release leaves them queued for the outer transaction, which
+    can still roll back.'''
+
+    if session.in_nested_transaction():
+        return
+
+    session.info.pop('dimension_invalidation_marks', None)
+    tables = session.info.pop('dimension_invalidations', None)
+    if tables:
+        tables = set(tables)
+        LOG.debug('Applying dimension cache invalidation: %s', tables)
+        DIMENSION_CACHE.invalidate(tables)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_dimension_invalidations(session, previous_transaction):
+    '''Drop the invalidations queued by a transaction that rolled back.'''
+
+    if previous_transaction.nested:
+        marks = session.info.get('dimension_invalidation_marks', {})
+        mark = marks.pop(previous_transaction, None)
+        if mark is not None:
+            del session.info.get('dimension_invalidations', [])[mark:]
+    elif previous_transaction.parent is None:
+        session.info.pop('dimension_invalidations', None)
+        session.info.pop('dimension_invalidation_marks', None)
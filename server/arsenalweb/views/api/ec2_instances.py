@@ -21,6 +21,9 @@ from arsenalweb.views.api.common import (
     api_500,
     collect_params,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
 from arsenalweb.models.ec2_instances import (
     Ec2Instance,
     Ec2InstanceAudit,
@@ -73,13 +76,13 @@ def create_ec2_instance(dbsession, instance_id=None, updated_by=None, **kwargs):
         dbsession.add(ec2)
         dbsession.flush()
 
-        audit = Ec2InstanceAudit(object_id=ec2.id,
-                                 field='instance_id',
-                                 old_value='created',
-                                 new_value=ec2.instance_id,
-                                 updated_by=updated_by,
-                                 created=utcnow)
-        dbsession.add(audit)
+        add_audit(dbsession, Ec2InstanceAudit,
+                  object_id=ec2.id,
+                  field='instance_id',
+                  old_value='created',
+                  new_value=ec2.instance_id,
+                  updated_by=updated_by,
+                  created=utcnow)
         dbsession.flush()
 
         return ec2
@@ -133,13 +136,13 @@ def update_ec2_instance(dbsession, ec2, **kwargs):
 
                 LOG.debug('Updating ec2_instance: %s attribute: '
                           '%s new_value: %s', ec2.instance_id, attribute, new_value)
-                audit = Ec2InstanceAudit(object_id=ec2.id,
-                                         field=attribute,
-                                         old_value=old_value,
-                                         new_value=new_value,
-                                         updated_by=my_attribs['updated_by'],
-                                         created=utcnow)
-                dbsession.add(audit)
+                add_audit(dbsession, Ec2InstanceAudit,
+                          object_id=ec2.id,
+                          field=attribute,
+                          old_value=old_value,
+                          new_value=new_value,
+                          updated_by=my_attribs['updated_by'],
+                          created=utcnow)
                 setattr(ec2, attribute, new_value)
 
         dbsession.flush()
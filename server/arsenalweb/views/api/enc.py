@@ -16,6 +16,9 @@
 import logging
 from pyramid.view import view_config
 from sqlalchemy.orm.exc import NoResultFound
+from arsenalweb.models.common import (
+    get_name_id_dict,
+    )
 from arsenalweb.models.nodes import (
     Node,
     )
@@ -25,20 +28,29 @@ from arsenalweb.views.api.common import (
     api_500,
     api_501,
     )
+from arsenalweb.views.api.enc_cache import (
+    ENC_CACHE,
+    get_enc_cache_ttl,
+    )
 
 LOG = logging.getLogger(__name__)
 
-def find_node_by_name_and_status(dbsession, settings, node_name):
-    '''Find a node by name, filtered by statuses'''
+def get_enc_status_ids(settings):
+    '''Return the list of status ids a node must be in to get an enc.'''
 
     try:
-        status_ids = [s for s in settings['arsenal.enc.status_ids'].splitlines() if s]
+        return [s for s in settings['arsenal.enc.status_ids'].splitlines() if s]
     except KeyError as ex:
         msg = 'You must define arsenal.enc.status_ids in the main settings file to ' \
               'enable the enc.'
         LOG.error(msg)
         raise type(ex)(ex.message + ' {0}'.format(msg))
 
+def find_node_by_name_and_status(dbsession, settings, node_name):
+    '''Find a node by name, filtered by statuses'''
+
+    status_ids = get_enc_status_ids(settings)
+
     node = dbsession.query(Node)
     node = node.filter(Node.name == node_name)
     node = node.filter(Node.status_id.in_(status_ids))
@@ -66,15 +78,8 @@ def process_tags(tags, tag_type):
 
     return results
 
-def process_node_enc(dbsession, settings, node_name, param_sources=False):
-    '''Process enc for node. Merges tags from the following three
-    objects in order from least to most specific:
-
-        node_group
-        data_center
-        node
-
-    Multiple node groups are sorted and take priority..?'''
+def new_enc_results(param_sources=False):
+    '''Return an empty enc result.'''
 
     results = {}
     results['classes'] = []
@@ -85,13 +90,70 @@ def process_node_enc(dbsession, settings, node_name, param_sources=False):
     if param_sources:
         results['param_sources'] = {}
 
+    return results
+
+def merge_enc_tags(results, my_tags, tag_type, param_sources=False):
+    '''Merge processed tags into the enc results, overriding any tags of the
+    same name from a less specific level.'''
+
+    results['parameters'].update(my_tags)
+    if param_sources:
+        for tag in my_tags:
+            results['param_sources'][tag] = tag_type
+
+def process_node_enc(dbsession, settings, node_name, param_sources=False):
+    '''Process enc for node. Merges tags from the following three
+    objects in order from least to most specific:
+
+        node_group
+        data_center
+        node
+
+    Multiple node groups are sorted and take priority..?
+
+    Results for nodes that are found are cached for arsenal.enc.cache_ttl
+    seconds. The cache is invalidated when the node, its node_groups or its
+    data_center change.'''
+
+    ttl = get_enc_cache_ttl(settings)
+    if not ttl:
+        results, _ = build_node_enc(dbsession, settings, node_name, param_sources)
+        return results
+
+    results = ENC_CACHE.get(node_name, ttl)
+    if results is None:
+        generation = ENC_CACHE.generation
+        # Always build param_sources so the cached copy can answer both kinds
+        # of request.
+        results, deps = build_node_enc(dbsession, settings, node_name, True)
+        if deps:
+            ENC_CACHE.put(node_name, results, generation, **deps)
+
+    if not param_sources:
+        del results['param_sources']
+
+    return results
+
+def build_node_enc(dbsession, settings, node_name, param_sources=False):
+    '''Build the enc results for node. Returns a tuple of the results and a
+    dict of the node, data_center and node_group ids they were built from, or
+    None if the node was not found.'''
+
+    deps = None
+    results = new_enc_results(param_sources)
+
     try:
         LOG.debug('ENC find the node...')
         node = find_node_by_name_and_status(dbsession, settings, node_name)
         LOG.debug('ENC find the node complete')
         results['name'] = node.name
         results['id'] = node.id
-        results['status'] = node.status
+        results['status'] = get_name_id_dict([node.status])
+        deps = {
+            'node_id': node.id,
+            'data_center_id': node.data_center_id,
+            'node_group_ids': [],
+        }
 
         LOG.debug('ENC node name is: %s', node.name)
         LOG.debug('ENC node datacenter is: %s', node.data_center_id)
@@ -101,12 +163,10 @@ def process_node_enc(dbsession, settings, node_name, param_sources=False):
         LOG.debug('ENC find node_group tags...')
         for node_group in node.node_groups:
             LOG.debug('ENC node_group: %s', node_group.name)
+            deps['node_group_ids'].append(node_group.id)
             results['classes'].append(node_group.name)
             my_tags = process_tags(node_group.tags, 'node_group')
-            results['parameters'].update(my_tags)
-            if param_sources:
-                for tag in my_tags:
-                    results['param_sources'][tag] = 'node_group'
+            merge_enc_tags(results, my_tags, 'node_group', param_sources)
         LOG.debug('ENC find node_group tags complete.')
 
         LOG.debug('ENC process data_center tags...')
@@ -116,24 +176,18 @@ def process_node_enc(dbsession, settings, node_name, param_sources=False):
             my_tags = {}
 
         LOG.debug('ENC process data_center tags complete.')
-        results['parameters'].update(my_tags)
-        if param_sources:
-            for tag in my_tags:
-                results['param_sources'][tag] = 'data_center'
+        merge_enc_tags(results, my_tags, 'data_center', param_sources)
 
         LOG.debug('ENC process node tags...')
         my_tags = process_tags(node.tags, 'node')
-        results['parameters'].update(my_tags)
-        if param_sources:
-            for tag in my_tags:
-                results['param_sources'][tag] = 'node'
+        merge_enc_tags(results, my_tags, 'node', param_sources)
 
         LOG.debug('ENC process node tags complete.')
 
     except NoResultFound:
         LOG.debug('node not found: %s', node_name)
 
-    return results
+    return results, deps
 
 @view_config(route_name='api_enc', request_method='GET', renderer='json')
 def api_enc(request):
@@ -0,0 +1,174 @@
+'''Arsenal API ENC cache.'''
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import copy
+import logging
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+LOG = logging.getLogger(__name__)
+
+
+class EncCache(object):
+    '''Per process cache of ENC results keyed by node name. Each entry
+    remembers the node, node_group and data_center ids it was built from so
+    that changes to any of them only drop the affected entries.
+
+    Invalidations are queued on the session doing the change and applied
+    after it commits. A result that was built while an invalidation happened
+    is not stored, so a stale read can never outlive the change that made it
+    stale. Other processes only see changes once their own copy expires,
+    which is bounded by arsenal.enc.cache_ttl.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.generation = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, node_name, ttl):
+        '''Return a copy of the cached results for node_name, or None.'''
+
+        with self.lock:
+            entry = self.entries.get(node_name)
+            if entry and time.time() - entry['cached_at'] < ttl:
+                self.stats['hits'] += 1
+                return copy.deepcopy(entry['results'])
+            if entry:
+                self.stats['expired'] += 1
+                del self.entries[node_name]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, node_name, results, generation, node_id, data_center_id,
+            node_group_ids):
+        '''Store results for node_name, unless an invalidation has happened
+        since generation was read.'''
+
+        with self.lock:
+            if generation != self.generation:
+                LOG.debug('ENC cache invalidated while building results for: '
+                          '%s, not caching.', node_name)
+                return
+            self.entries[node_name] = {
+                'cached_at': time.time(),
+                'data_center_id': data_center_id,
+                'node_group_ids': set(node_group_ids),
+                'node_id': node_id,
+                'results': copy.deepcopy(results),
+            }
+
+    def invalidate(self, node_ids=None, node_group_ids=None,
+                   data_center_ids=None, everything=False):
+        '''Drop the entries built from any of the given objects.'''
+
+        with self.lock:
+            self.generation += 1
+            self.stats['invalidations'] += 1
+            if everything:
+                self.entries.clear()
+                return
+            node_ids = set(node_ids or [])
+            node_group_ids = set(node_group_ids or [])
+            data_center_ids = set(data_center_ids or [])
+            for node_name in list(self.entries):
+                entry = self.entries[node_name]
+                if (entry['node_id'] in node_ids or
+                        entry['data_center_id'] in data_center_ids or
+                        entry['node_group_ids'] & node_group_ids):
+                    del self.entries[node_name]
+
+    def report(self):
+        '''Return the cache counters.'''
+
+        with self.lock:
+            resp = dict(self.stats)
+            resp['entries'] = len(self.entries)
+            lookups = resp['hits'] + resp['misses']
+            resp['hit_ratio'] = round(float(resp['hits']) / lookups, 4) if lookups else 0.0
+            return resp
+
+
+ENC_CACHE = EncCache()
+
+def get_enc_cache_ttl(settings):
+    '''Return the ENC cache ttl in seconds from arsenal.enc.cache_ttl. 0 or
+    unset disables the cache.'''
+
+    try:
+        return int(settings['arsenal.enc.cache_ttl'])
+    except (KeyError, ValueError):
+        return 0
+
+def queue_enc_invalidation(dbsession, node_ids=None, node_group_ids=None,
+                           data_center_ids=None, everything=False):
+    '''Queue an ENC cache invalidation to be applied once dbsession commits.
+
+    dbsession      : The session making the change.
+    node_ids       : A list of node ids whose enc changed.
+    node_group_ids : A list of node_group ids whose name or tags changed.
+    data_center_ids: A list of data_center ids whose tags changed.
+    everything     : Drop the whole cache.
+    '''
+
+    pending = dbsession.info.setdefault('enc_invalidations', [])
+    pending.append({
+        'node_ids': list(node_ids or []),
+        'node_group_ids': list(node_group_ids or []),
+        'data_center_ids': list(data_center_ids or []),
+        'everything': everything,
+    })
+
+@event.listens_for(Session, 'after_transaction_create')
+def mark_enc_invalidations(session, session_transaction):
+    '''Remember how many invalidations were queued when a savepoint began.'''
+
+    if session_transaction.nested:
+        marks = session.info.setdefault('enc_invalidation_marks', {})
+        marks[session_transaction] = len(session.info.get('enc_invalidations', []))
+
+@event.listens_for(Session, 'after_commit')
+def apply_enc_invalidations(session):
+    '''Apply ENC cache invalidations queued during the transaction. A
+    savepoint release leaves them queued for the outer transaction, which
+    can still roll back.'''
+
+    if session.in_nested_transaction():
+        return
+
+    session.info.pop('enc_invalidation_marks', None)
+    for pending in session.info.pop('enc_invalidations', []):
+        LOG.debug('Applying ENC cache invalidation: %s', pending)
+        ENC_CACHE.invalidate(**pending)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_enc_invalidations(session, previous_transaction):
+    '''Drop the invalidations queued by a transaction that rolled back.'''
+
+    if previous_transaction.nested:
+        marks = session.info.get('enc_invalidation_marks', {})
+        mark = marks.pop(previous_transaction, None)
+        if mark is not None:
+            del session.info.get('enc_invalidations', [])[mark:]
+    elif previous_transaction.parent is None:
+        session.info.pop('enc_invalidations', None)
+        session.info.pop('enc_invalidation_marks', None)
@@ -25,6 +25,12 @@ from arsenalweb.views.api.common import (
     api_200,
     api_500,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
+from arsenalweb.views.api.dimension_cache import (
+    queue_dimension_invalidation,
+    )
 
 LOG = logging.getLogger(__name__)
 
@@ -63,14 +69,15 @@ def create_hardware_profile(dbsession, name, manufacturer, model, user_id):
 
         dbsession.add(hardware_profile)
         dbsession.flush()
-
-        audit = HardwareProfileAudit(object_id=hardware_profile.id,
-                                     field='name',
-                                     old_value='created',
-                                     new_value=hardware_profile.name,
-                                     updated_by=user_id,
-                                     created=utcnow)
-        dbsession.add(audit)
+        queue_dimension_invalidation(dbsession, HardwareProfile)
+
+        add_audit(dbsession, HardwareProfileAudit,
+                  object_id=hardware_profile.id,
+                  field='name',
+                  old_value='created',
+                  new_value=hardware_profile.name,
+                  updated_by=user_id,
+                  created=utcnow)
         dbsession.flush()
 
         return hardware_profile
@@ -94,13 +101,13 @@ def update_hardware_profile(dbsession, hardware_profile, name, rack_color, rack_
         for attribute in ['rack_color', 'rack_u']:
             if getattr(hardware_profile, attribute) != locals()[attribute]:
                 LOG.debug('Updating hardware profile %s: %s', attribute, locals()[attribute])
-                audit = HardwareProfileAudit(object_id=hardware_profile.id,
-                                             field=attribute,
-                                             old_value=getattr(hardware_profile, attribute),
-                                             new_value=locals()[attribute],
-                                             updated_by=user_id,
-                                             created=utcnow)
-                dbsession.add(audit)
+                add_audit(dbsession, HardwareProfileAudit,
+                          object_id=hardware_profile.id,
+                          field=attribute,
+                          old_value=getattr(hardware_profile, attribute),
+                          new_value=locals()[attribute],
+                          updated_by=user_id,
+                          created=utcnow)
 
         hardware_profile.rack_color = rack_color
         hardware_profile.rack_u = rack_u
@@ -26,6 +26,9 @@ from arsenalweb.views.api.common import (
     api_404,
     api_500,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
 
 LOG = logging.getLogger(__name__)
 
@@ -52,43 +55,39 @@ def guest_vms_to_hypervisor(dbsession, guest_vms, hypervisor, action, user_id):
                 LOG.debug('HVMS: {0}'.format(hypervisor.guest_vms))
                 if not guest_vm in hypervisor.guest_vms:
                     hypervisor.guest_vms.append(guest_vm)
-                    audit_hv = NodeAudit(object_id=hypervisor.id,
-                                         field='guest_vm',
-                                         old_value='assigned',
-                                         new_value=guest_vm.name,
-                                         updated_by=user_id,
-                                         created=utcnow)
-                    audit_guest = NodeAudit(object_id=guest_vm.id,
-                                            field='hypervisor',
-                                            old_value='assigned',
-                                            new_value=hypervisor.name,
-                                            updated_by=user_id,
-                                            created=utcnow)
-                    dbsession.add(audit_hv)
-                    dbsession.add(audit_guest)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=hypervisor.id,
+                              field='guest_vm',
+                              old_value='assigned',
+                              new_value=guest_vm.name,
+                              updated_by=user_id,
+                              created=utcnow)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=guest_vm.id,
+                              field='hypervisor',
+                              old_value='assigned',
+                              new_value=hypervisor.name,
+                              updated_by=user_id,
+                              created=utcnow)
             if action == 'DELETE':
                 try:
                     hypervisor.guest_vms.remove(guest_vm)
-                    audit_hv = NodeAudit(object_id=hypervisor.id,
-                                         field='guest_vm',
-                                         old_value=guest_vm.name,
-                                         new_value='deassigned',
-                                         updated_by=user_id,
-                                         created=utcnow)
-                    audit_guest = NodeAudit(object_id=guest_vm.id,
-                                            field='hypervisor',
-                                            old_value=hypervisor.name,
-                                            new_value='deassigned',
-                                            updated_by=user_id,
-                                            created=utcnow)
-                    dbsession.add(audit_hv)
-                    dbsession.add(audit_guest)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=hypervisor.id,
+                              field='guest_vm',
+                              old_value=guest_vm.name,
+                              new_value='deassigned',
+                              updated_by=user_id,
+                              created=utcnow)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=guest_vm.id,
+                              field='hypervisor',
+                              old_value=hypervisor.name,
+                              new_value='deassigned',
+                              updated_by=user_id,
+                              created=utcnow)
                 except (ValueError, AttributeError):
-                    try:
-                        dbsession.remove(audit_hv)
-                        dbsession.remove(audit_guest)
-                    except  UnboundLocalError:
-                        pass
+                    pass
 
         dbsession.add(hypervisor)
         dbsession.flush()
@@ -18,6 +18,7 @@ from datetime import datetime
 from pyramid.view import view_config
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.exc import MultipleResultsFound
+from zope.sqlalchemy import mark_changed
 from arsenalweb.models.ip_addresses import (
     IpAddress,
     IpAddressAudit,
@@ -33,6 +34,9 @@ from arsenalweb.views.api.common import (
     api_501,
     collect_params,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
 
 LOG = logging.getLogger(__name__)
 
@@ -73,13 +77,13 @@ def create_ip_addr(dbsession, ip_address=None, updated_by=None):
         dbsession.add(ip_address)
         dbsession.flush()
 
-        ip_address_audit = IpAddressAudit(object_id=ip_address.id,
-                                          field='ip_address',
-                                          old_value='created',
-                                          new_value=ip_address.ip_address,
-                                          updated_by=updated_by,
-                                          created=utcnow)
-        dbsession.add(ip_address_audit)
+        add_audit(dbsession, IpAddressAudit,
+                  object_id=ip_address.id,
+                  field='ip_address',
+                  old_value='created',
+                  new_value=ip_address.ip_address,
+                  updated_by=updated_by,
+                  created=utcnow)
         dbsession.flush()
 
     except Exception as ex:
@@ -89,6 +93,54 @@ def create_ip_addr(dbsession, ip_address=None, updated_by=None):
 
     return ip_address
 
+def find_ip_addrs_by_addrs(dbsession, ip_addresses):
+    '''Find many ip_addresses with a single query. Returns a dict of
+    ip_address to IpAddress object for the ones that exist.'''
+
+    ip_addresses = set(ip_addresses)
+    if not ip_addresses:
+        return {}
+
+    LOG.debug('Searching for ip_address.ip_address in: %s', ip_addresses)
+    ip_addrs = dbsession.query(IpAddress)
+    ip_addrs = ip_addrs.filter(IpAddress.ip_address.in_(ip_addresses))
+
+    return dict((ip_addr.ip_address, ip_addr) for ip_addr in ip_addrs)
+
+def create_ip_addrs(dbsession, ip_addresses, updated_by=None):
+    '''Create many ip_addresses with a single multi row INSERT. Returns a
+    dict of ip_address to the new IpAddress objects.'''
+
+    ip_addresses = sorted(set(ip_addresses))
+    if not ip_addresses:
+        return {}
+
+    LOG.info('Creating new ip_addresses: %s', ip_addresses)
+    utcnow = datetime.utcnow()
+
+    dbsession.execute(IpAddress.__table__.insert(), [{
+        'ip_address': ip_address,
+        'updated_by': updated_by,
+        'created': utcnow,
+        'updated': utcnow,
+    } for ip_address in ip_addresses])
+    # Core statements don't mark the session as changed, and pyramid_tm rolls
+    # back a session that isn't.
+    mark_changed(dbsession)
+
+    ip_addrs = find_ip_addrs_by_addrs(dbsession, ip_addresses)
+
+    for ip_addr in ip_addrs.values():
+        add_audit(dbsession, IpAddressAudit,
+                  object_id=ip_addr.id,
+                  field='ip_address',
+                  old_value='created',
+                  new_value=ip_addr.ip_address,
+                  updated_by=updated_by,
+                  created=utcnow)
+
+    return ip_addrs
+
 def update_ip_addr(ip_address=None, user_id=None):
     '''Update an ip_address. We are not allowing this for now, just a
     placeholder. If we decide to add feilds we want to allow in the future,
@@ -116,24 +168,24 @@ def ip_address_to_net_if(dbsession, ip_address, net_if, user):
 
             if orig_net_if_ip_addr_id != ip_address.id:
 
-                net_if_audit = NetworkInterfaceAudit(object_id=net_if.id,
-                                                     field='ip_address_id',
-                                                     old_value=orig_net_if_ip_addr_id,
-                                                     new_value=ip_address.id,
-                                                     updated_by=user,
-                                                     created=utcnow)
-                dbsession.add(net_if_audit)
+                add_audit(dbsession, NetworkInterfaceAudit,
+                          object_id=net_if.id,
+                          field='ip_address_id',
+                          old_value=orig_net_if_ip_addr_id,
+                          new_value=ip_address.id,
+                          updated_by=user,
+                          created=utcnow)
 
                 LOG.debug('Creating audit entry for ip_address assignment '
                           'to network_interface...')
-                ip_addr_audit = IpAddressAudit(object_id=ip_address.id,
-                                               field='net_if_assignment',
-                                               old_value='created',
-                                               new_value=net_if.id,
-                                               updated_by=user,
-                                               created=utcnow)
-
-                dbsession.add(ip_addr_audit)
+                add_audit(dbsession, IpAddressAudit,
+                          object_id=ip_address.id,
+                          field='net_if_assignment',
+                          old_value='created',
+                          new_value=net_if.id,
+                          updated_by=user,
+                          created=utcnow)
+
 
 
             dbsession.add(net_if)
@@ -16,7 +16,12 @@
 import logging
 from datetime import datetime
 from pyramid.view import view_config
+from sqlalchemy import and_
 from sqlalchemy.orm.exc import NoResultFound
+from zope.sqlalchemy import mark_changed
+from arsenalweb.models.common import (
+    network_interface_assignments,
+    )
 from arsenalweb.models.ip_addresses import (
     IpAddressAudit,
     )
@@ -35,9 +40,25 @@ from arsenalweb.views.api.common import (
     api_501,
     collect_params,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
 
 LOG = logging.getLogger(__name__)
 
+# The network_interface attributes a registration payload can set.
+NET_IF_FIELDS = [
+    'name',
+    'unique_id',
+    'ip_address_id',
+    'bond_master',
+    'mac_address',
+    'port_description',
+    'port_number',
+    'port_switch',
+    'port_vlan',
+    'seen_mac_address',
+]
 
 # Functions
 def find_net_if_by_unique_id(dbsession, unique_id):
@@ -51,6 +72,20 @@ def find_net_if_by_unique_id(dbsession, unique_id):
 
     return net_if.one()
 
+def find_net_ifs_by_unique_ids(dbsession, unique_ids):
+    '''Find many network_interfaces with a single query. Returns a dict of
+    unique_id to NetworkInterface object for the ones that exist.'''
+
+    unique_ids = set([unique_id.lower() for unique_id in unique_ids])
+    if not unique_ids:
+        return {}
+
+    LOG.debug('Searching for network_interface.unique_id in: %s', unique_ids)
+    net_ifs = dbsession.query(NetworkInterface)
+    net_ifs = net_ifs.filter(NetworkInterface.unique_id.in_(unique_ids))
+
+    return dict((net_if.unique_id, net_if) for net_if in net_ifs)
+
 def find_net_if_by_id(dbsession, net_if_id):
     '''Find a network_interface by id. Return an object if found, raises
        an exception otherwise.'''
@@ -129,25 +164,25 @@ def create_net_if(dbsession,
         dbsession.add(net_if)
         dbsession.flush()
 
-        audit = NetworkInterfaceAudit(object_id=net_if.id,
-                                      field='unique_id',
-                                      old_value='created',
-                                      new_value=net_if.unique_id,
-                                      updated_by=updated_by,
-                                      created=utcnow)
-        dbsession.add(audit)
+        add_audit(dbsession, NetworkInterfaceAudit,
+                  object_id=net_if.id,
+                  field='unique_id',
+                  old_value='created',
+                  new_value=net_if.unique_id,
+                  updated_by=updated_by,
+                  created=utcnow)
 
         if ip_address_id:
             LOG.debug('Creating audit entry for ip_address assignment '
                       'to network_interface...')
-            ip_addr_audit = IpAddressAudit(object_id=ip_address_id,
-                                           field='net_if_assignment',
-                                           old_value='created',
-                                           new_value=net_if.id,
-                                           updated_by=updated_by,
-                                           created=utcnow)
+            add_audit(dbsession, IpAddressAudit,
+                      object_id=ip_address_id,
+                      field='net_if_assignment',
+                      old_value='created',
+                      new_value=net_if.id,
+                      updated_by=updated_by,
+                      created=utcnow)
 
-            dbsession.add(ip_addr_audit)
 
         dbsession.flush()
 
@@ -162,6 +197,60 @@ exception: {ex}'''
         LOG.error(msg)
         return api_500(msg=msg)
 
+def create_net_ifs(dbsession, interfaces, updated_by=None):
+    '''Create many network_interfaces with a single multi row INSERT.
+    Returns a dict of unique_id to the new NetworkInterface objects.
+
+    interfaces: A list of dicts with the same keys create_net_if() takes.
+    updated_by: A string that is the user making the change.
+    '''
+
+    if not interfaces:
+        return {}
+
+    utcnow = datetime.utcnow()
+    rows = []
+    for interface in interfaces:
+        row = dict((field, interface.get(field)) for field in NET_IF_FIELDS)
+        row['unique_id'] = row['unique_id'].lower()
+        if row['ip_address_id'] is not None:
+            row['ip_address_id'] = int(row['ip_address_id'])
+        if row['mac_address']:
+            row['mac_address'] = row['mac_address'].lower()
+        row['updated_by'] = updated_by
+        row['created'] = utcnow
+        row['updated'] = utcnow
+        rows.append(row)
+
+    LOG.info('Creating new network_interfaces unique_ids: %s',
+             [row['unique_id'] for row in rows])
+
+    dbsession.execute(NetworkInterface.__table__.insert(), rows)
+    # Core statements don't mark the session as changed, and pyramid_tm rolls
+    # back a session that isn't.
+    mark_changed(dbsession)
+
+    net_ifs = find_net_ifs_by_unique_ids(dbsession, [row['unique_id'] for row in rows])
+
+    for net_if in net_ifs.values():
+        add_audit(dbsession, NetworkInterfaceAudit,
+                  object_id=net_if.id,
+                  field='unique_id',
+                  old_value='created',
+                  new_value=net_if.unique_id,
+                  updated_by=updated_by,
+                  created=utcnow)
+        if net_if.ip_address_id:
+            add_audit(dbsession, IpAddressAudit,
+                      object_id=net_if.ip_address_id,
+                      field='net_if_assignment',
+                      old_value='created',
+                      new_value=net_if.id,
+                      updated_by=updated_by,
+                      created=utcnow)
+
+    return net_ifs
+
 def update_net_if(dbsession,
                   net_if,
                   name=None,
@@ -197,7 +286,7 @@ def update_net_if(dbsession,
 
         # Guarantee mac_address is lowercase
         try:
-            mac_address = mac_address.lower()
+            my_attribs['mac_address'] = my_attribs['mac_address'].lower()
         except AttributeError:
             pass
 
@@ -220,26 +309,26 @@ def update_net_if(dbsession,
                           '%s new_value: %s', my_attribs['unique_id'],
                                               attribute,
                                               new_value)
-                net_if_audit = NetworkInterfaceAudit(object_id=net_if.id,
-                                                     field=attribute,
-                                                     old_value=old_value,
-                                                     new_value=new_value,
-                                                     updated_by=updated_by,
-                                                     created=utcnow)
-                dbsession.add(net_if_audit)
+                add_audit(dbsession, NetworkInterfaceAudit,
+                          object_id=net_if.id,
+                          field=attribute,
+                          old_value=old_value,
+                          new_value=new_value,
+                          updated_by=updated_by,
+                          created=utcnow)
                 setattr(net_if, attribute, new_value)
 
                 if attribute == 'ip_address_id':
                     LOG.debug('Creating audit entry for ip_address assignment '
                               'to network_interface...')
-                    ip_addr_audit = IpAddressAudit(object_id=my_attribs['ip_address_id'],
-                                                   field='net_if_assignment',
-                                                   old_value=old_value,
-                                                   new_value=new_value,
-                                                   updated_by=updated_by,
-                                                   created=utcnow)
+                    add_audit(dbsession, IpAddressAudit,
+                              object_id=my_attribs['ip_address_id'],
+                              field='net_if_assignment',
+                              old_value=old_value,
+                              new_value=new_value,
+                              updated_by=updated_by,
+                              created=utcnow)
 
-                    dbsession.add(ip_addr_audit)
 
         dbsession.flush()
 
@@ -254,6 +343,52 @@ port_vlan: {port_vlan} seen_mac_address: {seen_mac_address} exception: {ex}'''
         LOG.error(msg)
         raise
 
+def get_node_net_if_ids(dbsession, node_id):
+    '''Return the set of network_interface ids assigned to a node.'''
+
+    query = dbsession.query(network_interface_assignments.c.network_interface_id)
+    query = query.filter(network_interface_assignments.c.node_id == node_id)
+
+    return set([row.network_interface_id for row in query])
+
+def change_net_if_assignments(dbsession, node, assign_ids, deassign_ids, user_id):
+    '''Add and remove network_interface_assignments rows for a node with
+    one statement each, and audit the changes.'''
+
+    utcnow = datetime.utcnow()
+
+    if assign_ids or deassign_ids:
+        # Core statements don't mark the session as changed, and pyramid_tm
+        # rolls back a session that isn't.
+        mark_changed(dbsession)
+
+    if assign_ids:
+        dbsession.execute(network_interface_assignments.insert(), [{
+            'node_id': node.id,
+            'network_interface_id': net_if_id,
+        } for net_if_id in sorted(assign_ids)])
+        for net_if_id in sorted(assign_ids):
+            add_audit(dbsession, NodeAudit,
+                      object_id=node.id,
+                      field='network_interface_id',
+                      old_value='assigned',
+                      new_value=net_if_id,
+                      updated_by=user_id,
+                      created=utcnow)
+
+    if deassign_ids:
+        dbsession.execute(network_interface_assignments.delete().where(and_(
+            network_interface_assignments.c.node_id == node.id,
+            network_interface_assignments.c.network_interface_id.in_(deassign_ids))))
+        for net_if_id in sorted(deassign_ids):
+            add_audit(dbsession, NodeAudit,
+                      object_id=node.id,
+                      field='network_interface_id',
+                      old_value=net_if_id,
+                      new_value='deassigned',
+                      updated_by=user_id,
+                      created=utcnow)
+
 def net_ifs_to_node(dbsession, network_interfaces, node, action, user_id):
     '''Manage network_interface assignment/deassignments to a node. Takes a
     list if network_interface objects and assigns/deassigns them to/from the node.
@@ -261,45 +396,30 @@ def net_ifs_to_node(dbsession, network_interfaces, node, action, user_id):
     network_interfaces: a list of NetworkInterface objects to assign to a node.
     node: A Node object to assign the network_interfaces to.
     action: A string defining whether to assign  ('PUT') or de-assign
-        ('DELETE') the network interfaces to/from the node.
+        ('DELETE') the network interfaces to/from the node, or to make them
+        the node's complete set of network interfaces ('SYNC').
     user_id: A sting representing the user_id making this change.
     '''
 
     resp = {node.name: []}
     try:
+        dbsession.flush()
+        current_ids = get_node_net_if_ids(dbsession, node.id)
+
+        net_if_ids = set()
         for net_if in network_interfaces:
             resp[node.name].append(net_if.unique_id)
-
-            utcnow = datetime.utcnow()
-
-            if action == 'PUT':
-                if not net_if in node.network_interfaces:
-                    node.network_interfaces.append(net_if)
-                    audit = NodeAudit(object_id=node.id,
-                                      field='network_interface_id',
-                                      old_value='assigned',
-                                      new_value=net_if.id,
-                                      updated_by=user_id,
-                                      created=utcnow)
-                    dbsession.add(audit)
-            if action == 'DELETE':
-                try:
-                    node.network_interfaces.remove(net_if)
-                    audit = NodeAudit(object_id=node.id,
-                                      field='network_interface_id',
-                                      old_value=net_if.id,
-                                      new_value='deassigned',
-                                      updated_by=user_id,
-                                      created=utcnow)
-                    dbsession.add(audit)
-                except (ValueError, AttributeError):
-                    try:
-                        dbsession.remove(audit)
-                    except  UnboundLocalError:
-                        pass
-
-        dbsession.add(node)
-        dbsession.flush()
+            net_if_ids.add(net_if.id)
+
+        if action == 'PUT':
+            change_net_if_assignments(dbsession, node, net_if_ids - current_ids,
+                                      None, user_id)
+        if action == 'DELETE':
+            change_net_if_assignments(dbsession, node, None,
+                                      net_if_ids & current_ids, user_id)
+        if action == 'SYNC':
+            change_net_if_assignments(dbsession, node, net_if_ids - current_ids,
+                                      current_ids - net_if_ids, user_id)
 
     except (NoResultFound, AttributeError):
         return api_404(msg='node not found')
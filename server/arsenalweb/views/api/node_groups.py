@@ -33,6 +33,12 @@ from arsenalweb.views.api.common import (
     api_501,
     enforce_api_change_limit,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
+from arsenalweb.views.api.enc_cache import (
+    queue_enc_invalidation,
+    )
 from arsenalweb.views.api.nodes import (
     find_node_by_id,
     )
@@ -84,13 +90,13 @@ def create_node_group(dbsession, name, owner, description, notes_url, monitoring
         dbsession.add(node_group)
         dbsession.flush()
 
-        audit = NodeGroupAudit(object_id=node_group.id,
-                               field='name',
-                               old_value='created',
-                               new_value=node_group.name,
-                               updated_by=user,
-                               created=utcnow)
-        dbsession.add(audit)
+        add_audit(dbsession, NodeGroupAudit,
+                  object_id=node_group.id,
+                  field='name',
+                  old_value='created',
+                  new_value=node_group.name,
+                  updated_by=user,
+                  created=utcnow)
         dbsession.flush()
 
         return node_group
@@ -118,31 +124,29 @@ def nodes_to_node_groups(dbsession, node_group, nodes, action, user):
             if action == 'PUT':
                 if not node in node_group.nodes:
                     node_group.nodes.append(node)
-                    audit = NodeAudit(object_id=node.id,
-                                      field='node_group',
-                                      old_value='assigned',
-                                      new_value=node_group.name,
-                                      updated_by=user['name'],
-                                      created=utcnow)
-                    dbsession.add(audit)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=node.id,
+                              field='node_group',
+                              old_value='assigned',
+                              new_value=node_group.name,
+                              updated_by=user['name'],
+                              created=utcnow)
             if action == 'DELETE':
                 try:
                     node_group.nodes.remove(node)
-                    audit = NodeAudit(object_id=node.id,
-                                      field='node_group',
-                                      old_value=node_group.name,
-                                      new_value='deassigned',
-                                      updated_by=user['name'],
-                                      created=utcnow)
-                    dbsession.add(audit)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=node.id,
+                              field='node_group',
+                              old_value=node_group.name,
+                              new_value='deassigned',
+                              updated_by=user['name'],
+                              created=utcnow)
                 except (ValueError, AttributeError):
-                    try:
-                        dbsession.remove(audit)
-                    except  UnboundLocalError:
-                        pass
+                    pass
 
         dbsession.add(node_group)
         dbsession.flush()
+        queue_enc_invalidation(dbsession, node_ids=[int(node_id) for node_id in nodes])
 
     except (NoResultFound, AttributeError):
         return api_404(msg='node not found')
@@ -213,13 +217,13 @@ def api_node_groups_write(request):
                         old_value = getattr(node_group, attribute)
                         if not old_value:
                             old_value = 'None'
-                        node_group_audit = NodeGroupAudit(object_id=node_group.id,
-                                                          field=attribute,
-                                                          old_value=old_value,
-                                                          new_value=locals()[attribute],
-                                                          updated_by=user['name'],
-                                                          created=utcnow)
-                        request.dbsession.add(node_group_audit)
+                        add_audit(request.dbsession, NodeGroupAudit,
+                                  object_id=node_group.id,
+                                  field=attribute,
+                                  old_value=old_value,
+                                  new_value=locals()[attribute],
+                                  updated_by=user['name'],
+                                  created=utcnow)
 
                 node_group.name = name
                 node_group.owner = owner
@@ -13,6 +13,7 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import hashlib
 import logging
 import json
 import operator
@@ -20,6 +21,12 @@ from datetime import datetime
 from pyramid.view import view_config
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.exc import MultipleResultsFound
+from arsenalweb.models.data_centers import (
+    DataCenter,
+    )
+from arsenalweb.models.hardware_profiles import (
+    HardwareProfile,
+    )
 from arsenalweb.models.nodes import (
     Node,
     NodeAudit,
@@ -29,26 +36,36 @@ from arsenalweb.models.node_groups import (
     )
 from arsenalweb.views.api.common import (
     api_200,
+    api_202,
     api_400,
     api_404,
     api_500,
     api_501,
     enforce_api_change_limit,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
 from arsenalweb.views.api.data_centers import (
-    find_data_center_by_name,
     create_data_center,
     )
+from arsenalweb.views.api.dimension_cache import (
+    find_dimension_by_name,
+    )
+from arsenalweb.views.api.enc_cache import (
+    queue_enc_invalidation,
+    )
+from arsenalweb.views.api.register_queue import (
+    REGISTER_QUEUE,
+    )
 from arsenalweb.views.api.hardware_profiles import (
-    get_hardware_profile,
     create_hardware_profile,
     )
 from arsenalweb.views.api.ip_addresses import (
-    find_ip_addr_by_addr,
-    create_ip_addr,
+    find_ip_addrs_by_addrs,
+    create_ip_addrs,
     )
 from arsenalweb.views.api.operating_systems import (
-    get_operating_system,
     create_operating_system,
     )
 from arsenalweb.views.api.physical_devices import (
@@ -61,29 +78,35 @@ from arsenalweb.views.api.ec2_instances import (
     update_ec2_instance,
     )
 from arsenalweb.views.api.network_interfaces import (
-    find_net_if_by_unique_id,
-    create_net_if,
+    find_net_ifs_by_unique_ids,
+    create_net_ifs,
     update_net_if,
     net_ifs_to_node,
     )
 from arsenalweb.views.api.hypervisor_vm_assignments import (
     guest_vms_to_hypervisor,
     )
+from arsenalweb.models.operating_systems import (
+    OperatingSystem,
+    )
 from arsenalweb.models.statuses import (
     Status,
     )
 
 LOG = logging.getLogger(__name__)
 
+# Registration payload keys that change on every run and are left out of the
+# registration fingerprint.
+REGISTRATION_VOLATILE_KEYS = [
+    'uptime',
+]
+
 
 # Functions
 def find_status_by_name(dbsession, status_name):
-    '''Find a status by name.'''
-
-    status = dbsession.query(Status)
-    status = status.filter(Status.name == status_name)
+    '''Find a status by name. Returns a Dimension with its id and name.'''
 
-    return status.one()
+    return find_dimension_by_name(dbsession, Status, status_name)
 
 def find_node_by_name(dbsession, node_name):
     '''Find a node by name.'''
@@ -138,28 +161,29 @@ def node_groups_to_nodes(dbsession, node, node_groups, action, auth_user):
 
             if action == 'PUT':
                 node.node_groups.append(node_group)
-                audit = NodeAudit(object_id=node.id,
-                                  field='node_group',
-                                  old_value='created',
-                                  new_value=node_group.name,
-                                  updated_by=auth_user['user_id'],
-                                  created=utcnow)
-                dbsession.add(audit)
+                add_audit(dbsession, NodeAudit,
+                          object_id=node.id,
+                          field='node_group',
+                          old_value='created',
+                          new_value=node_group.name,
+                          updated_by=auth_user['user_id'],
+                          created=utcnow)
             if action == 'DELETE':
                 try:
-                    audit = NodeAudit(object_id=node.id,
-                                      field='node_group',
-                                      old_value=node_group.name,
-                                      new_value='deleted',
-                                      updated_by=auth_user['user_id'],
-                                      created=utcnow)
-                    dbsession.add(audit)
                     node.node_groups.remove(node_group)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=node.id,
+                              field='node_group',
+                              old_value=node_group.name,
+                              new_value='deleted',
+                              updated_by=auth_user['user_id'],
+                              created=utcnow)
                 except (ValueError, AttributeError):
-                    dbsession.remove(audit)
+                    pass
 
         dbsession.add(node)
         dbsession.flush()
+        queue_enc_invalidation(dbsession, node_ids=[node.id])
 
     except (NoResultFound, AttributeError):
         return api_404(msg='node_group not found')
@@ -173,62 +197,65 @@ def node_groups_to_nodes(dbsession, node, node_groups, action, auth_user):
 
     return api_200(results=resp)
 
+def lookup_cached(lookups, key, finder):
+    '''Return finder() only once per key for a batch of registrations.
+    lookups is a dict shared by the batch, or None to always call finder().'''
+
+    if lookups is None:
+        return finder()
+    try:
+        return lookups[key]
+    except KeyError:
+        lookups[key] = finder()
+        return lookups[key]
+
 def process_network_interfaces(dbsession, network_interfaces, user):
-    '''Process all network interfaces of a node during register.'''
+    '''Process all network interfaces of a node during register. Existing
+    ip_addresses and network_interfaces are looked up with one query each,
+    and the missing ones are created with one INSERT each.'''
 
     try:
-        net_if_list = []
         LOG.debug('network interfaces: %s', json.dumps(network_interfaces,
                                                        indent=4,
                                                        sort_keys=True))
+        # Keyed by unique_id. If an interface is sent twice the last one wins.
+        interfaces = {}
         for interface in network_interfaces:
-            LOG.debug('Working on interface: %s', interface)
-            ip_addr = None
-            try:
-                my_ip = interface['ip_address']
-                if my_ip:
-                    ip_addr = find_ip_addr_by_addr(dbsession, my_ip)
-                    LOG.debug('IP Address found...')
-                    # There's nothing to update. if we ever do have something, it will go here.
-                else:
-                    LOG.debug('This interface does not have an IP Address')
-            except NoResultFound:
-                LOG.debug('IP Address not found found, creating...')
-                ip_addr = create_ip_addr(dbsession, ip_address=my_ip, updated_by=user)
-            # This interface doesn't have an IP key passed.
-            except KeyError:
-                pass
+            interface = dict(interface)
+            interface['unique_id'] = interface['unique_id'].lower()
+            interfaces[interface['unique_id']] = interface
+
+        my_ips = set([x.get('ip_address') for x in interfaces.values() if x.get('ip_address')])
+        ip_addrs = find_ip_addrs_by_addrs(dbsession, my_ips)
+        if my_ips - set(ip_addrs):
+            LOG.debug('IP Addresses not found, creating: %s', my_ips - set(ip_addrs))
+            ip_addrs.update(create_ip_addrs(dbsession,
+                                            my_ips - set(ip_addrs),
+                                            updated_by=user))
+
+        for interface in interfaces.values():
+            # update_net_if() and create_net_ifs() take the id, not the
+            # ip_address.
+            my_ip = interface.pop('ip_address', None)
+            if my_ip:
+                interface['ip_address_id'] = ip_addrs[my_ip].id
+
+        net_ifs = find_net_ifs_by_unique_ids(dbsession, interfaces)
+        new_net_ifs = [x for x in interfaces.values() if x['unique_id'] not in net_ifs]
+        if new_net_ifs:
+            LOG.debug('Interfaces not found, creating...')
+            created = create_net_ifs(dbsession, new_net_ifs, updated_by=user)
 
-            try:
-                net_if = find_net_if_by_unique_id(dbsession, interface['unique_id'])
-                LOG.debug('Interface found, updating...')
-                if ip_addr:
-                    interface['ip_address_id'] = ip_addr.id
-                try:
-                    # Remove this key if present, since update_net_if() doesn't
-                    # have an ip_address kwarg.
-                    del interface['ip_address']
-                except KeyError:
-                    pass
-                updated_net_if = update_net_if(dbsession,
-                                               net_if,
-                                               updated_by=user,
-                                               **interface)
-                net_if_list.append(updated_net_if)
-            except NoResultFound:
-                LOG.debug('Interface not found found, creating...')
-                if ip_addr:
-                    interface['ip_address_id'] = ip_addr.id
-                try:
-                    # Remove this key if present, since create_net_if() doesn't
-                    # have an ip_address kwarg.
-                    del interface['ip_address']
-                except KeyError:
-                    pass
-                net_if = create_net_if(dbsession,
-                                       updated_by=user,
-                                       **interface)
-                net_if_list.append(net_if)
+        net_if_list = []
+        for unique_id, interface in interfaces.items():
+            if unique_id in net_ifs:
+                LOG.debug('Interface found, updating: %s', unique_id)
+                net_if_list.append(update_net_if(dbsession,
+                                                 net_ifs[unique_id],
+                                                 updated_by=user,
+                                                 **interface))
+            else:
+                net_if_list.append(created[unique_id])
 
         return net_if_list
 
@@ -245,16 +272,17 @@ def process_hardware_profile(dbsession, payload, user):
         manufacturer = payload['hardware_profile']['manufacturer'].rstrip()
         model = payload['hardware_profile']['model'].rstrip()
 
-        hardware_profile = get_hardware_profile(dbsession, name)
-
-        if not hardware_profile:
+        try:
+            hardware_profile = find_dimension_by_name(dbsession, HardwareProfile, name)
+        except NoResultFound:
             hardware_profile = create_hardware_profile(dbsession,
                                                        name,
                                                        manufacturer,
                                                        model,
                                                        user)
 
-        LOG.debug('hardware_profile is: %s', hardware_profile.__dict__)
+        LOG.debug('hardware_profile is: %s id: %s', hardware_profile.name,
+                                                    hardware_profile.id)
         return hardware_profile
 
     except Exception as ex:
@@ -272,9 +300,9 @@ def process_operating_system(dbsession, payload, user):
         architecture = payload['operating_system']['architecture'].rstrip()
         description = payload['operating_system']['description'].rstrip()
 
-        operating_system = get_operating_system(dbsession, name)
-
-        if not operating_system:
+        try:
+            operating_system = find_dimension_by_name(dbsession, OperatingSystem, name)
+        except NoResultFound:
             operating_system = create_operating_system(dbsession,
                                                        name,
                                                        variant,
@@ -283,7 +311,8 @@ def process_operating_system(dbsession, payload, user):
                                                        description,
                                                        user)
 
-        LOG.debug('operating_system is: %s', operating_system.__dict__)
+        LOG.debug('operating_system is: %s id: %s', operating_system.name,
+                                                    operating_system.id)
         return operating_system
 
     except Exception as ex:
@@ -355,7 +384,7 @@ def process_data_center(dbsession, payload, user):
     try:
         name = payload['data_center']['name'].rstrip()
 
-        data_center = find_data_center_by_name(dbsession, name)
+        data_center = find_dimension_by_name(dbsession, DataCenter, name)
 
     except NoResultFound:
         LOG.debug('data_center data not found, creating...')
@@ -371,7 +400,7 @@ def process_data_center(dbsession, payload, user):
                   'exception: %s', name, repr(ex))
         raise
 
-    LOG.debug('data_center is: %s', data_center.__dict__)
+    LOG.debug('data_center is: %s id: %s', data_center.name, data_center.id)
     return data_center
 
 def manage_guest_vm_assignments(dbsession, guest_vms, hypervisor, user_id):
@@ -436,13 +465,13 @@ def create_node(dbsession, **kwargs):
         dbsession.add(node)
         dbsession.flush()
 
-        audit = NodeAudit(object_id=node.id,
-                          field='unique_id',
-                          old_value='created',
-                          new_value=node.unique_id,
-                          updated_by=user_id,
-                          created=utcnow)
-        dbsession.add(audit)
+        add_audit(dbsession, NodeAudit,
+                  object_id=node.id,
+                  field='unique_id',
+                  old_value='created',
+                  new_value=node.unique_id,
+                  updated_by=user_id,
+                  created=utcnow)
         dbsession.flush()
 
         net_ifs_to_node(dbsession, net_if_list, node, 'PUT', user_id)
@@ -538,13 +567,16 @@ def update_node(dbsession, node, settings, **kwargs):
                         update_field = attribute
                         update_value = locals()[attribute]
 
-                    audit = NodeAudit(object_id=node.id,
-                                      field=update_field,
-                                      old_value=old_value,
-                                      new_value=update_value,
-                                      updated_by=user_id,
-                                      created=utcnow)
-                    dbsession.add(audit)
+                    add_audit(dbsession, NodeAudit,
+                              object_id=node.id,
+                              field=update_field,
+                              old_value=old_value,
+                              new_value=update_value,
+                              updated_by=user_id,
+                              created=utcnow)
+
+        if node.name != name or node.data_center_id != data_center_id:
+            queue_enc_invalidation(dbsession, node_ids=[node.id])
 
         node.name = name
         node.hardware_profile_id = hardware_profile_id
@@ -558,10 +590,9 @@ def update_node(dbsession, node, settings, **kwargs):
         node.updated_by = user_id
         node.last_registered = utcnow
 
-        net_ifs_to_node(dbsession, net_if_list, node, 'PUT', user_id)
-        # Deassign network_interfaces the node no longer has.
-        deassign_net_ifs = [x for x in node.network_interfaces if x not in net_if_list]
-        net_ifs_to_node(dbsession, deassign_net_ifs, node, 'DELETE', user_id)
+        # Assign the node's network_interfaces and deassign the ones it no
+        # longer has.
+        net_ifs_to_node(dbsession, net_if_list, node, 'SYNC', user_id)
 
         # Manage guest_vm assignemnts
         try:
@@ -583,7 +614,9 @@ def update_node(dbsession, node, settings, **kwargs):
                           'is being reported by node registration.')
 
             pd_status = getattr(settings, 'arsenal.node_hw_map.{0}'.format(node.status.name))
-            final_status = find_status_by_name(dbsession, pd_status)
+            final_status = lookup_cached(kwargs.get('lookups'),
+                                         ('status', pd_status),
+                                         lambda: find_status_by_name(dbsession, pd_status))
             final_status_id = final_status.id
 
             if node.physical_device.status_id != final_status_id:
@@ -610,9 +643,39 @@ def update_node(dbsession, node, settings, **kwargs):
 
     return node
 
-def process_registration_payload(dbsession, payload, user_id):
+def registration_fingerprint(payload):
+    '''Return a sha256 hex digest of a registration payload, minus the
+    volatile keys. Must be computed the same way as the client's
+    Nodes.fingerprint().'''
+
+    stable = dict((key, val) for key, val in payload.items()
+                  if key not in REGISTRATION_VOLATILE_KEYS)
+    stable = json.dumps(stable, sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(stable.encode('utf-8')).hexdigest()
+
+def register_unchanged_node(dbsession, unique_id, fingerprint, uptime, user_id):
+    '''Registration fast path for a node whose facts haven't changed since its
+    last full registration. Updates uptime and last_registered in a single
+    UPDATE if the node's stored fingerprint matches. Returns True if the node
+    was updated, False if a full registration is needed.'''
+
+    query = dbsession.query(Node)
+    query = query.filter(Node.unique_id == unique_id.lower().rstrip())
+    query = query.filter(Node.registration_fingerprint == fingerprint)
+    updated = query.update({
+        Node.uptime: uptime.rstrip(),
+        Node.last_registered: datetime.utcnow(),
+        Node.updated_by: user_id,
+    }, synchronize_session=False)
+
+    return updated == 1
+
+def process_registration_payload(dbsession, payload, user_id, lookups=None):
     '''Process the payload of a node registration and return a dictionary for
-    updating or creating a node.'''
+    updating or creating a node. lookups is an optional dict for sharing
+    hardware_profile, operating_system and data_center lookups across a batch
+    of registrations.'''
 
     LOG.debug('Processing registration payload...')
 
@@ -629,15 +692,24 @@ def process_registration_payload(dbsession, payload, user_id):
         processed['processor_count'] = int(payload['processor_count'])
         processed['uptime'] = payload['uptime'].rstrip()
 
-        hardware_profile = process_hardware_profile(dbsession, payload, user_id)
+        hardware_profile = lookup_cached(
+            lookups,
+            ('hardware_profile', json.dumps(payload['hardware_profile'], sort_keys=True)),
+            lambda: process_hardware_profile(dbsession, payload, user_id))
         processed['hardware_profile_id'] = hardware_profile.id
         processed['hardware_profile_name'] = hardware_profile.name
 
-        operating_system = process_operating_system(dbsession, payload, user_id)
+        operating_system = lookup_cached(
+            lookups,
+            ('operating_system', json.dumps(payload['operating_system'], sort_keys=True)),
+            lambda: process_operating_system(dbsession, payload, user_id))
         processed['operating_system_id'] = operating_system.id
         processed['operating_system_name'] = operating_system.name
 
-        data_center = process_data_center(dbsession, payload, user_id)
+        data_center = lookup_cached(
+            lookups,
+            ('data_center', json.dumps(payload.get('data_center'), sort_keys=True)),
+            lambda: process_data_center(dbsession, payload, user_id))
         try:
             processed['data_center_id'] = data_center.id
             processed['data_center_name'] = data_center.name
@@ -672,6 +744,74 @@ def process_registration_payload(dbsession, payload, user_id):
                                                           user_id)
     return processed
 
+# The keys a registration payload must have to be queued.
+REGISTRATION_REQUIRED_KEYS = [
+    'unique_id',
+    'name',
+    'serial_number',
+    'processor_count',
+    'uptime',
+    'hardware_profile',
+    'operating_system',
+    'network_interfaces',
+]
+
+def validate_registration_payload(payload):
+    '''Return a list of the required keys missing from a registration
+    payload.'''
+
+    try:
+        return [key for key in REGISTRATION_REQUIRED_KEYS if key not in payload]
+    except TypeError:
+        return REGISTRATION_REQUIRED_KEYS
+
+def register_node(dbsession, settings, payload, user_id, lookups=None):
+    '''Register a single node from a registration payload, creating it if it
+    doesn't exist. Returns the node, or None if its fingerprint matched and
+    only uptime was updated.'''
+
+    fingerprint = registration_fingerprint(payload)
+    try:
+        if register_unchanged_node(dbsession,
+                                   payload['unique_id'],
+                                   fingerprint,
+                                   payload['uptime'],
+                                   user_id):
+            LOG.info('Node unchanged since last registration: %s',
+                     payload['unique_id'])
+            return None
+    except (KeyError, AttributeError):
+        # Let process_registration_payload() complain about the payload.
+        pass
+
+    processed = process_registration_payload(dbsession,
+                                             payload,
+                                             user_id,
+                                             lookups=lookups)
+    processed['lookups'] = lookups
+
+    try:
+        existing_node = find_node_by_unique_id(dbsession, processed['unique_id'])
+        node = update_node(dbsession, existing_node, settings, **processed)
+    except NoResultFound:
+        node = create_node(dbsession, **processed)
+
+    node.registration_fingerprint = fingerprint
+
+    return node
+
+def start_register_queue(registry):
+    '''Start this process's registration queue workers if the queue is
+    enabled and they aren't running yet. Called when the application is
+    created, so registrations left in the queue by a restart are applied
+    without waiting for a new one, and before every enqueue for worker
+    processes forked after that.'''
+
+    if REGISTER_QUEUE.enabled:
+        REGISTER_QUEUE.start(registry['dbsession_factory'],
+                             registry.settings,
+                             register_node)
+
 @view_config(route_name='api_nodes', request_method='GET', request_param='schema=true', renderer='json')
 def api_node_schema(request):
     '''Schema document for nodes API'''
@@ -765,6 +905,7 @@ def api_node_write_id(request):
                 setattr(node, key, int(val))
 
         node.updated_by = user['name']
+        node.registration_fingerprint = None
         request.dbsession.flush()
 
     except Exception as ex:
@@ -777,24 +918,53 @@ def api_node_write_id(request):
 def api_node_register(request):
     '''Process registration requests for the /api/register route.'''
 
+    payload = {}
     try:
         LOG.info('Registering node')
         user = request.identity
+
+        # Clients send the fingerprint of the payload in the headers so that
+        # unchanged nodes can be handled without reading the body.
+        fingerprint = request.headers.get('X-Arsenal-Fingerprint')
+        unique_id = request.headers.get('X-Arsenal-Unique-Id')
+        uptime = request.headers.get('X-Arsenal-Uptime')
+        if fingerprint and unique_id and uptime is not None:
+            if register_unchanged_node(request.dbsession,
+                                       unique_id,
+                                       fingerprint,
+                                       uptime,
+                                       user['name']):
+                LOG.info('Node unchanged since last registration: %s', unique_id)
+                return api_200(results={
+                    'unique_id': unique_id,
+                    'registration_fingerprint': fingerprint,
+                })
+
         payload = request.json_body
-        processed = process_registration_payload(request.dbsession, payload, user['name'])
         settings = request.registry.settings
 
-        try:
-            existing_node = find_node_by_unique_id(request.dbsession, processed['unique_id'])
-            node = update_node(request.dbsession, existing_node, settings, **processed)
-        except NoResultFound:
-            node = create_node(request.dbsession, **processed)
+        if REGISTER_QUEUE.enabled:
+            missing = validate_registration_payload(payload)
+            if missing:
+                return api_400(msg='Missing required parameters: {0}'.format(missing))
+            start_register_queue(request.registry)
+            unique_id = payload['unique_id'].lower().rstrip()
+            coalesced = REGISTER_QUEUE.enqueue(unique_id, payload, user['name'])
+            return api_202(results={
+                'unique_id': unique_id,
+                'coalesced': coalesced,
+            })
+
+        node = register_node(request.dbsession, settings, payload, user['name'])
+        if node is None:
+            node = find_node_by_unique_id(request.dbsession,
+                                          payload['unique_id'].lower().rstrip())
 
         return api_200(results=node)
 
     except Exception as ex:
         msg = 'Error registering new node: {0} API: {1} exception: ' \
-              '{2}'.format(processed['name'], request.url, repr(ex))
+              '{2}'.format(payload.get('name'), request.url, repr(ex))
         LOG.error(msg)
         return api_500(msg=msg)
 
@@ -826,26 +996,27 @@ def api_node_write(request):
             # FIXME: This should iterate over all updateable params, not be
             # hardcoded to name and status_id.
             if node.name != node_name:
-                audit = NodeAudit(object_id=node.id,
-                                  field='node_name',
-                                  old_value=node.name,
-                                  new_value=node_name,
-                                  updated_by=user['name'],
-                                  created=utcnow)
-                request.dbsession.add(audit)
+                add_audit(request.dbsession, NodeAudit,
+                          object_id=node.id,
+                          field='node_name',
+                          old_value=node.name,
+                          new_value=node_name,
+                          updated_by=user['name'],
+                          created=utcnow)
                 node.name = node_name
 
             if node.status_id != status_id:
-                audit_status = NodeAudit(object_id=node.id,
-                                         field='status_id',
-                                         old_value=node.status_id,
-                                         new_value=status_id,
-                                         updated_by=user['name'],
-                                         created=utcnow)
-                request.dbsession.add(audit_status)
+                add_audit(request.dbsession, NodeAudit,
+                          object_id=node.id,
+                          field='status_id',
+                          old_value=node.status_id,
+                          new_value=status_id,
+                          updated_by=user['name'],
+                          created=utcnow)
                 node.status_id = status_id
 
             node.updated_by = user['name']
+            node.registration_fingerprint = None
             request.dbsession.flush()
 
         except NoResultFound:
@@ -869,13 +1040,13 @@ def api_node_write(request):
                 request.dbsession.add(node)
                 request.dbsession.flush()
 
-                audit = NodeAudit(object_id=node.id,
-                                  field='unique_id',
-                                  old_value='created',
-                                  new_value=node.unique_id,
-                                  updated_by=user['name'],
-                                  created=utcnow)
-                request.dbsession.add(audit)
+                add_audit(request.dbsession, NodeAudit,
+                          object_id=node.id,
+                          field='unique_id',
+                          old_value='created',
+                          new_value=node.unique_id,
+                          updated_by=user['name'],
+                          created=utcnow)
                 request.dbsession.flush()
 
             except Exception as ex:
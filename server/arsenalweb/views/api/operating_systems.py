@@ -20,6 +20,12 @@ from sqlalchemy.orm.exc import NoResultFound
 from arsenalweb.views.api.common import (
     api_500,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
+from arsenalweb.views.api.dimension_cache import (
+    queue_dimension_invalidation,
+    )
 from arsenalweb.models.operating_systems import (
     OperatingSystem,
     OperatingSystemAudit,
@@ -66,14 +72,15 @@ def create_operating_system(dbsession, name, variant, version_number, architectu
                                            updated=utcnow)
         dbsession.add(operating_system)
         dbsession.flush()
-
-        audit = OperatingSystemAudit(object_id=operating_system.id,
-                                     field='name',
-                                     old_value='created',
-                                     new_value=operating_system.name,
-                                     updated_by=user_id,
-                                     created=utcnow)
-        dbsession.add(audit)
+        queue_dimension_invalidation(dbsession, OperatingSystem)
+
+        add_audit(dbsession, OperatingSystemAudit,
+                  object_id=operating_system.id,
+                  field='name',
+                  old_value='created',
+                  new_value=operating_system.name,
+                  updated_by=user_id,
+                  created=utcnow)
         dbsession.flush()
 
         return operating_system
@@ -116,13 +123,13 @@ def update_operating_system(dbsession,
                           'description']:
             if getattr(operating_system, attribute) != locals()[attribute]:
                 LOG.debug('Updating operating system %s: %s', attribute, locals()[attribute])
-                audit = OperatingSystemAudit(object_id=operating_system.id,
-                                             field=attribute,
-                                             old_value=getattr(operating_system, attribute),
-                                             new_value=locals()[attribute],
-                                             updated_by=user_id,
-                                             created=utcnow)
-                dbsession.add(audit)
+                add_audit(dbsession, OperatingSystemAudit,
+                          object_id=operating_system.id,
+                          field=attribute,
+                          old_value=getattr(operating_system, attribute),
+                          new_value=locals()[attribute],
+                          updated_by=user_id,
+                          created=utcnow)
 
         operating_system.name = name
         operating_system.variant = variant
@@ -132,6 +139,7 @@ def update_operating_system(dbsession,
         operating_system.updated_by = user_id
 
         dbsession.flush()
+        queue_dimension_invalidation(dbsession, OperatingSystem)
 
         return operating_system
 
@@ -27,8 +27,11 @@ from arsenalweb.views.api.common import (
     collect_params,
     enforce_api_change_limit,
     )
-from arsenalweb.views.api.hardware_profiles import (
-    get_hardware_profile,
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
+from arsenalweb.views.api.dimension_cache import (
+    find_dimension_by_name,
     )
 from arsenalweb.views.api.physical_locations import (
     find_physical_location_by_name,
@@ -39,6 +42,9 @@ from arsenalweb.views.api.physical_racks import (
 from arsenalweb.views.api.physical_elevations import (
     find_physical_elevation_by_elevation,
     )
+from arsenalweb.models.hardware_profiles import (
+    HardwareProfile,
+    )
 from arsenalweb.models.physical_devices import (
     PhysicalDevice,
     PhysicalDeviceAudit,
@@ -52,12 +58,9 @@ LOG = logging.getLogger(__name__)
 
 # Functions
 def find_status_by_name(dbsession, status_name):
-    '''Find a status by name.'''
-
-    status = dbsession.query(Status)
-    status = status.filter(Status.name == status_name)
+    '''Find a status by name. Returns a Dimension with its id and name.'''
 
-    return status.one()
+    return find_dimension_by_name(dbsession, Status, status_name)
 
 def find_physical_device_by_serial(dbsession, serial_number):
     '''Find a physical_device by serial_number. Returns a physical_device object if found,
@@ -166,13 +169,13 @@ def create_physical_device(dbsession,
         dbsession.add(physical_device)
         dbsession.flush()
 
-        audit = PhysicalDeviceAudit(object_id=physical_device.id,
-                                    field='serial_number',
-                                    old_value='created',
-                                    new_value=physical_device.serial_number,
-                                    updated_by=updated_by,
-                                    created=utcnow)
-        dbsession.add(audit)
+        add_audit(dbsession, PhysicalDeviceAudit,
+                  object_id=physical_device.id,
+                  field='serial_number',
+                  old_value='created',
+                  new_value=physical_device.serial_number,
+                  updated_by=updated_by,
+                  created=utcnow)
         dbsession.flush()
 
         return api_200(results=physical_device)
@@ -263,13 +266,13 @@ def update_physical_device(dbsession, physical_device, **kwargs):
                     LOG.debug('Updating physical_device: %s attribute: '
                               'inservice_date new_value: %s', physical_device.serial_number,
                                                   utcnow)
-                    audit = PhysicalDeviceAudit(object_id=physical_device.id,
-                                                field='inservice_date',
-                                                old_value='None',
-                                                new_value=utcnow,
-                                                updated_by=my_attribs['updated_by'],
-                                                created=utcnow)
-                    dbsession.add(audit)
+                    add_audit(dbsession, PhysicalDeviceAudit,
+                              object_id=physical_device.id,
+                              field='inservice_date',
+                              old_value='None',
+                              new_value=utcnow,
+                              updated_by=my_attribs['updated_by'],
+                              created=utcnow)
                     setattr(physical_device, 'inservice_date', utcnow)
                 else:
                     LOG.debug("Update not required.")
@@ -282,13 +285,13 @@ def update_physical_device(dbsession, physical_device, **kwargs):
                           '%s new_value: %s', physical_device.serial_number,
                                               attribute,
                                               new_value)
-                audit = PhysicalDeviceAudit(object_id=physical_device.id,
-                                            field=attribute,
-                                            old_value=old_value,
-                                            new_value=new_value,
-                                            updated_by=my_attribs['updated_by'],
-                                            created=utcnow)
-                dbsession.add(audit)
+                add_audit(dbsession, PhysicalDeviceAudit,
+                          object_id=physical_device.id,
+                          field=attribute,
+                          old_value=old_value,
+                          new_value=new_value,
+                          updated_by=my_attribs['updated_by'],
+                          created=utcnow)
                 setattr(physical_device, attribute, new_value)
 
         dbsession.flush()
@@ -383,10 +386,12 @@ def convert_names_to_ids(dbsession, params):
             except TypeError:
                 hw_profile_name = params['hardware_profile']
             try:
-                hardware_profile = get_hardware_profile(dbsession, hw_profile_name)
+                hardware_profile = find_dimension_by_name(dbsession,
+                                                          HardwareProfile,
+                                                          hw_profile_name)
                 params['hardware_profile_id'] = hardware_profile.id
                 del params['hardware_profile']
-            except AttributeError:
+            except NoResultFound:
                 msg = 'hardware_profile not found: {0}'.format(params['hardware_profile'])
                 LOG.error(msg)
                 raise NoResultFound(msg)
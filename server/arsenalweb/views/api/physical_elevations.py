@@ -25,6 +25,9 @@ from arsenalweb.views.api.common import (
     collect_params,
     enforce_api_change_limit,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
 from arsenalweb.views.api.physical_racks import (
     find_physical_rack_by_name_loc,
     )
@@ -96,13 +99,13 @@ def create_physical_elevation(dbsession,
         dbsession.add(physical_elevation)
         dbsession.flush()
 
-        audit = PhysicalElevationAudit(object_id=physical_elevation.id,
-                                       field='elevation',
-                                       old_value='created',
-                                       new_value=physical_elevation.elevation,
-                                       updated_by=updated_by,
-                                       created=utcnow)
-        dbsession.add(audit)
+        add_audit(dbsession, PhysicalElevationAudit,
+                  object_id=physical_elevation.id,
+                  field='elevation',
+                  old_value='created',
+                  new_value=physical_elevation.elevation,
+                  updated_by=updated_by,
+                  created=utcnow)
         dbsession.flush()
 
         return api_200(results=physical_elevation)
@@ -149,13 +152,13 @@ def update_physical_elevation(dbsession, physical_elevation, **kwargs):
                           '%s new_value: %s', physical_elevation.elevation,
                                               attribute,
                                               new_value)
-                audit = PhysicalElevationAudit(object_id=physical_elevation.id,
-                                               field=attribute,
-                                               old_value=old_value,
-                                               new_value=new_value,
-                                               updated_by=kwargs['updated_by'],
-                                               created=utcnow)
-                dbsession.add(audit)
+                add_audit(dbsession, PhysicalElevationAudit,
+                          object_id=physical_elevation.id,
+                          field=attribute,
+                          old_value=old_value,
+                          new_value=new_value,
+                          updated_by=kwargs['updated_by'],
+                          created=utcnow)
                 setattr(physical_elevation, attribute, new_value)
 
         dbsession.flush()
@@ -25,6 +25,12 @@ from arsenalweb.views.api.common import (
     collect_params,
     enforce_api_change_limit,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
+from arsenalweb.views.api.dimension_cache import (
+    find_dimension_by_name,
+    )
 from arsenalweb.views.api.data_centers import (
     find_data_center_by_name,
 )
@@ -60,16 +66,13 @@ def find_physical_location_by_id(dbsession, physical_location_id):
     return physical_location.one()
 
 def find_status_by_name(dbsession, status_name):
-    '''Find a status by name. Returns a status object if found, raises
-    exception otherwise.
+    '''Find a status by name. Returns a Dimension with the status id and
+    name if found, raises exception otherwise.
 
     status_name: A string that is the name of the status to search for.
     '''
 
-    status = dbsession.query(Status)
-    status = status.filter(Status.name == status_name)
-
-    return status.one()
+    return find_dimension_by_name(dbsession, Status, status_name)
 
 def create_physical_location(dbsession,
                              name=None,
@@ -126,13 +129,13 @@ def create_physical_location(dbsession,
         dbsession.add(physical_location)
         dbsession.flush()
 
-        audit = PhysicalLocationAudit(object_id=physical_location.id,
-                                      field='name',
-                                      old_value='created',
-                                      new_value=physical_location.name,
-                                      updated_by=updated_by,
-                                      created=utcnow)
-        dbsession.add(audit)
+        add_audit(dbsession, PhysicalLocationAudit,
+                  object_id=physical_location.id,
+                  field='name',
+                  old_value='created',
+                  new_value=physical_location.name,
+                  updated_by=updated_by,
+                  created=utcnow)
         dbsession.flush()
 
         return api_200(results=physical_location)
@@ -190,13 +193,13 @@ def update_physical_location(dbsession, physical_location, **kwargs):
                           '%s new_value: %s', physical_location.name,
                                               attribute,
                                               new_value)
-                audit = PhysicalLocationAudit(object_id=physical_location.id,
-                                              field=attribute,
-                                              old_value=old_value,
-                                              new_value=new_value,
-                                              updated_by=my_attribs['updated_by'],
-                                              created=utcnow)
-                dbsession.add(audit)
+                add_audit(dbsession, PhysicalLocationAudit,
+                          object_id=physical_location.id,
+                          field=attribute,
+                          old_value=old_value,
+                          new_value=new_value,
+                          updated_by=my_attribs['updated_by'],
+                          created=utcnow)
                 setattr(physical_location, attribute, new_value)
 
         dbsession.flush()
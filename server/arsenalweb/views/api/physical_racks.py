@@ -26,6 +26,9 @@ from arsenalweb.views.api.common import (
     collect_params,
     enforce_api_change_limit,
     )
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    )
 from arsenalweb.views.api.physical_locations import (
     find_physical_location_by_name,
     )
@@ -105,13 +108,13 @@ def create_physical_rack(dbsession,
         dbsession.add(physical_rack)
         dbsession.flush()
 
-        audit = PhysicalRackAudit(object_id=physical_rack.id,
-                                  field='name',
-                                  old_value='created',
-                                  new_value=physical_rack.name,
-                                  updated_by=updated_by,
-                                  created=utcnow)
-        dbsession.add(audit)
+        add_audit(dbsession, PhysicalRackAudit,
+                  object_id=physical_rack.id,
+                  field='name',
+                  old_value='created',
+                  new_value=physical_rack.name,
+                  updated_by=updated_by,
+                  created=utcnow)
         dbsession.flush()
 
         return api_200(results=physical_rack)
@@ -174,13 +177,13 @@ def update_physical_rack(dbsession, physical_rack, **kwargs):
                           '%s new_value: %s', physical_rack.name,
                                               attribute,
                                               new_value)
-                audit = PhysicalRackAudit(object_id=physical_rack.id,
-                                          field=attribute,
-                                          old_value=old_value,
-                                          new_value=new_value,
-                                          updated_by=my_attribs['updated_by'],
-                                          created=utcnow)
-                dbsession.add(audit)
+                add_audit(dbsession, PhysicalRackAudit,
+                          object_id=physical_rack.id,
+                          field=attribute,
+                          old_value=old_value,
+                          new_value=new_value,
+                          updated_by=my_attribs['updated_by'],
+                          created=utcnow)
                 setattr(physical_rack, attribute, new_value)
 
         dbsession.flush()
@@ -0,0 +1,296 @@
+'''Arsenal API registration queue.'''
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import collections
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import transaction
+from arsenalweb.models import get_tm_session
+
+LOG = logging.getLogger(__name__)
+
+
+class RegisterQueue(object):
+    '''Queue of pending node registrations backed by a local SQLite file.
+
+    There is at most one pending registration per unique_id. Enqueueing a
+    node that is already waiting replaces its payload with the newer one but
+    keeps its place in the queue, so a node that registers often can't
+    starve the rest. Every process that shares the file can enqueue and
+    apply. Claiming a row marks it in flight instead of removing it, and an
+    in flight unique_id is not claimed again, so a node is never applied by
+    two workers at once. The row is removed once it has been applied, unless
+    a newer payload arrived in the meantime, which is then claimed as
+    usual. A claim that isn't finished within claim_timeout seconds, because
+    its process died, is claimed again.
+
+    A registration that fails to apply is logged and dropped. The node sends
+    a fresh one the next time it registers.'''
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.workers = 2
+        self.claim_timeout = 300
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.pid = None
+        self.applied_at = collections.deque()
+        self.stats = {
+            'enqueued': 0,
+            'coalesced': 0,
+            'applied': 0,
+            'failed': 0,
+            'last_apply_lag': 0.0,
+        }
+
+    def connect(self):
+        '''Return a new connection to the queue file. sqlite3 connections
+        can't be shared between threads, so each operation opens its own.'''
+
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('CREATE TABLE IF NOT EXISTS registrations ('
+                     'unique_id TEXT PRIMARY KEY, '
+                     'payload TEXT NOT NULL, '
+                     'user_id TEXT NOT NULL, '
+                     'enqueued REAL NOT NULL, '
+                     'updated REAL NOT NULL, '
+                     'claimed_by TEXT, '
+                     'claimed_at REAL)')
+        return conn
+
+    def enqueue(self, unique_id, payload, user_id):
+        '''Add a registration to the queue, replacing the pending one for
+        the same unique_id if there is one. Returns True if it was
+        coalesced into a pending registration.'''
+
+        now = time.time()
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute('UPDATE registrations SET payload = ?, '
+                                  'user_id = ?, updated = ? WHERE unique_id = ?',
+                                  (json.dumps(payload), user_id, now, unique_id))
+            coalesced = cursor.rowcount > 0
+            if not coalesced:
+                conn.execute('INSERT INTO registrations (unique_id, payload, '
+                             'user_id, enqueued, updated) VALUES (?, ?, ?, ?, ?)',
+                             (unique_id, json.dumps(payload), user_id, now, now))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+        with self.lock:
+            self.stats['enqueued'] += 1
+            if coalesced:
+                self.stats['coalesced'] += 1
+        self.wakeup.set()
+
+        return coalesced
+
+    def claim(self):
+        '''Mark the oldest pending registration that isn't already in flight
+        as claimed by this thread and return it as (unique_id, payload,
+        user_id, enqueued, updated), or None if there is nothing to claim.'''
+
+        now = time.time()
+        claimed_by = '{0}:{1}'.format(os.getpid(), threading.current_thread().name)
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT unique_id, payload, user_id, enqueued, '
+                               'updated FROM registrations WHERE claimed_by '
+                               'IS NULL OR claimed_at < ? ORDER BY enqueued '
+                               'LIMIT 1', (now - self.claim_timeout,)).fetchone()
+            if row:
+                conn.execute('UPDATE registrations SET claimed_by = ?, '
+                             'claimed_at = ? WHERE unique_id = ?',
+                             (claimed_by, now, row[0]))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+        if not row:
+            return None
+        return row[0], json.loads(row[1]), row[2], row[3], row[4]
+
+    def finish(self, unique_id, updated):
+        '''Remove a claimed registration once it has been applied. If it was
+        replaced by a newer payload since it was claimed, release the claim
+        instead so the newer payload is applied too.'''
+
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute('DELETE FROM registrations WHERE unique_id = ? '
+                                  'AND updated = ?', (unique_id, updated))
+            if not cursor.rowcount:
+                conn.execute('UPDATE registrations SET claimed_by = NULL, '
+                             'claimed_at = NULL WHERE unique_id = ?',
+                             (unique_id,))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def start(self, dbsession_factory, settings, apply_func):
+        '''Start the worker threads for this process if they aren't running.
+
+        apply_func(dbsession, settings, payload, user_id) applies one
+        registration.'''
+
+        with self.lock:
+            # Threads don't survive a fork, so a forked worker starts its own.
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.stopping.clear()
+            self.threads = []
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self.run,
+                                          args=(dbsession_factory, settings,
+                                                apply_func))
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+            LOG.info('Started %s registration queue workers.', self.workers)
+
+    def stop(self):
+        '''Stop this process's worker threads and wait for them to finish the
+        registration they are applying.'''
+
+        with self.lock:
+            threads = self.threads
+            self.threads = []
+            self.pid = None
+        self.stopping.set()
+        self.wakeup.set()
+        for thread in threads:
+            thread.join()
+        LOG.info('Stopped %s registration queue workers.', len(threads))
+
+    def run(self, dbsession_factory, settings, apply_func):
+        '''Apply queued registrations until the process exits or stop() is
+        called.'''
+
+        while not self.stopping.is_set():
+            try:
+                item = self.claim()
+            except sqlite3.Error as ex:
+                LOG.error('Unable to read the registration queue: %s', repr(ex))
+                item = None
+
+            if not item:
+                # Other processes sharing the file don't wake us up, so
+                # poll as well.
+                self.wakeup.wait(1)
+                self.wakeup.clear()
+                continue
+
+            unique_id, payload, user_id, enqueued, updated = item
+            try:
+                self.apply(dbsession_factory, settings, apply_func, payload,
+                           user_id)
+                failed = False
+            except Exception as ex:
+                LOG.error('Error applying queued registration for unique_id: '
+                          '%s exception: %s', unique_id, repr(ex))
+                failed = True
+
+            try:
+                self.finish(unique_id, updated)
+            except sqlite3.Error as ex:
+                # The claim times out and the registration is applied again.
+                LOG.error('Unable to update the registration queue: %s', repr(ex))
+
+            now = time.time()
+            with self.lock:
+                if failed:
+                    self.stats['failed'] += 1
+                    continue
+                self.stats['applied'] += 1
+                self.stats['last_apply_lag'] = round(now - enqueued, 3)
+                self.applied_at.append(now)
+                self.prune_applied_at(now)
+
+    def prune_applied_at(self, now):
+        '''Forget the applies that fall outside the one minute apply_rate
+        window. Call with the lock held.'''
+
+        while self.applied_at and now - self.applied_at[0] > 60:
+            self.applied_at.popleft()
+
+    @staticmethod
+    def apply(dbsession_factory, settings, apply_func, payload, user_id):
+        '''Apply a single registration in its own transaction.'''
+
+        manager = transaction.TransactionManager(explicit=True)
+        with manager:
+            dbsession = get_tm_session(dbsession_factory, manager)
+            apply_func(dbsession, settings, payload, user_id)
+
+    def report(self):
+        '''Return queue depth, lag and apply rate along with the counters
+        for this process.'''
+
+        conn = self.connect()
+        try:
+            depth, in_flight, oldest = conn.execute(
+                'SELECT COUNT(*), COUNT(claimed_by), MIN(enqueued) '
+                'FROM registrations').fetchone()
+        finally:
+            conn.close()
+
+        now = time.time()
+        with self.lock:
+            self.prune_applied_at(now)
+            resp = dict(self.stats)
+            resp['apply_rate'] = round(len(self.applied_at) / 60.0, 3)
+            resp['workers'] = len([x for x in self.threads if x.is_alive()])
+        resp['depth'] = depth
+        resp['in_flight'] = in_flight
+        resp['lag'] = round(now - oldest, 3) if oldest else 0.0
+
+        return resp
+
+
+REGISTER_QUEUE = RegisterQueue()
+
+def configure_register_queue(settings):
+    '''Enable the registration queue if arsenal.register.queue_path is set.
+    arsenal.register.queue_workers is the number of worker threads each
+    process runs. arsenal.register.queue_claim_timeout is how many seconds
+    a registration can be in flight before another worker claims it.'''
+
+    path = settings.get('arsenal.register.queue_path')
+    if not path:
+        return
+
+    REGISTER_QUEUE.enabled = True
+    REGISTER_QUEUE.path = path
+    try:
+        REGISTER_QUEUE.workers = int(settings['arsenal.register.queue_workers'])
+    except (KeyError, ValueError):
+        pass
+    try:
+        REGISTER_QUEUE.claim_timeout = int(settings['arsenal.register.queue_claim_timeout'])
+    except (KeyError, ValueError):
+        pass
+    LOG.info('Registrations will be queued in: %s', path)
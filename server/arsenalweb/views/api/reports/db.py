@@ -14,11 +14,14 @@
 #  limitations under the License.
 #
 import logging
+import threading
+import time
 from pyramid.view import view_config
 from pyramid.response import Response
 from sqlalchemy.orm.exc import NoResultFound
 from arsenalweb.views.api.common import (
     api_200,
+    api_400,
 )
 from arsenalweb.models.common import (
     Base,
@@ -35,9 +38,164 @@ def api_reports_db_schema(request):
 
     return tag
 
+ROW_COUNT_MODES = [
+    'cached',
+    'estimate',
+    'exact',
+]
+
+class RowCountCache(object):
+    '''Per process snapshot of exact table row counts. Stale figures are
+    served while a single background thread recounts them one table at a
+    time, so each figure has its own age.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.refreshing = False
+
+    def snapshot(self):
+        '''Return a dict of table name to (count, counted_at).'''
+
+        with self.lock:
+            return dict(self.counts)
+
+    def refresh(self, dbsession_factory):
+        '''Recount every table with a session of our own.'''
+
+        dbsession = dbsession_factory()
+        try:
+            for my_table, my_count in count_rows(dbsession):
+                with self.lock:
+                    self.counts[my_table] = (my_count, time.time())
+        except Exception as ex:
+            LOG.error('Error refreshing row counts: %s', repr(ex))
+        finally:
+            dbsession.close()
+            with self.lock:
+                self.refreshing = False
+
+    def get(self, dbsession_factory, ttl):
+        '''Return the snapshot, starting a background refresh if any figure
+        is older than ttl. The very first call counts in the foreground since
+        there is nothing to serve yet.'''
+
+        with self.lock:
+            if not self.counts:
+                first = True
+            else:
+                first = False
+                now = time.time()
+                stale = any(now - counted_at >= ttl for _, counted_at in
+                            self.counts.values())
+                if not stale or self.refreshing:
+                    return dict(self.counts)
+            self.refreshing = True
+
+        if first:
+            self.refresh(dbsession_factory)
+        else:
+            LOG.debug('Starting background row count refresh.')
+            thread = threading.Thread(target=self.refresh,
+                                      args=(dbsession_factory,))
+            thread.daemon = True
+            thread.start()
+
+        return self.snapshot()
+
+
+ROW_COUNT_CACHE = RowCountCache()
+
+def count_rows(dbsession, tables=None):
+    '''Generator of (table, count) for every table, or just the given
+    tables, using SELECT COUNT(*). These are full scans on InnoDB.'''
+
+    for my_table in tables or Base.metadata.tables.keys():
+        LOG.debug('Counting rows in table {0}'.format(my_table))
+        table_count = dbsession.execute('SELECT COUNT(*) FROM {0}'.format(my_table))
+        table_count = table_count.fetchone()
+        LOG.debug('table: {0} count: {1}'.format(my_table, table_count[0]))
+        yield my_table, table_count[0]
+
+def estimate_rows(dbsession):
+    '''Return a dict of table name to estimated row count from
+    information_schema. InnoDB estimates can be off by 40-50% but cost a
+    single query. Tables information_schema has no figure for are left
+    out.'''
+
+    query = dbsession.execute(
+        'SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES '
+        'WHERE TABLE_SCHEMA = DATABASE()')
+
+    estimates = {}
+    for row in query:
+        if row[0] in Base.metadata.tables and row[1] is not None:
+            estimates[row[0]] = row[1]
+
+    return estimates
+
+def get_row_count_settings(settings):
+    '''Return the default row count mode and the cache ttl in seconds from
+    arsenal.reports.db.row_counts and arsenal.reports.db.row_count_ttl.'''
+
+    mode = settings.get('arsenal.reports.db.row_counts', 'cached') or 'cached'
+    try:
+        ttl = int(settings['arsenal.reports.db.row_count_ttl'])
+    except (KeyError, ValueError):
+        ttl = 300
+
+    return mode, ttl
+
+def get_row_counts(dbsession, dbsession_factory, mode, ttl):
+    '''Return a dict of table name to row count and a dict of table name to
+    the age of that count in seconds, or None where the database can't tell,
+    found the way mode says. Tables the estimate has no figure for are
+    counted exactly.'''
+
+    row_counts = {}
+    row_count_ages = {}
+    now = time.time()
+    if mode == 'exact':
+        for my_table, my_count in count_rows(dbsession):
+            row_counts[my_table] = my_count
+            row_count_ages[my_table] = 0
+    elif mode == 'estimate':
+        row_counts = estimate_rows(dbsession)
+        # InnoDB doesn't record when its statistics were last sampled.
+        row_count_ages = dict((my_table, None) for my_table in row_counts)
+        missing = [x for x in Base.metadata.tables if x not in row_counts]
+        if missing:
+            LOG.debug('No row estimate for: %s, counting them.', missing)
+            for my_table, my_count in count_rows(dbsession, missing):
+                row_counts[my_table] = my_count
+                row_count_ages[my_table] = 0
+    else:
+        snapshot = ROW_COUNT_CACHE.get(dbsession_factory, ttl)
+        for my_table, (my_count, counted_at) in snapshot.items():
+            row_counts[my_table] = my_count
+            row_count_ages[my_table] = int(now - counted_at)
+
+    return row_counts, row_count_ages
+
 @view_config(route_name='api_reports_db', request_method='GET', renderer='json')
 def api_reports_db_read(request):
-    '''Process read requests for the /api/reports/db route.'''
+    '''Process read requests for the /api/reports/db route. Optional request
+    parameter 'row_counts' picks how the table row counts are found:
+
+        cached  : exact counts, refreshed in the background once older than
+                  arsenal.reports.db.row_count_ttl. The default.
+        estimate: information_schema estimates, one cheap query. Tables
+                  without an estimate are counted exactly.
+        exact   : SELECT COUNT(*) on every table, right now.
+
+    row_count_ages holds the age of each figure in seconds, or null where
+    the database can't tell.'''
+
+    settings = request.registry.settings
+    mode, ttl = get_row_count_settings(settings)
+    mode = request.params.get('row_counts', mode)
+    if mode not in ROW_COUNT_MODES:
+        return api_400(msg='Bad Request. Invalid row_counts: {0}'.format(mode))
 
     query = request.dbsession.execute("SHOW STATUS WHERE Variable_name IN ('wsrep_local_recv_que_avg', 'wsrep_connected', 'wsrep_cluster_conf_id', 'wsrep_cluster_state_uuid', 'wsrep_local_state_comment', 'wsrep_cluster_status', 'wsrep_cluster_size', 'wsrep_ready')")
 
@@ -45,15 +203,14 @@ def api_reports_db_read(request):
     for row in query:
         db_status[row[0]] = row[1]
 
-    row_counts = {}
-    for my_table in Base.metadata.tables.keys():
-        LOG.debug('Counting rows in table {0}'.format(my_table))
-        table_count = request.dbsession.execute('SELECT COUNT(*) FROM {0}'.format(my_table))
-        table_count = table_count.fetchone()
-        row_counts[my_table] = table_count[0]
-        LOG.debug('table: {0} count: {1}'.format(my_table, table_count[0]))
+    row_counts, row_count_ages = get_row_counts(request.dbsession,
+                                                request.registry['dbsession_factory'],
+                                                mode,
+                                                ttl)
 
     db_status['row_counts'] = row_counts
+    db_status['row_count_ages'] = row_count_ages
+    db_status['row_count_mode'] = mode
 
     LOG.debug(db_status)
 
@@ -0,0 +1,38 @@
+'''Arsenal API ENC Cache Reports.'''
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import logging
+from pyramid.view import view_config
+from arsenalweb.views.api.common import (
+    api_200,
+)
+from arsenalweb.views.api.enc_cache import (
+    ENC_CACHE,
+    get_enc_cache_ttl,
+)
+
+LOG = logging.getLogger(__name__)
+
+@view_config(route_name='api_reports_enc_cache', request_method='GET', renderer='json')
+def api_reports_enc_cache_read(request):
+    '''Process read requests for the /api/reports/enc_cache route. Returns
+    the ENC cache hit/miss counters for the worker that handles the request.'''
+
+    enc_cache = ENC_CACHE.report()
+    enc_cache['ttl'] = get_enc_cache_ttl(request.registry.settings)
+
+    LOG.debug(enc_cache)
+
+    return api_200(results=enc_cache)
@@ -17,6 +17,7 @@ import logging
 import re
 from pyramid.view import view_config
 from pyramid.response import Response
+from sqlalchemy import func
 from sqlalchemy.orm.exc import NoResultFound
 from arsenalweb.views.api.common import (
     api_200,
@@ -58,6 +59,74 @@ def sanitize_input(input_string):
 
     return convert
 
+def add_count(metrics, count, *keys):
+    '''Add count to the 'count' key of the nested dict found by walking keys
+    through metrics, creating it if needed.'''
+
+    for key in keys:
+        metrics = metrics.setdefault(key, {})
+    metrics['count'] = metrics.get('count', 0) + count
+
+def build_node_metrics(dbsession):
+    '''Count nodes in inservice data_centers by data_center, status,
+    hardware_profile and operating_system. Runs a single GROUP BY over the
+    nodes table and folds the rows into a nested dict, so the number of
+    queries does not grow with the number of data_centers, statuses,
+    hardware_profiles or operating_systems.'''
+
+    node_metrics = {}
+
+    statuses = dict(dbsession.query(Status.id, Status.name))
+    inservice_id = [k for k, v in statuses.items() if v == 'inservice'][0]
+    LOG.debug("inservice status id is: %s", inservice_id)
+
+    data_centers = dbsession.query(DataCenter.id, DataCenter.name)
+    data_centers = data_centers.filter(DataCenter.status_id == inservice_id)
+    data_centers = dict(data_centers)
+
+    hw_profiles = dict((hw_id, sanitize_input(name)) for hw_id, name in
+                       dbsession.query(HardwareProfile.id, HardwareProfile.name))
+    operating_systems = dict((os_id, sanitize_input(name)) for os_id, name in
+                             dbsession.query(OperatingSystem.id, OperatingSystem.name))
+
+    node_metrics['all'] = {}
+    node_metrics['all']['count'] = 0
+    for dc_name in data_centers.values():
+        node_metrics[dc_name] = {}
+        node_metrics[dc_name]['count'] = 0
+
+    if not data_centers:
+        return node_metrics
+
+    LOG.debug('Node metrics query START')
+    rows = dbsession.query(Node.data_center_id,
+                           Node.status_id,
+                           Node.hardware_profile_id,
+                           Node.operating_system_id,
+                           func.count(Node.id))
+    rows = rows.filter(Node.data_center_id.in_(list(data_centers)))
+    rows = rows.group_by(Node.data_center_id,
+                         Node.status_id,
+                         Node.hardware_profile_id,
+                         Node.operating_system_id)
+    rows = rows.all()
+    LOG.debug('Node metrics query END rows: %s', len(rows))
+
+    for dc_id, status_id, hw_id, os_id, my_count in rows:
+        dc_name = data_centers[dc_id]
+        status_name = statuses[status_id]
+        for scope in ('all', dc_name):
+            add_count(node_metrics, my_count, scope)
+            add_count(node_metrics, my_count, scope, status_name)
+            if hw_id in hw_profiles:
+                add_count(node_metrics, my_count, scope, status_name,
+                          'hardware_profile', hw_profiles[hw_id])
+            if os_id in operating_systems:
+                add_count(node_metrics, my_count, scope, status_name,
+                          'operating_system', operating_systems[os_id])
+
+    return node_metrics
+
 @view_config(route_name='api_reports_nodes', request_method='GET', renderer='json')
 def api_reports_node_read(request):
     '''Process read requests for the /api/reports/node route.'''
@@ -66,89 +135,7 @@ def api_reports_node_read(request):
 
     try:
         LOG.debug('Generating metrics...')
-
-
-        statuses = request.dbsession.query(Status)
-        statuses = statuses.all()
-        for status in statuses:
-            if status.name == 'inservice':
-                inservice_id = status.id
-        LOG.debug("inservice status id is: %s", inservice_id)
-
-        data_centers = request.dbsession.query(DataCenter)
-        data_centers = data_centers.filter(DataCenter.status_id == inservice_id)
-        data_centers = data_centers.all()
-
-        hw_profiles = request.dbsession.query(HardwareProfile)
-        hw_profiles = hw_profiles.all()
-
-        operating_systems = request.dbsession.query(OperatingSystem)
-        operating_systems = operating_systems.all()
-
-        node_metrics['all'] = {}
-        node_metrics['all']['count'] = 0
-
-        for data_center in data_centers:
-            LOG.debug("Working on data_center: %s", data_center.name)
-            node_metrics[data_center.name] = {}
-            nodes = request.dbsession.query(Node)
-            nodes = nodes.filter(Node.data_center == data_center)
-            nodes_count = nodes.count()
-            node_metrics['all']['count'] += nodes_count
-            LOG.debug("data_center: all total nodes: %s", node_metrics['all']['count'])
-            node_metrics[data_center.name]['count'] = nodes_count
-            LOG.debug("data_center: %s total nodes: %s", data_center, nodes_count)
-
-            for status in statuses:
-                LOG.debug("Working on status: %s", status.name)
-                nodes_by_status = nodes.filter(Node.status_id == status.id)
-                my_count = nodes_by_status.count()
-                if my_count != 0:
-                    node_metrics['all'].setdefault(status.name, {})
-                    try:
-                        node_metrics['all'][status.name]['count'] += my_count
-                    except KeyError:
-                        node_metrics['all'][status.name]['count'] = my_count
-
-                    node_metrics[data_center.name].setdefault(status.name, {})
-                    node_metrics[data_center.name][status.name]['count'] = my_count
-
-                for hw_profile in hw_profiles:
-                    LOG.debug("Working on hardware_profile: %s", hw_profile.name)
-                    nodes_by_hw_profile = nodes.filter(Node.hardware_profile_id == hw_profile.id)
-                    nodes_by_hw_profile = nodes_by_hw_profile.filter(Node.status_id == status.id)
-                    my_hw_profile = sanitize_input(hw_profile.name)
-                    my_count = nodes_by_hw_profile.count()
-                    if my_count != 0:
-                        node_metrics['all'][status.name].setdefault('hardware_profile', {})
-                        node_metrics['all'][status.name]['hardware_profile'].setdefault(my_hw_profile, {})
-                        try:
-                            node_metrics['all'][status.name]['hardware_profile'][my_hw_profile]['count'] += my_count
-                        except KeyError:
-                            node_metrics['all'][status.name]['hardware_profile'][my_hw_profile]['count'] = my_count
-
-                        node_metrics[data_center.name][status.name].setdefault('hardware_profile', {})
-                        node_metrics[data_center.name][status.name]['hardware_profile'][my_hw_profile] = {}
-                        node_metrics[data_center.name][status.name]['hardware_profile'][my_hw_profile]['count'] = my_count
-
-                for os in operating_systems:
-                    LOG.debug("Working on operating_system: %s", os.name)
-                    nodes_by_os = nodes.filter(Node.operating_system_id == os.id)
-                    nodes_by_os = nodes_by_os.filter(Node.status_id == status.id)
-                    my_os = sanitize_input(os.name)
-                    my_count = nodes_by_os.count()
-                    if my_count != 0:
-                        node_metrics['all'][status.name].setdefault('operating_system', {})
-                        node_metrics['all'][status.name]['operating_system'].setdefault(my_os, {})
-                        try:
-                            node_metrics['all'][status.name]['operating_system'][my_os]['count'] += my_count
-                        except KeyError:
-                            node_metrics['all'][status.name]['operating_system'][my_os]['count'] = my_count
-
-                        node_metrics[data_center.name][status.name].setdefault('operating_system', {})
-                        node_metrics[data_center.name][status.name]['operating_system'][my_os] = {}
-                        node_metrics[data_center.name][status.name]['operating_system'][my_os]['count'] = my_count
-
+        node_metrics = build_node_metrics(request.dbsession)
     except NoResultFound:
         LOG.error('This should never happen')
 
@@ -0,0 +1,41 @@
+'''Arsenal API Registration Queue Reports.'''
+#  Copyright 2015 CityGrid Media, LLC
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import logging
+from pyramid.view import view_config
+from arsenalweb.views.api.common import (
+    api_200,
+    api_501,
+)
+from arsenalweb.views.api.register_queue import (
+    REGISTER_QUEUE,
+)
+
+LOG = logging.getLogger(__name__)
+
+@view_config(route_name='api_reports_register_queue', request_method='GET', renderer='json')
+def api_reports_register_queue_read(request):
+    '''Process read requests for the /api/reports/register_queue route.
+    Returns the depth and lag of the registration queue, and the apply rate
+    and counters of the worker that handles the request.'''
+
+    if not REGISTER_QUEUE.enabled:
+        return api_501(msg='Registration queue is not enabled.')
+
+    register_queue = REGISTER_QUEUE.report()
+
+    LOG.debug(register_queue)
+
+    return api_200(results=register_queue)
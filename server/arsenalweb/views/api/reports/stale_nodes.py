@@ -54,11 +54,12 @@ def api_reports_stale_node_read(request):
         node = node.filter(Node.last_registered <= threshold)
         node = node.filter(Node.status_id.in_(status_ids))
         nodes = node.all()
-        total = node.count()
 
     except NoResultFound:
         nodes = []
 
+    total = len(nodes)
+
     LOG.info('Found %s nodes with last_registered greater than %s '
              'hours in the following statuses: %s.', total,
                                                      hours_past,
@@ -17,11 +17,13 @@ import logging
 from datetime import datetime
 from pyramid.view import view_config
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.orm.exc import MultipleResultsFound
+from zope.sqlalchemy import mark_changed
 from arsenalweb.models.data_centers import (
+    DataCenter,
     DataCenterAudit,
     )
 from arsenalweb.models.nodes import (
+    Node,
     NodeAudit,
     )
 from arsenalweb.models.statuses import (
@@ -29,9 +31,11 @@ from arsenalweb.models.statuses import (
     StatusAudit,
     )
 from arsenalweb.models.physical_devices import (
+    PhysicalDevice,
     PhysicalDeviceAudit,
     )
 from arsenalweb.models.physical_locations import (
+    PhysicalLocation,
     PhysicalLocationAudit,
     )
 from arsenalweb.views.api.common import (
@@ -43,22 +47,26 @@ from arsenalweb.views.api.common import (
     collect_params,
     enforce_api_change_limit,
     )
-from arsenalweb.views.api.nodes import (
-    find_node_by_id,
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
     )
-from arsenalweb.views.api.data_centers import (
-    find_data_center_by_id,
+from arsenalweb.views.api.dimension_cache import (
+    queue_dimension_invalidation,
     )
-from arsenalweb.views.api.physical_devices import (
-    update_physical_device,
-    find_physical_device_by_id,
-    )
-from arsenalweb.views.api.physical_locations import (
-    find_physical_location_by_id,
+from arsenalweb.views.api.enc_cache import (
+    queue_enc_invalidation,
     )
 
 LOG = logging.getLogger(__name__)
 
+# The model and audit model for each resource a status can be assigned to.
+STATUS_RESOURCES = {
+    'data_centers': (DataCenter, DataCenterAudit),
+    'nodes': (Node, NodeAudit),
+    'physical_devices': (PhysicalDevice, PhysicalDeviceAudit),
+    'physical_locations': (PhysicalLocation, PhysicalLocationAudit),
+}
+
 def find_status_by_name(dbsession, status_name):
     '''Find a status by name.'''
 
@@ -92,14 +100,15 @@ def create_status(dbsession, name=None, description=None, user_id=None):
 
         dbsession.add(status)
         dbsession.flush()
-
-        status_audit = StatusAudit(object_id=status.id,
-                                   field='name',
-                                   old_value='created',
-                                   new_value=status.name,
-                                   updated_by=user_id,
-                                   created=utcnow)
-        dbsession.add(status_audit)
+        queue_dimension_invalidation(dbsession, Status)
+
+        add_audit(dbsession, StatusAudit,
+                  object_id=status.id,
+                  field='name',
+                  old_value='created',
+                  new_value=status.name,
+                  updated_by=user_id,
+                  created=utcnow)
         dbsession.flush()
 
     except Exception as ex:
@@ -141,13 +150,13 @@ def update_status(dbsession, status, **kwargs):
                           '%s new_value: %s', status.name,
                                               attribute,
                                               new_value)
-                audit = StatusAudit(object_id=status.id,
-                                    field=attribute,
-                                    old_value=old_value,
-                                    new_value=new_value,
-                                    updated_by=my_attribs['updated_by'],
-                                    created=utcnow)
-                dbsession.add(audit)
+                add_audit(dbsession, StatusAudit,
+                          object_id=status.id,
+                          field=attribute,
+                          old_value=old_value,
+                          new_value=new_value,
+                          updated_by=my_attribs['updated_by'],
+                          created=utcnow)
                 setattr(status, attribute, new_value)
 
         dbsession.flush()
@@ -160,124 +169,191 @@ def update_status(dbsession, status, **kwargs):
         LOG.error(msg)
         raise
 
+def get_status_names(dbsession):
+    '''Return a dict of every status id to its name. The statuses table is
+    small, so one query answers every lookup assign_status needs.'''
+
+    return dict(dbsession.query(Status.id, Status.name))
+
+def expire_instances(dbsession, model, ids):
+    '''Expire any instances of model with one of ids that the session has
+    loaded, so they are reloaded after a bulk UPDATE.'''
+
+    for obj in list(dbsession.identity_map.values()):
+        if isinstance(obj, model) and obj.id in ids:
+            dbsession.expire(obj)
+
+def load_status_targets(dbsession, resource, actionable_ids):
+    '''Return a dict of id to a row with the id, display name and status_id
+    of each actionable. Rows for nodes also have the id, status_id,
+    inservice_date and updated_by of the node's physical_device, which are
+    None when it has none.'''
+
+    model = STATUS_RESOURCES[resource][0]
+    name_col = model.serial_number if resource == 'physical_devices' else model.name
+    columns = [model.id.label('id'),
+               name_col.label('name'),
+               model.status_id.label('status_id')]
+
+    if resource == 'nodes':
+        columns += [PhysicalDevice.id.label('pd_id'),
+                    PhysicalDevice.status_id.label('pd_status_id'),
+                    PhysicalDevice.inservice_date.label('pd_inservice_date'),
+                    PhysicalDevice.updated_by.label('pd_updated_by')]
+
+    query = dbsession.query(*columns)
+    if resource == 'nodes':
+        query = query.outerjoin(PhysicalDevice,
+                                PhysicalDevice.serial_number == Node.serial_number)
+    query = query.filter(model.id.in_(actionable_ids))
+
+    return dict((row.id, row) for row in query)
+
+def assign_physical_device_status(dbsession, targets, status_id, status_names,
+                                  user, utcnow):
+    '''Move the physical_devices in targets to status_id with one UPDATE,
+    setting the inservice_date of any that become available for the first
+    time. targets are rows from load_status_targets() for nodes.'''
+
+    # Nodes can share a physical_device, so only update each one once.
+    pd_targets = dict((row.pd_id, row) for row in targets if row.pd_id and
+                      row.pd_status_id != status_id)
+    pd_targets = [pd_targets[pd_id] for pd_id in sorted(pd_targets)]
+    if not pd_targets:
+        LOG.debug('Every physical_device is already in status_id: %s. '
+                  'Nothing to do.', status_id)
+        return
+
+    pd_ids = [row.pd_id for row in pd_targets]
+    table = PhysicalDevice.__table__
+    dbsession.execute(table.update().where(table.c.id.in_(pd_ids)).values(
+        status_id=status_id,
+        updated_by=user))
+    # Core statements don't mark the session as changed, and pyramid_tm rolls
+    # back a session that isn't.
+    mark_changed(dbsession)
+
+    available_ids = [status for status in status_names if
+                     status_names[status] == 'available']
+    inservice_ids = []
+    if status_id in available_ids:
+        inservice_ids = [row.pd_id for row in pd_targets if not
+                         row.pd_inservice_date]
+    if inservice_ids:
+        dbsession.execute(table.update().where(table.c.id.in_(inservice_ids)).values(
+            inservice_date=utcnow))
+
+    for row in pd_targets:
+        if row.pd_id in inservice_ids:
+            add_audit(dbsession, PhysicalDeviceAudit,
+                      object_id=row.pd_id,
+                      field='inservice_date',
+                      old_value='None',
+                      new_value=utcnow,
+                      updated_by=user,
+                      created=utcnow)
+        add_audit(dbsession, PhysicalDeviceAudit,
+                  object_id=row.pd_id,
+                  field='status_id',
+                  old_value=row.pd_status_id,
+                  new_value=status_id,
+                  updated_by=user,
+                  created=utcnow)
+        if row.pd_updated_by != user:
+            add_audit(dbsession, PhysicalDeviceAudit,
+                      object_id=row.pd_id,
+                      field='updated_by',
+                      old_value=row.pd_updated_by,
+                      new_value=user,
+                      updated_by=user,
+                      created=utcnow)
+
+    expire_instances(dbsession, PhysicalDevice, set(pd_ids))
+
 def assign_status(dbsession, status, actionables, resource, user, settings):
-    '''Assign actionable_ids to a status.'''
+    '''Assign actionable_ids to a status.
+
+    The actionables, their current statuses and, for nodes, their
+    physical_devices are loaded with one query. Every object that changes is
+    updated with one UPDATE per table, however many there are.'''
 
     LOG.debug('START assign_status()')
-    resp = {status.name: []}
+
+    model, audit_model = STATUS_RESOURCES[resource]
+
     try:
+        actionable_ids = []
+        for actionable_id in actionables:
+            actionable_id = int(actionable_id)
+            if actionable_id not in actionable_ids:
+                actionable_ids.append(actionable_id)
+    except (TypeError, ValueError):
+        msg = 'Bad request: {0} ids must be integers: {1}'.format(resource,
+                                                                 actionables)
+        return api_400(msg=msg)
 
+    try:
         utcnow = datetime.utcnow()
+        dbsession.flush()
+
+        status_names = get_status_names(dbsession)
+        targets = load_status_targets(dbsession, resource, actionable_ids)
+
+        missing = [actionable_id for actionable_id in actionable_ids if
+                   actionable_id not in targets]
+        if missing:
+            msg = '{0} not found: {1}'.format(resource, missing)
+            LOG.debug(msg)
+            return api_404(msg=msg)
+
+        changed = [targets[actionable_id] for actionable_id in actionable_ids if
+                   targets[actionable_id].status_id != status.id]
+
+        if changed:
+            changed_ids = [row.id for row in changed]
+            table = model.__table__
+            dbsession.execute(table.update().where(table.c.id.in_(changed_ids)).values(
+                status_id=status.id,
+                updated=utcnow,
+                updated_by=user))
+            # Core statements don't mark the session as changed, and
+            # pyramid_tm rolls back a session that isn't.
+            mark_changed(dbsession)
+            expire_instances(dbsession, model, set(changed_ids))
+
+            if resource == 'nodes':
+                queue_enc_invalidation(dbsession, node_ids=changed_ids)
+
+                try:
+                    pd_status = settings[f'arsenal.node_hw_map.{status.name}']
+                except KeyError:
+                    LOG.debug('No physical_device status map attribute defined in '
+                              'config for node status: %s', status.name)
+                    pd_status = None
+
+                if pd_status:
+                    pd_status_ids = [status_id for status_id in status_names if
+                                     status_names[status_id] == pd_status]
+                    if not pd_status_ids:
+                        return api_404(msg='status not found: {0}'.format(pd_status))
+                    assign_physical_device_status(dbsession, changed,
+                                                  pd_status_ids[0], status_names,
+                                                  user, utcnow)
+
+            for row in changed:
+                add_audit(dbsession, audit_model,
+                          object_id=row.id,
+                          field='status',
+                          old_value=status_names.get(row.status_id),
+                          new_value=status.name,
+                          updated_by=user,
+                          created=utcnow)
+
+        LOG.debug('Moved %s of %s %s to status: %s', len(changed),
+                  len(actionable_ids), resource, status.name)
+        resp = {status.name: [targets[actionable_id].name for actionable_id in
+                              actionable_ids]}
 
-        with dbsession.no_autoflush:
-            for actionable_id in actionables:
-
-                if resource == 'nodes':
-                    my_obj = find_node_by_id(dbsession, actionable_id)
-                elif resource == 'data_centers':
-                    my_obj = find_data_center_by_id(dbsession, actionable_id)
-                elif resource == 'physical_devices':
-                    my_obj = find_physical_device_by_id(dbsession, actionable_id)
-                elif resource == 'physical_locations':
-                    my_obj = find_physical_location_by_id(dbsession, actionable_id)
-
-                if resource == 'physical_devices':
-                    resp[status.name].append(my_obj.serial_number)
-                else:
-                    resp[status.name].append(my_obj.name)
-
-                orig_status_id = my_obj.status_id
-                orig_status = find_status_by_id(dbsession, my_obj.status_id)
-                LOG.debug('START assign_status() update status_id')
-                my_obj.status_id = status.id
-                LOG.debug('END assign_status() update status_id')
-
-                if orig_status_id != status.id:
-                    LOG.debug('START assign_status() create audit')
-
-                    my_obj.updated = utcnow
-                    my_obj.updated_by = user
-
-                    if resource == 'nodes':
-
-                        if my_obj.physical_device:
-
-                            try:
-                                pd_status = settings[f'arsenal.node_hw_map.{status.name}']
-                                av = find_status_by_name(dbsession, pd_status)
-                                final_status_id = av.id
-                                if my_obj.physical_device.status_id != final_status_id:
-
-                                    pd_params = {
-                                        'status_id': final_status_id,
-                                        'updated_by': user,
-                                    }
-
-                                    update_physical_device(dbsession,
-                                                           my_obj.physical_device,
-                                                           **pd_params)
-                                else:
-                                    LOG.debug('current physical_device status_id: %s matches '
-                                              'expected status_id: %s. Nothing to do.',
-                                              my_obj.physical_device.status_id, final_status_id)
-
-                            except KeyError:
-                                LOG.debug('No physical_device status map attribute defined in '
-                                          'config for node status: %s', status.name)
-
-                        node_audit = NodeAudit(object_id=my_obj.id,
-                                               field='status',
-                                               old_value=orig_status.name,
-                                               new_value=status.name,
-                                               updated_by=user,
-                                               created=utcnow)
-                        dbsession.add(node_audit)
-
-                    elif resource == 'data_centers':
-
-                        dc_audit = DataCenterAudit(object_id=my_obj.id,
-                                                   field='status',
-                                                   old_value=orig_status.name,
-                                                   new_value=status.name,
-                                                   updated_by=user,
-                                                   created=utcnow)
-                        dbsession.add(dc_audit)
-
-                    elif resource == 'physical_devices':
-
-                        pd_audit = PhysicalDeviceAudit(object_id=my_obj.id,
-                                                       field='status',
-                                                       old_value=orig_status.name,
-                                                       new_value=status.name,
-                                                       updated_by=user,
-                                                       created=utcnow)
-                        dbsession.add(pd_audit)
-
-                    elif resource == 'physical_locations':
-
-                        pd_audit = PhysicalLocationAudit(object_id=my_obj.id,
-                                                         field='status',
-                                                         old_value=orig_status.name,
-                                                         new_value=status.name,
-                                                         updated_by=user,
-                                                         created=utcnow)
-                        dbsession.add(pd_audit)
-
-                    LOG.debug('END assign_status() create audit')
-
-            LOG.debug('START assign_status() session add')
-            dbsession.add(my_obj)
-            LOG.debug('END assign_status() session add')
-            LOG.debug('START assign_status() session flush')
-            dbsession.flush()
-            LOG.debug('END assign_status() session flush')
-
-    except (NoResultFound, AttributeError):
-        return api_404(msg='status not found')
-
-    except MultipleResultsFound:
-        msg = 'Bad request: id is not unique: {0}'.format(actionable_id)
-        return api_400(msg=msg)
     except Exception as ex:
         msg = 'Error updating status: exception={0}'.format(ex)
         LOG.error(msg)
@@ -16,14 +16,21 @@
 import logging
 from datetime import datetime
 from pyramid.view import view_config
+from sqlalchemy import and_
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.orm.exc import MultipleResultsFound
-from sqlalchemy.exc import DatabaseError
+from zope.sqlalchemy import mark_changed
+from arsenalweb.models.common import (
+    tag_data_center_assignments,
+    tag_node_assignments,
+    tag_node_group_assignments,
+    tag_physical_device_assignments,
+    )
 from arsenalweb.models.data_centers import (
     DataCenter,
     DataCenterAudit,
     )
 from arsenalweb.models.nodes import (
+    Node,
     NodeAudit,
     )
 from arsenalweb.models.node_groups import (
@@ -46,42 +53,38 @@ from arsenalweb.views.api.common import (
     api_409,
     api_500,
     api_501,
-    underscore_to_camel,
     validate_tag_perm,
     )
-from arsenalweb.views.api.data_centers import (
-    find_data_center_by_id,
-    )
-from arsenalweb.views.api.nodes import (
-    find_node_by_id,
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
     )
-from arsenalweb.views.api.node_groups import (
-    find_node_group_by_id,
-    )
-from arsenalweb.views.api.physical_devices import (
-    find_physical_device_by_id,
+from arsenalweb.views.api.enc_cache import (
+    queue_enc_invalidation,
     )
 
 LOG = logging.getLogger(__name__)
 
+# The model, audit model and tag assignment table for each tagable type.
+TAGABLE_TYPES = {
+    'data_centers': (DataCenter, DataCenterAudit, tag_data_center_assignments),
+    'node_groups': (NodeGroup, NodeGroupAudit, tag_node_group_assignments),
+    'nodes': (Node, NodeAudit, tag_node_assignments),
+    'physical_devices': (PhysicalDevice, PhysicalDeviceAudit,
+                         tag_physical_device_assignments),
+}
+
 # Functions
 def find_tag_by_name(dbsession, name, value):
     '''Search for an existing tag by name and value.'''
 
     LOG.debug('Searching for tag name: %s value: %s', name, value)
-    try:
-        tag = dbsession.query(Tag)
-        tag = tag.filter(Tag.name == f'^{name}$')
-        tag = tag.filter(Tag.value == f'^{value}$')
-        one = tag.one()
-    except DatabaseError:
-        LOG.info('DatabaseError encountered, trying value as string...')
-        my_value = str(value)
-        tag = dbsession.query(Tag)
-        tag = tag.filter(Tag.name == f'^{name}$')
-        tag = tag.filter(Tag.value == f'^{my_value}$')
-        one = tag.one()
-    return one
+    tag = dbsession.query(Tag)
+    tag = tag.filter(Tag.name == name)
+    # Always compare value as a string. Comparing the VARCHAR column to a
+    # number makes MySQL convert every row and skip the index.
+    tag = tag.filter(Tag.value == str(value))
+
+    return tag.one()
 
 def find_tag_by_id(dbsession, tag_id):
     '''Search for an existing tag by id.'''
@@ -106,13 +109,13 @@ def create_tag(dbsession, name, value, user):
 
         dbsession.add(tag)
         dbsession.flush()
-        tag_audit = TagAudit(object_id=tag.id,
-                             field='tag_id',
-                             old_value='created',
-                             new_value='{0}={1}'.format(tag.name, tag.value),
-                             updated_by=user,
-                             created=utcnow)
-        dbsession.add(tag_audit)
+        add_audit(dbsession, TagAudit,
+                  object_id=tag.id,
+                  field='tag_id',
+                  old_value='created',
+                  new_value='{0}={1}'.format(tag.name, tag.value),
+                  updated_by=user,
+                  created=utcnow)
         dbsession.flush()
 
         return api_200(results=tag)
@@ -128,6 +131,10 @@ def manage_tags(dbsession, tag, tagable_type, tagables, action, user):
     ids and assigns them to the tag. Assigning a tag to a node also removes any
     other tag(s) with the same key.
 
+    The objects and their current tags with the same key are loaded with one
+    query each, and the assignments are inserted and deleted with one
+    statement each, however many ids are given.
+
     tag     : A Tag object.
     tagable_type: The type of object you are tagging. One of nodes, node_groups
         or data_centers.
@@ -136,97 +143,127 @@ def manage_tags(dbsession, tag, tagable_type, tagables, action, user):
     action  : A string representing the action to perform. One of either 'PUT' or 'DELETE'.
     '''
 
-    valid_types = [
-        'nodes',
-        'node_groups',
-        'data_centers',
-        'physical_devices',
-    ]
-    if tagable_type not in valid_types:
+    if tagable_type not in TAGABLE_TYPES:
         msg = 'Invalid tagable type: {0}'.format(tagable_type)
         LOG.error(msg)
         raise NotImplementedError(msg)
 
-    find_by_id = globals()['find_{0}_by_id'.format(tagable_type[:-1])]
-    create_audit = globals()['{0}Audit'.format(underscore_to_camel(tagable_type[:-1]))]
-    LOG.debug('Find by id function: %s', find_by_id)
+    model, audit_model, assignments = TAGABLE_TYPES[tagable_type]
+    tagable_col = getattr(assignments.c, '{0}_id'.format(tagable_type[:-1]))
 
     try:
-        tag_kv = '{0}={1}'.format(tag.name, tag.value)
-        resp = {tag_kv: []}
+        tagable_ids = []
         for tagable_id in tagables:
-            tagable = find_by_id(dbsession, tagable_id)
+            tagable_id = int(tagable_id)
+            if tagable_id not in tagable_ids:
+                tagable_ids.append(tagable_id)
+    except (TypeError, ValueError):
+        msg = 'Bad request: {0} ids must be integers: {1}'.format(tagable_type,
+                                                                 tagables)
+        return api_400(msg=msg)
+
+    try:
+        dbsession.flush()
+
+        found = dict(dbsession.query(model.id, model).filter(
+            model.id.in_(tagable_ids)))
+        missing = [tagable_id for tagable_id in tagable_ids if
+                   tagable_id not in found]
+        if missing:
+            msg = '{0} not found: {1}'.format(tagable_type, missing)
+            LOG.debug(msg)
+            return api_404(msg=msg)
+
+        # Every tag with the same key currently on one of the objects.
+        query = dbsession.query(tagable_col, Tag.id, Tag.value)
+        query = query.join(Tag, Tag.id == assignments.c.tag_id)
+        query = query.filter(Tag.name == tag.name)
+        query = query.filter(tagable_col.in_(tagable_ids))
+        current = query.all()
+
+        tag_kv = '{0}={1}'.format(tag.name, tag.value)
+        utcnow = datetime.utcnow()
+
+        if action == 'PUT':
+            tagged_ids = set([obj_id for obj_id, tag_id, _ in current if
+                              tag_id == tag.id])
+            # Ensure only one tag key is present on a tagable object.
+            conflicts = [(obj_id, tag_id, value) for obj_id, tag_id, value in
+                         current if tag_id != tag.id]
+
+            if conflicts:
+                LOG.debug('De-assigning %s tags with name: %s from %s for '
+                          'uniqueness.', len(conflicts), tag.name, tagable_type)
+                dbsession.execute(assignments.delete().where(and_(
+                    assignments.c.tag_id.in_(set([tag_id for _, tag_id, _ in conflicts])),
+                    tagable_col.in_(set([obj_id for obj_id, _, _ in conflicts])))))
+                for obj_id, _, value in sorted(conflicts):
+                    add_audit(dbsession, audit_model,
+                              object_id=obj_id,
+                              field='tag',
+                              old_value='{0}={1}'.format(tag.name, value),
+                              new_value='de-assigned',
+                              updated_by=user,
+                              created=utcnow)
+
+            assign_ids = [tagable_id for tagable_id in tagable_ids if
+                          tagable_id not in tagged_ids]
+            if assign_ids:
+                dbsession.execute(assignments.insert(), [{
+                    'tag_id': tag.id,
+                    tagable_col.name: tagable_id,
+                } for tagable_id in assign_ids])
+                for tagable_id in assign_ids:
+                    add_audit(dbsession, audit_model,
+                              object_id=tagable_id,
+                              field='tag',
+                              old_value='assigned',
+                              new_value=tag_kv,
+                              updated_by=user,
+                              created=utcnow)
+
+        if action == 'DELETE':
+            deassign_ids = [obj_id for obj_id, tag_id, _ in current if
+                            tag_id == tag.id]
+            if deassign_ids:
+                dbsession.execute(assignments.delete().where(and_(
+                    assignments.c.tag_id == tag.id,
+                    tagable_col.in_(deassign_ids))))
+                for tagable_id in sorted(deassign_ids):
+                    add_audit(dbsession, audit_model,
+                              object_id=tagable_id,
+                              field='tag',
+                              old_value=tag_kv,
+                              new_value='de-assigned',
+                              updated_by=user,
+                              created=utcnow)
+
+        # The assignments were changed underneath the ORM. Core statements
+        # don't mark the session as changed either, and pyramid_tm rolls back
+        # a session that isn't.
+        dbsession.expire(tag, [tagable_type])
+        mark_changed(dbsession)
+
+        enc_invalidations = {
+            'nodes': 'node_ids',
+            'node_groups': 'node_group_ids',
+            'data_centers': 'data_center_ids',
+        }
+        if tagable_type in enc_invalidations:
+            queue_enc_invalidation(dbsession,
+                                   **{enc_invalidations[tagable_type]: tagable_ids})
 
+        resp = {tag_kv: []}
+        for tagable_id in tagable_ids:
+            tagable = found[tagable_id]
             try:
                 resp[tag_kv].append(tagable.name)
             except AttributeError:
                 LOG.debug('This object has no name, using serial_number instead.')
                 resp[tag_kv].append(tagable.serial_number)
 
-            current_tags_list = [my_tag.id for my_tag in tagable.tags]
-            current_tags_remove = [my_tag.id for my_tag in tagable.tags if
-                                   my_tag.name == tag.name and my_tag.value
-                                   != tag.value]
-            utcnow = datetime.utcnow()
-
-            if action == 'PUT':
-                if tag.id not in current_tags_list:
-                    my_audit = create_audit(object_id=tagable.id,
-                                            field='tag',
-                                            old_value='assigned',
-                                            new_value='{0}={1}'.format(tag.name,
-                                                                       tag.value),
-                                            updated_by=user,
-                                            created=utcnow)
-                    dbsession.add(my_audit)
-                    my_subtype = getattr(tag, tagable_type)
-                    my_subtype.append(tagable)
-                # Ensure only one tag key is present on a tagable object.
-                for remove_id in current_tags_remove:
-                    remove_tag = find_tag_by_id(dbsession, remove_id)
-                    LOG.debug('De-assigning tag from %s for uniqueness. name: '
-                              '%s value: %s', tagable_type,
-                                              remove_tag.name,
-                                              remove_tag.value)
-                    my_subtype = getattr(remove_tag, tagable_type)
-                    my_subtype.remove(tagable)
-                    my_audit = create_audit(object_id=tagable.id,
-                                            field='tag',
-                                            old_value='{0}={1}'.format(remove_tag.name,
-                                                                       remove_tag.value),
-                                            new_value='de-assigned',
-                                            updated_by=user,
-                                            created=utcnow)
-                    dbsession.add(remove_tag)
-                    dbsession.add(my_audit)
-
-            if action == 'DELETE':
-                try:
-                    my_subtype = getattr(tag, tagable_type)
-                    if tagable in my_subtype:
-                        my_subtype.remove(tagable)
-                    my_audit = create_audit(object_id=tagable.id,
-                                            field='tag',
-                                            old_value='{0}={1}'.format(tag.name,
-                                                                       tag.value),
-                                            new_value='de-assigned',
-                                            updated_by=user,
-                                            created=utcnow)
-                    dbsession.add(my_audit)
-                except ValueError:
-                    pass
-
-        dbsession.add(tag)
-        dbsession.flush()
-
-    except (NoResultFound, AttributeError):
-        return api_404(msg='node not found')
-
-    except MultipleResultsFound:
-        msg = 'Bad request: {0}_id is not unique: {1}'.format(tagable_type, tagable_id)
-        return api_400(msg=msg)
     except Exception as ex:
-        msg = 'Error updating FLUBBER: exception={0}'.format(type(ex))
+        msg = 'Error updating tags on {0}: exception={1}'.format(tagable_type, ex)
         LOG.error(msg)
         return api_500(msg)
 
@@ -68,13 +68,16 @@ def view_data_centers(request):
     resp = _api_get(request, uri, payload)
 
     total = 0
+    next_cursor = None
     data_centers = []
 
     if resp:
         total = resp['meta']['total']
+        next_cursor = resp['meta'].get('next')
         data_centers = resp['results']
 
-    nav_urls = get_nav_urls(request.path, offset, perpage, total, payload)
+    nav_urls = get_nav_urls(request.path, offset, perpage, total, payload,
+                            next_cursor=next_cursor)
 
     # Used by the columns menu to determine what to show/hide.
     column_selectors = [
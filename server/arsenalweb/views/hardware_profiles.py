@@ -68,13 +68,16 @@ def view_hardware_profiles(request):
     resp = _api_get(request, uri, payload)
 
     total = 0
+    next_cursor = None
     hardware_profiles = []
 
     if resp:
         total = resp['meta']['total']
+        next_cursor = resp['meta'].get('next')
         hardware_profiles = resp['results']
 
-    nav_urls = get_nav_urls(request.path, offset, perpage, total, payload)
+    nav_urls = get_nav_urls(request.path, offset, perpage, total, payload,
+                            next_cursor=next_cursor)
 
     # Used by the columns menu to determine what to show/hide.
     column_selectors = [
@@ -116,6 +116,7 @@ setup(
         ],
         'console_scripts': [
             'initialize_arsenalweb_db=arsenalweb.scripts.initialize_db:main',
+            'archive_arsenalweb_audit=arsenalweb.scripts.archive_audit:main',
         ],
     },
 )
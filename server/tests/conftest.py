@@ -1,17 +1,22 @@
 import alembic
 import alembic.config
 import alembic.command
+from datetime import datetime
 import os
+from passlib.hash import sha512_crypt
 from pyramid.paster import get_appsettings
 from pyramid.scripting import prepare
 from pyramid.testing import DummyRequest, testConfig
 import pytest
+from sqlalchemy import and_, func, select, text
 import transaction
 import webtest
 
 from arsenalweb import main
 from arsenalweb import models
 from arsenalweb.models.meta import Base
+from arsenalweb.views.api.dimension_cache import DIMENSION_CACHE
+from arsenalweb.views.api.enc_cache import ENC_CACHE
 
 
 def pytest_addoption(parser):
@@ -79,6 +84,76 @@ def testapp(app, tm, dbsession):
 
     return testapp
 
+@pytest.fixture
+def committed_dbsession(app, dbengine):
+    """
+    A plain session whose commits are real, for tests that need to check what
+    a request actually commits, unlike ``dbsession`` which is always rolled
+    back.
+
+    Every row added while the test runs is deleted afterwards. Tables with an
+    id are trimmed back to their last id, the others back to the rows they
+    had. Updates to rows that already existed are not undone. The process
+    wide caches are emptied as well, since they may hold the deleted ids.
+
+    """
+    before = {}
+    with dbengine.connect() as conn:
+        for table in Base.metadata.sorted_tables:
+            if 'id' in table.c:
+                before[table] = conn.execute(select(func.max(table.c.id))).scalar() or 0
+            else:
+                before[table] = set(tuple(row) for row in conn.execute(table.select()))
+
+    dbsession = app.registry['dbsession_factory']()
+
+    yield dbsession
+
+    dbsession.rollback()
+    dbsession.close()
+
+    with dbengine.begin() as conn:
+        if conn.dialect.name == 'mysql':
+            conn.execute(text('SET FOREIGN_KEY_CHECKS = 0'))
+        for table in reversed(Base.metadata.sorted_tables):
+            if 'id' in table.c:
+                conn.execute(table.delete().where(table.c.id > before[table]))
+                continue
+            for row in conn.execute(table.select()).fetchall():
+                if tuple(row) not in before[table]:
+                    conn.execute(table.delete().where(and_(
+                        *[col == val for col, val in zip(table.c, row)])))
+        if conn.dialect.name == 'mysql':
+            conn.execute(text('SET FOREIGN_KEY_CHECKS = 1'))
+
+    DIMENSION_CACHE.invalidate(list(DIMENSION_CACHE.entries))
+    ENC_CACHE.invalidate(everything=True)
+
+@pytest.fixture
+def committed_testapp(app, committed_dbsession):
+    """
+    A testapp logged in as a local user, whose requests are committed by
+    pyramid_tm just like in production. Use ``committed_dbsession`` to set up
+    data and to read back what was committed.
+
+    """
+    utcnow = datetime.utcnow()
+    committed_dbsession.add(models.User(name='pytest_committed',
+                                        salt='',
+                                        password=sha512_crypt.hash('pytest'),
+                                        created=utcnow,
+                                        updated=utcnow,
+                                        updated_by='pytest'))
+    committed_dbsession.commit()
+
+    testapp = webtest.TestApp(app, extra_environ={
+        'HTTP_HOST': 'example.com',
+    })
+    testapp.post('/api/login', {'login': 'pytest_committed', 'password': 'pytest'},
+                 status=200)
+
+    return testapp
+
 @pytest.fixture
 def app_request(app, tm, dbsession):
     """
@@ -0,0 +1,117 @@
+from datetime import datetime
+
+from sqlalchemy import event
+
+from arsenalweb.models.data_centers import DataCenter
+from arsenalweb.models.hardware_profiles import HardwareProfile
+from arsenalweb.models.nodes import Node
+from arsenalweb.models.operating_systems import OperatingSystem
+from arsenalweb.models.statuses import Status
+
+
+def seed_dimensions(dbsession, dcs, statuses, hw_profiles, oses):
+    '''Create a node for every data_center, status, hardware_profile and
+    operating_system combination along the diagonal so that every dimension
+    value is used.'''
+
+    utcnow = datetime.utcnow()
+    common = {'created': utcnow, 'updated_by': 'pytest'}
+
+    inservice = dbsession.query(Status).filter(Status.name == 'inservice').first()
+    if not inservice:
+        inservice = Status(name='inservice', description='inservice', **common)
+    status_objs = [inservice]
+    status_objs += [Status(name='bench_status_{0}'.format(i),
+                           description='bench', **common)
+                    for i in range(statuses - 1)]
+    dbsession.add_all(status_objs)
+    dbsession.flush()
+
+    dc_objs = [DataCenter(name='bench_dc_{0}'.format(i),
+                          status_id=status_objs[0].id, **common)
+               for i in range(dcs)]
+    hw_objs = [HardwareProfile(name='Bench Profile {0}'.format(i),
+                               model='model', manufacturer='bench',
+                               rack_u=1, rack_color='#fff', **common)
+               for i in range(hw_profiles)]
+    os_objs = [OperatingSystem(name='Bench OS {0}'.format(i), variant='bench',
+                               version_number=str(i), architecture='x86_64',
+                               description='bench', **common)
+               for i in range(oses)]
+    dbsession.add_all(dc_objs + hw_objs + os_objs)
+    dbsession.flush()
+
+    count = max(dcs, statuses, hw_profiles, oses)
+    dbsession.add_all([
+        Node(name='bench{0:04d}'.format(i),
+             unique_id='bench{0:04d}'.format(i),
+             data_center_id=dc_objs[i % dcs].id,
+             status_id=status_objs[i % statuses].id,
+             hardware_profile_id=hw_objs[i % hw_profiles].id,
+             operating_system_id=os_objs[i % oses].id,
+             updated_by='pytest')
+        for i in range(count)
+    ])
+    dbsession.flush()
+
+    return count
+
+def seed_statuses(dbsession):
+    '''create_node() puts new nodes in status 2, make sure it exists.'''
+
+    utcnow = datetime.utcnow()
+    for status_id, name in [(1, 'initializing'), (2, 'setup')]:
+        if not dbsession.query(Status).get(status_id):
+            dbsession.add(Status(id=status_id, name=name, description=name,
+                                 created=utcnow, updated_by='pytest'))
+    dbsession.flush()
+
+def registration_payload(name, **kwargs):
+    '''Return a valid node registration payload for a node called name.
+    Any keyword arguments replace the defaults.'''
+
+    payload = {
+        'unique_id': '{0}-unique-id'.format(name),
+        'name': name,
+        'serial_number': '{0}-serial'.format(name),
+        'processor_count': 2,
+        'uptime': '1 day',
+        'hardware_profile': {
+            'name': 'Pytest Profile',
+            'manufacturer': 'pytest',
+            'model': 'pytest',
+        },
+        'operating_system': {
+            'name': 'Pytest OS',
+            'variant': 'pytest',
+            'version_number': '1',
+            'architecture': 'x86_64',
+            'description': 'pytest',
+        },
+        'network_interfaces': [{
+            'name': 'eth0',
+            'unique_id': '{0}-eth0'.format(name),
+            'mac_address': 'AA:BB:CC:DD:EE:FF',
+        }],
+    }
+    payload.update(kwargs)
+
+    return payload
+
+def count_queries(dbsession, func):
+    '''Run func(dbsession) and return its result and the number of
+    statements it executed.'''
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = dbsession.get_bind()
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = func(dbsession)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return result, len(statements)
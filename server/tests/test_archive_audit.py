@@ -0,0 +1,63 @@
+import json
+from datetime import datetime
+
+from arsenalweb.scripts.archive_audit import (
+    get_audit_models,
+    get_cutoff,
+    get_retention_days,
+    month_starts,
+    partition_ddl,
+    serialize_row,
+)
+
+
+SETTINGS = {
+    'arsenal.audit.retention_days': '365',
+    'arsenal.audit.retention_days.nodes_audit': '90',
+    'arsenal.audit.retention_days.tags_audit': '0',
+}
+
+def test_retention_days_per_table_override():
+    assert get_retention_days(SETTINGS, 'nodes_audit') == 90
+    assert get_retention_days(SETTINGS, 'statuses_audit') == 365
+    assert get_retention_days(SETTINGS, 'tags_audit') == 0
+    assert get_retention_days({}, 'nodes_audit') == 0
+
+def test_cutoff():
+    now = datetime(2026, 10, 18)
+
+    assert get_cutoff(SETTINGS, 'nodes_audit', now=now) == datetime(2026, 7, 20)
+    assert get_cutoff(SETTINGS, 'tags_audit', now=now) is None
+
+def test_every_audit_table_is_found():
+    tables = [model.__tablename__ for model in get_audit_models()]
+
+    assert 'nodes_audit' in tables
+    assert all(table.endswith('_audit') for table in tables)
+
+def test_month_starts_wraps_the_year():
+    assert month_starts(datetime(2026, 11, 18), 3) == [
+        datetime(2026, 11, 1),
+        datetime(2026, 12, 1),
+        datetime(2027, 1, 1),
+    ]
+
+def test_partition_ddl():
+    statements = partition_ddl('nodes_audit', datetime(2026, 8, 5), 1,
+                               now=datetime(2026, 10, 18))
+
+    assert statements[0] == ('ALTER TABLE nodes_audit DROP PRIMARY KEY, '
+                             'ADD PRIMARY KEY (id, created)')
+    assert "PARTITION p202608 VALUES LESS THAN (UNIX_TIMESTAMP('2026-09-01'))" in statements[1]
+    assert "PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01'))" in statements[1]
+    assert 'p202612' not in statements[1]
+    assert statements[1].endswith('PARTITION pmax VALUES LESS THAN MAXVALUE\n)')
+
+def test_serialize_row():
+    row = {'id': 1, 'created': datetime(2026, 1, 2, 3, 4, 5), 'field': 'name'}
+
+    assert json.loads(serialize_row(row)) == {
+        'id': 1,
+        'created': '2026-01-02T03:04:05',
+        'field': 'name',
+    }
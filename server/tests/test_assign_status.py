@@ -0,0 +1,98 @@
+from datetime import datetime
+
+from pyramid.security import Allow
+import pytest
+
+from arsenalweb import RootFactory
+from arsenalweb.models.common import Group, User
+from arsenalweb.models.nodes import Node, NodeAudit
+from arsenalweb.models.statuses import Status
+from arsenalweb.views.api.statuses import assign_status
+
+from .helpers import count_queries, seed_dimensions
+
+
+@pytest.fixture
+def node_ids(dbsession):
+    seed_dimensions(dbsession, 1, 1, 200, 1)
+    return [node.id for node in dbsession.query(Node).order_by(Node.id)]
+
+@pytest.fixture
+def decom(dbsession):
+    status = Status(name='pytest_decom', description='pytest',
+                    created=datetime.utcnow(), updated_by='pytest')
+    dbsession.add(status)
+    dbsession.flush()
+    return status
+
+def test_assign_status_is_set_based(dbsession, node_ids, decom):
+    resp, queries = count_queries(
+        dbsession,
+        lambda dbsession: assign_status(dbsession, decom, node_ids, 'nodes',
+                                        'pytest', {}))
+
+    assert resp.status_int == 200
+    assert len(resp.json['results'][0]['pytest_decom']) == len(node_ids)
+    # Load the statuses, load the nodes, update the nodes.
+    assert queries <= 4
+
+    dbsession.flush()
+    moved = dbsession.query(Node).filter(Node.id.in_(node_ids))
+    assert set([node.status_id for node in moved]) == set([decom.id])
+    audits = dbsession.query(NodeAudit).filter(NodeAudit.new_value == 'pytest_decom')
+    assert audits.count() == len(node_ids)
+    assert set([audit.old_value for audit in audits]) == set(['inservice'])
+
+def test_assign_status_only_audits_changes(dbsession, node_ids, decom):
+    assign_status(dbsession, decom, node_ids[:10], 'nodes', 'pytest', {})
+    assign_status(dbsession, decom, node_ids, 'nodes', 'pytest', {})
+
+    dbsession.flush()
+    audits = dbsession.query(NodeAudit).filter(NodeAudit.new_value == 'pytest_decom')
+    assert audits.count() == len(node_ids)
+
+def test_assign_status_unknown_id(dbsession, node_ids, decom):
+    resp = assign_status(dbsession, decom, node_ids + [0], 'nodes', 'pytest', {})
+
+    assert resp.status_int == 404
+    assert dbsession.query(Node).filter(Node.status_id == decom.id).count() == 0
+
+@pytest.fixture
+def status_writer(committed_testapp, committed_dbsession, monkeypatch):
+    '''committed_testapp with the status_write permission.'''
+
+    utcnow = datetime.utcnow()
+    group = Group(name='pytest_status_write', created=utcnow, updated=utcnow,
+                  updated_by='pytest')
+    user = committed_dbsession.query(User).filter(
+        User.name == 'pytest_committed').one()
+    user.groups.append(group)
+    committed_dbsession.commit()
+    monkeypatch.setattr(RootFactory, '__acl__', RootFactory.__acl__ + [
+        (Allow, 'group:pytest_status_write', ('status_write',))])
+
+    return committed_testapp
+
+def test_api_assign_status_is_committed(status_writer, committed_dbsession):
+    '''The status change is a Core UPDATE. It must still be committed at the
+    end of the request.'''
+
+    seed_dimensions(committed_dbsession, 1, 1, 3, 1)
+    node_ids = [node.id for node in committed_dbsession.query(Node).filter(
+        Node.name.like('bench%'))]
+    status = Status(name='pytest_committed', description='pytest',
+                    created=datetime.utcnow(), updated_by='pytest')
+    committed_dbsession.add(status)
+    committed_dbsession.commit()
+    status_id = status.id
+
+    resp = status_writer.put_json('/api/statuses/{0}/nodes'.format(status_id),
+                                  {'nodes': node_ids})
+    assert resp.status_int == 200
+
+    committed_dbsession.rollback()
+    moved = committed_dbsession.query(Node.status_id).filter(Node.id.in_(node_ids))
+    assert set([row.status_id for row in moved]) == set([status_id])
+    audits = committed_dbsession.query(NodeAudit).filter(
+        NodeAudit.new_value == 'pytest_committed').count()
+    assert audits == len(node_ids)
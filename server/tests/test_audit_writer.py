@@ -0,0 +1,39 @@
+from arsenalweb.models.nodes import NodeAudit
+from arsenalweb.models.tags import TagAudit
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    write_audits,
+)
+
+from .helpers import count_queries
+
+
+def audit_count(dbsession, model, field):
+    return dbsession.query(model).filter(model.field == field).count()
+
+def test_audits_are_written_with_one_insert_per_table(dbsession):
+    for i in range(1000):
+        add_audit(dbsession, NodeAudit, object_id=i, field='pytest_tag',
+                  old_value='assigned', new_value='pytest=1', updated_by='pytest')
+    add_audit(dbsession, TagAudit, object_id=1, field='pytest_tag',
+              old_value='created', new_value='pytest=1', updated_by='pytest')
+
+    _, queries = count_queries(dbsession, write_audits)
+
+    assert queries == 2
+    assert audit_count(dbsession, NodeAudit, 'pytest_tag') == 1000
+    assert audit_count(dbsession, TagAudit, 'pytest_tag') == 1
+
+def test_savepoint_rollback_discards_its_audits(dbsession):
+    add_audit(dbsession, NodeAudit, object_id=1, field='pytest_kept',
+              old_value='a', new_value='b', updated_by='pytest')
+
+    savepoint = dbsession.begin_nested()
+    add_audit(dbsession, NodeAudit, object_id=1, field='pytest_dropped',
+              old_value='a', new_value='b', updated_by='pytest')
+    savepoint.rollback()
+
+    write_audits(dbsession)
+
+    assert audit_count(dbsession, NodeAudit, 'pytest_kept') == 1
+    assert audit_count(dbsession, NodeAudit, 'pytest_dropped') == 0
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from arsenalweb.models.nodes import NodeAudit
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    write_audits,
+)
+from arsenalweb.views.api.bulk_audit import find_audit_history
+
+from .helpers import count_queries
+
+
+@pytest.fixture
+def audits(dbsession):
+    start = datetime(2026, 1, 1)
+    for object_id in [900001, 900002, 900003]:
+        for day in range(5):
+            add_audit(dbsession, NodeAudit, object_id=object_id,
+                      field='pytest', old_value=str(day), new_value=str(day + 1),
+                      updated_by='pytest', created=start + timedelta(days=day))
+    write_audits(dbsession)
+    return start
+
+def test_one_query_for_many_objects(dbsession, audits):
+    rows, queries = count_queries(
+        dbsession,
+        lambda dbsession: find_audit_history(dbsession, NodeAudit,
+                                             [900001, 900002, 900003]))
+
+    assert queries == 1
+    assert len(rows) == 15
+
+def test_limit_keeps_the_most_recent_rows(dbsession, audits):
+    rows = find_audit_history(dbsession, NodeAudit, [900001, 900002], limit=2)
+
+    assert [(row.object_id, row.new_value) for row in rows] == [
+        (900001, '4'),
+        (900001, '5'),
+        (900002, '4'),
+        (900002, '5'),
+    ]
+
+def test_time_bounds(dbsession, audits):
+    rows = find_audit_history(dbsession, NodeAudit, [900001],
+                              since=audits + timedelta(days=1),
+                              until=audits + timedelta(days=3))
+
+    assert [row.new_value for row in rows] == ['2', '3']
+
+def test_api_returns_every_object_in_order(testapp, audits):
+    resp = testapp.get('/api/bulk/audit/nodes?object_ids=900002,900001,42&limit=1')
+
+    results = resp.json['results']
+    assert [result['object_id'] for result in results] == [900002, 900001, 42]
+    assert [len(result['audit_history']) for result in results] == [1, 1, 0]
+
+def test_api_bad_requests(testapp):
+    assert testapp.get('/api/bulk/audit/nodes', expect_errors=True).status_int == 400
+    assert testapp.get('/api/bulk/audit/nodes?object_ids=a', expect_errors=True).status_int == 400
+    assert testapp.get('/api/bulk/audit/bogus?object_ids=1', expect_errors=True).status_int == 404
@@ -0,0 +1,38 @@
+import pytest
+
+from arsenalweb.models.nodes import Node
+
+from .helpers import seed_dimensions
+
+
+@pytest.fixture
+def node(app, dbsession, monkeypatch):
+    seed_dimensions(dbsession, 1, 1, 1, 1)
+    node = dbsession.query(Node).filter(Node.name == 'bench0000').one()
+    monkeypatch.setitem(app.registry.settings, 'arsenal.enc.status_ids',
+                        str(node.status_id))
+    return node
+
+@pytest.mark.parametrize('param_sources, expected', [
+    ('', False),
+    ('1', True),
+])
+def test_param_sources_matches_the_single_enc(testapp, node, param_sources,
+                                              expected):
+    '''An empty param_sources is false for /api/bulk/enc, as it is for
+    /api/enc.'''
+
+    resp = testapp.get('/api/enc', {'name': node.name,
+                                    'param_sources': param_sources})
+    assert ('param_sources' in resp.json['results']) == expected
+
+    resp = testapp.get('/api/bulk/enc', {'name': node.name,
+                                         'exact_get': '1',
+                                         'param_sources': param_sources})
+    assert resp.json['result_count'] == 1
+    assert ('param_sources' in resp.json['results'][0]) == expected
+
+def test_param_sources_alone_is_a_full_export(testapp, node):
+    resp = testapp.get('/api/bulk/enc', {'param_sources': ''})
+
+    assert node.name in [x['name'] for x in resp.json['results']]
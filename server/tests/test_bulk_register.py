@@ -0,0 +1,110 @@
+from datetime import datetime
+
+from pyramid.security import Allow
+import pytest
+
+from arsenalweb import RootFactory
+from arsenalweb.models.common import Group, User
+from arsenalweb.models.data_centers import DataCenter
+from arsenalweb.models.hardware_profiles import HardwareProfile, HardwareProfileAudit
+from arsenalweb.models.nodes import Node, NodeAudit
+from arsenalweb.models.operating_systems import OperatingSystem
+from arsenalweb.models.statuses import Status
+from arsenalweb.views.api import dimension_cache, enc_cache
+from arsenalweb.views.api.dimension_cache import DimensionCache
+from arsenalweb.views.api.enc_cache import EncCache
+
+from .helpers import registration_payload, seed_statuses
+
+DIMENSION_MODELS = dict((model.__tablename__, model) for model in
+                        [DataCenter, HardwareProfile, OperatingSystem, Status])
+
+@pytest.fixture
+def registrar(committed_testapp, committed_dbsession, monkeypatch):
+    '''committed_testapp with the api_register permission.'''
+
+    utcnow = datetime.utcnow()
+    group = Group(name='pytest_register', created=utcnow, updated=utcnow,
+                  updated_by='pytest')
+    user = committed_dbsession.query(User).filter(
+        User.name == 'pytest_committed').one()
+    user.groups.append(group)
+    seed_statuses(committed_dbsession)
+    committed_dbsession.commit()
+    monkeypatch.setattr(RootFactory, '__acl__', RootFactory.__acl__ + [
+        (Allow, 'group:pytest_register', ('api_register',))])
+
+    return committed_testapp
+
+@pytest.fixture
+def caches(monkeypatch):
+    caches = (EncCache(), DimensionCache())
+    monkeypatch.setattr(enc_cache, 'ENC_CACHE', caches[0])
+    monkeypatch.setattr(dimension_cache, 'DIMENSION_CACHE', caches[1])
+    return caches
+
+def bulk_register(testapp, payloads):
+    resp = testapp.put_json('/api/bulk/register', {'nodes': payloads})
+    return [(result['code'], result['result']) for result in resp.json['results']]
+
+def test_a_failed_payload_only_undoes_itself(registrar, committed_dbsession, caches):
+    '''A payload that fails midway through a bulk registration leaves no rows
+    behind, while the payloads before and after it are committed along with
+    their audits and cache invalidations.'''
+
+    names = ['pytest-a', 'pytest-b', 'pytest-c']
+    assert bulk_register(registrar, [registration_payload(name) for name in names]) == \
+        [(200, 'registered')] * 3
+
+    query = committed_dbsession.query(Node.name, Node.id)
+    node_ids = dict(query.filter(Node.name.in_(names)))
+    committed_dbsession.rollback()
+
+    enc, dimensions = caches
+    for name in names + ['pytest-other']:
+        enc.put(name, {'classes': []}, enc.generation, node_ids.get(name, 0),
+                data_center_id=None, node_group_ids=[])
+
+    failed = registration_payload('pytest-b', name='pytest-b-renamed')
+    failed['hardware_profile'] = dict(failed['hardware_profile'],
+                                      name='Pytest Failed Profile')
+    # Fails after the hardware_profile has been created.
+    failed['network_interfaces'] = [{'name': 'eth0'}]
+    payloads = [
+        registration_payload('pytest-a', name='pytest-a-renamed'),
+        failed,
+        registration_payload('pytest-c', name='pytest-c-renamed'),
+    ]
+    assert bulk_register(registrar, payloads) == \
+        [(200, 'registered'), (400, 'failed'), (200, 'registered')]
+
+    query = committed_dbsession.query(Node.id, Node.name)
+    query = query.filter(Node.id.in_(list(node_ids.values())))
+    assert sorted(query.all()) == sorted([
+        (node_ids['pytest-a'], 'pytest-a-renamed'),
+        (node_ids['pytest-b'], 'pytest-b'),
+        (node_ids['pytest-c'], 'pytest-c-renamed'),
+    ])
+
+    query = committed_dbsession.query(NodeAudit.object_id)
+    query = query.filter(NodeAudit.field == 'name',
+                         NodeAudit.new_value.like('%-renamed'))
+    assert sorted(query.all()) == sorted([(node_ids['pytest-a'],),
+                                          (node_ids['pytest-c'],)])
+
+    query = committed_dbsession.query(HardwareProfile.id)
+    assert not query.filter(HardwareProfile.name == 'Pytest Failed Profile').all()
+    query = committed_dbsession.query(HardwareProfileAudit.id)
+    assert not query.filter(HardwareProfileAudit.new_value == 'Pytest Failed Profile').all()
+
+    # The renamed nodes were invalidated once each, at the commit.
+    assert sorted(enc.entries) == ['pytest-b', 'pytest-other']
+    assert enc.stats['invalidations'] == 2
+
+    # Every id in the dimension cache was committed.
+    for table, entries in dimensions.entries.items():
+        model = DIMENSION_MODELS[table]
+        for name, (dimension, _) in entries.items():
+            query = committed_dbsession.query(model.id)
+            assert query.filter(model.name == name).scalar() == dimension.id
+    assert 'Pytest Failed Profile' not in dimensions.entries.get('hardware_profiles', {})
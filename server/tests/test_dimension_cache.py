@@ -0,0 +1,109 @@
+import pytest
+
+from arsenalweb.models.hardware_profiles import HardwareProfile
+from arsenalweb.views.api import dimension_cache
+from arsenalweb.views.api.dimension_cache import (
+    Dimension,
+    DimensionCache,
+    find_dimension_by_name,
+    queue_dimension_invalidation,
+)
+from arsenalweb.views.api.hardware_profiles import create_hardware_profile
+
+from .helpers import count_queries
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = DimensionCache()
+    monkeypatch.setattr(dimension_cache, 'DIMENSION_CACHE', cache)
+    return cache
+
+def create_profile(dbsession, name):
+    return create_hardware_profile(dbsession, name, 'pytest', 'pytest', 'pytest')
+
+def lookup(dbsession, name):
+    return find_dimension_by_name(dbsession, HardwareProfile, name)
+
+def cached_names(cache):
+    return sorted(cache.entries.get('hardware_profiles', {}))
+
+def test_lookups_hit_the_cache(committed_dbsession, cache):
+    profile = create_profile(committed_dbsession, 'pytest profile')
+    committed_dbsession.commit()
+
+    first, queries = count_queries(committed_dbsession,
+                                   lambda s: lookup(s, 'pytest profile'))
+    assert queries == 1
+    second, queries = count_queries(committed_dbsession,
+                                    lambda s: lookup(s, 'pytest profile'))
+    assert queries == 0
+    assert first == second == Dimension(profile.id, 'pytest profile')
+    assert (cache.stats['hits'], cache.stats['misses']) == (1, 1)
+
+def test_a_zero_ttl_disables_the_cache(committed_dbsession, cache):
+    cache.ttl = 0
+    create_profile(committed_dbsession, 'pytest profile')
+    committed_dbsession.commit()
+
+    lookup(committed_dbsession, 'pytest profile')
+
+    assert cached_names(cache) == []
+
+def test_invalidations_are_applied_on_commit(committed_dbsession, cache):
+    cache.put('hardware_profiles', 'pytest', Dimension(1, 'pytest'), cache.generation)
+    cache.put('statuses', 'pytest', Dimension(1, 'pytest'), cache.generation)
+
+    committed_dbsession.connection()
+    queue_dimension_invalidation(committed_dbsession, HardwareProfile)
+    assert cached_names(cache) == ['pytest']
+
+    committed_dbsession.commit()
+
+    assert cached_names(cache) == []
+    assert 'pytest' in cache.entries['statuses']
+    assert cache.stats['invalidations'] == 1
+
+def test_invalidations_are_discarded_on_rollback(committed_dbsession, cache):
+    cache.put('hardware_profiles', 'pytest', Dimension(1, 'pytest'), cache.generation)
+
+    committed_dbsession.connection()
+    queue_dimension_invalidation(committed_dbsession, HardwareProfile)
+    committed_dbsession.rollback()
+    committed_dbsession.commit()
+
+    assert cached_names(cache) == ['pytest']
+    assert cache.stats['invalidations'] == 0
+
+def test_lookups_are_not_cached_with_a_pending_change(committed_dbsession, cache):
+    create_profile(committed_dbsession, 'pytest profile')
+
+    lookup(committed_dbsession, 'pytest profile')
+
+    assert cached_names(cache) == []
+
+def test_savepoints_only_apply_at_the_outer_commit(committed_dbsession, cache):
+    '''Rows created in a savepoint aren't cached until the outer transaction
+    commits, and a rolled back savepoint only drops its own invalidations.'''
+
+    savepoint = committed_dbsession.begin_nested()
+    create_profile(committed_dbsession, 'pytest kept')
+    lookup(committed_dbsession, 'pytest kept')
+    savepoint.commit()
+
+    assert cached_names(cache) == []
+    assert cache.stats['invalidations'] == 0
+
+    savepoint = committed_dbsession.begin_nested()
+    create_profile(committed_dbsession, 'pytest dropped')
+    savepoint.rollback()
+
+    # The first savepoint's change is still pending.
+    lookup(committed_dbsession, 'pytest kept')
+    assert cached_names(cache) == []
+
+    committed_dbsession.commit()
+    assert cache.stats['invalidations'] == 1
+
+    lookup(committed_dbsession, 'pytest kept')
+    assert cached_names(cache) == ['pytest kept']
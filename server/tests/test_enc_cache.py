@@ -0,0 +1,78 @@
+import pytest
+
+from arsenalweb.views.api import enc_cache
+from arsenalweb.views.api.enc_cache import (
+    EncCache,
+    queue_enc_invalidation,
+)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = EncCache()
+    for node_id in [1, 2, 3]:
+        cache.put('node{0}'.format(node_id), {'classes': []}, cache.generation,
+                  node_id, data_center_id=node_id, node_group_ids=[node_id])
+    monkeypatch.setattr(enc_cache, 'ENC_CACHE', cache)
+    return cache
+
+def test_get_hits_and_misses(cache):
+    assert cache.get('node1', 60) == {'classes': []}
+    assert cache.get('node4', 60) is None
+    assert cache.get('node2', 0) is None
+
+    report = cache.report()
+    assert (report['hits'], report['misses'], report['expired']) == (1, 2, 1)
+    assert report['entries'] == 2
+
+def test_invalidation_drops_only_the_affected_entries(cache):
+    cache.invalidate(node_group_ids=[2], data_center_ids=[3])
+
+    assert sorted(cache.entries) == ['node1']
+
+def test_results_built_across_an_invalidation_are_not_cached(cache):
+    generation = cache.generation
+    cache.invalidate(node_ids=[1])
+    cache.put('node1', {'classes': []}, generation, 1, 1, [1])
+
+    assert 'node1' not in cache.entries
+
+def test_invalidations_are_applied_on_commit(committed_dbsession, cache):
+    committed_dbsession.connection()
+    queue_enc_invalidation(committed_dbsession, node_ids=[1])
+
+    assert 'node1' in cache.entries
+
+    committed_dbsession.commit()
+
+    assert sorted(cache.entries) == ['node2', 'node3']
+
+def test_invalidations_are_discarded_on_rollback(committed_dbsession, cache):
+    committed_dbsession.connection()
+    queue_enc_invalidation(committed_dbsession, node_ids=[1])
+    committed_dbsession.rollback()
+    committed_dbsession.commit()
+
+    assert sorted(cache.entries) == ['node1', 'node2', 'node3']
+    assert cache.stats['invalidations'] == 0
+
+def test_savepoints_only_apply_at_the_outer_commit(committed_dbsession, cache):
+    '''A released savepoint leaves its invalidations for the outer commit, a
+    rolled back one drops only its own.'''
+
+    savepoint = committed_dbsession.begin_nested()
+    queue_enc_invalidation(committed_dbsession, node_ids=[1])
+    savepoint.commit()
+
+    assert 'node1' in cache.entries
+
+    savepoint = committed_dbsession.begin_nested()
+    queue_enc_invalidation(committed_dbsession, node_ids=[2])
+    savepoint.rollback()
+
+    assert sorted(cache.entries) == ['node1', 'node2', 'node3']
+
+    committed_dbsession.commit()
+
+    assert sorted(cache.entries) == ['node2', 'node3']
+    assert cache.stats['invalidations'] == 1
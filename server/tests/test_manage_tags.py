@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import pytest
+
+from arsenalweb.models.common import tag_node_assignments
+from arsenalweb.models.nodes import Node, NodeAudit
+from arsenalweb.models.tags import Tag
+from arsenalweb.views.api.tags import (
+    create_tag,
+    manage_tags,
+)
+
+from .helpers import count_queries, seed_dimensions
+
+
+def node_tag_ids(dbsession, node_ids):
+    query = dbsession.query(tag_node_assignments.c.node_id,
+                            tag_node_assignments.c.tag_id)
+    query = query.filter(tag_node_assignments.c.node_id.in_(node_ids))
+    return sorted(query.all())
+
+@pytest.fixture
+def node_ids(dbsession):
+    seed_dimensions(dbsession, 1, 1, 200, 1)
+    return [node.id for node in dbsession.query(Node).order_by(Node.id)]
+
+@pytest.fixture
+def tags(dbsession):
+    return [create_tag(dbsession, 'pytest_env', value, 'pytest')['results'][0]
+            for value in ['dev', 'prod']]
+
+def test_put_replaces_same_key_tags(dbsession, node_ids, tags):
+    dev, prod = tags
+    manage_tags(dbsession, dev, 'nodes', node_ids[:50], 'PUT', 'pytest')
+
+    resp, queries = count_queries(
+        dbsession,
+        lambda dbsession: manage_tags(dbsession, prod, 'nodes', node_ids, 'PUT', 'pytest'))
+
+    assert resp.status_int == 200
+    assert len(resp.json['results'][0]['pytest_env=prod']) == len(node_ids)
+    # Load the nodes, load their pytest_env tags, delete the conflicts and
+    # insert the new assignments, however many nodes there are.
+    assert queries <= 5
+    assert node_tag_ids(dbsession, node_ids) == [(node_id, prod.id) for
+                                                 node_id in node_ids]
+
+    dbsession.flush()
+    deassigned = dbsession.query(NodeAudit).filter(
+        NodeAudit.old_value == 'pytest_env=dev').count()
+    assert deassigned == 50
+
+def test_put_is_idempotent(dbsession, node_ids, tags):
+    _, prod = tags
+    manage_tags(dbsession, prod, 'nodes', node_ids, 'PUT', 'pytest')
+    manage_tags(dbsession, prod, 'nodes', node_ids, 'PUT', 'pytest')
+
+    assert len(node_tag_ids(dbsession, node_ids)) == len(node_ids)
+
+def test_delete_only_removes_the_tag(dbsession, node_ids, tags):
+    dev, prod = tags
+    manage_tags(dbsession, dev, 'nodes', node_ids[:10], 'PUT', 'pytest')
+    manage_tags(dbsession, prod, 'nodes', node_ids[10:], 'PUT', 'pytest')
+
+    manage_tags(dbsession, prod, 'nodes', node_ids, 'DELETE', 'pytest')
+
+    assert node_tag_ids(dbsession, node_ids) == [(node_id, dev.id) for
+                                                 node_id in node_ids[:10]]
+
+def test_unknown_id_is_not_found(dbsession, node_ids, tags):
+    resp = manage_tags(dbsession, tags[0], 'nodes', node_ids + [0], 'PUT', 'pytest')
+
+    assert resp.status_int == 404
+    assert node_tag_ids(dbsession, node_ids) == []
+
+def test_api_put_is_committed(committed_testapp, committed_dbsession):
+    '''Nothing but Core statements run on the usual path. They must still be
+    committed at the end of the request.'''
+
+    seed_dimensions(committed_dbsession, 1, 1, 3, 1)
+    node_ids = [node.id for node in committed_dbsession.query(Node).filter(
+        Node.name.like('bench%'))]
+    tag = Tag(name='pytest_committed', value='yes', updated_by='pytest',
+              created=datetime.utcnow())
+    committed_dbsession.add(tag)
+    committed_dbsession.commit()
+    tag_id = tag.id
+
+    resp = committed_testapp.put_json('/api/tags/{0}/nodes'.format(tag_id),
+                                      {'nodes': node_ids})
+    assert resp.status_int == 200
+
+    committed_dbsession.rollback()
+    assert node_tag_ids(committed_dbsession, node_ids) == [
+        (node_id, tag_id) for node_id in sorted(node_ids)]
+    audits = committed_dbsession.query(NodeAudit).filter(
+        NodeAudit.new_value == 'pytest_committed=yes').count()
+    assert audits == len(node_ids)
@@ -0,0 +1,58 @@
+import pytest
+
+from arsenalweb.models.nodes import Node
+from arsenalweb.views.api.network_interfaces import (
+    get_node_net_if_ids,
+    net_ifs_to_node,
+)
+from arsenalweb.views.api.nodes import process_network_interfaces
+
+from .helpers import count_queries, seed_dimensions
+
+
+def make_interfaces(count, prefix='bench'):
+    return [{
+        'name': 'eth{0}'.format(i),
+        'unique_id': '{0}{1:012x}'.format(prefix, i),
+        'ip_address': '10.{0}.{1}.{2}'.format(len(prefix), i // 256, i % 256),
+        'mac_address': 'AA:BB:CC:DD:{0:02X}:{1:02X}'.format(i // 256, i % 256),
+    } for i in range(count)]
+
+def register_interfaces(node, interfaces):
+    def register(dbsession):
+        net_if_list = process_network_interfaces(dbsession, interfaces, 'pytest')
+        net_ifs_to_node(dbsession, net_if_list, node, 'SYNC', 'pytest')
+        return net_if_list
+    return register
+
+@pytest.fixture
+def node(dbsession):
+    seed_dimensions(dbsession, 1, 1, 1, 1)
+    return dbsession.query(Node).filter(Node.name == 'bench0000').one()
+
+@pytest.mark.parametrize('count', [2, 100])
+def test_register_interfaces_query_count_is_constant(dbsession, node, count):
+    '''Creating and then re-registering interfaces costs the same number of
+    queries however many interfaces the node has.'''
+
+    interfaces = make_interfaces(count)
+
+    net_if_list, created = count_queries(dbsession,
+                                         register_interfaces(node, interfaces))
+    assert len(net_if_list) == count
+    assert get_node_net_if_ids(dbsession, node.id) == set([x.id for x in net_if_list])
+
+    _, unchanged = count_queries(dbsession, register_interfaces(node, interfaces))
+
+    assert created <= 15
+    assert unchanged <= 4
+
+def test_register_interfaces_deassigns_missing(dbsession, node):
+    interfaces = make_interfaces(5)
+    register_interfaces(node, interfaces)(dbsession)
+
+    net_if_list = register_interfaces(node, interfaces[:2])(dbsession)
+
+    assert get_node_net_if_ids(dbsession, node.id) == set([x.id for x in net_if_list])
+    assert sorted([x.unique_id for x in node.network_interfaces]) == \
+        sorted([x['unique_id'] for x in interfaces[:2]])
@@ -0,0 +1,135 @@
+from datetime import datetime
+import json
+
+from pyramid.renderers import render
+from pyramid.testing import DummyRequest
+import pytest
+
+from arsenalweb.models.common import (
+    hypervisor_vm_assignments,
+    node_group_assignments,
+)
+from arsenalweb.models.node_groups import NodeGroup
+from arsenalweb.models.nodes import Node
+from arsenalweb.views.api.common import (
+    preload_relationships,
+    project_query,
+)
+from arsenalweb.views.api.network_interfaces import net_ifs_to_node
+from arsenalweb.views.api.nodes import process_network_interfaces
+from arsenalweb.views.api.tags import (
+    create_tag,
+    manage_tags,
+)
+
+from .helpers import count_queries, seed_dimensions
+
+FIELDS = [
+    'name',
+    'status,hardware_profile,operating_system',
+    'data_center,ec2_instance,physical_device',
+    'serial_number,uptime,processor_count,last_registered',
+    'node_groups,tags,network_interfaces',
+    'guest_vms',
+    'hypervisor',
+    'all',
+]
+
+
+@pytest.fixture
+def nodes(dbsession):
+    '''20 nodes with tags, node_groups, network_interfaces and one
+    hypervisor with two guest_vms.'''
+
+    seed_dimensions(dbsession, 2, 1, 20, 2)
+    nodes = dbsession.query(Node).filter(Node.name.like('bench%')).order_by(Node.id).all()
+    node_ids = [node.id for node in nodes]
+
+    for value, tagged in [('a', node_ids[::2]), ('b', node_ids[1::2])]:
+        tag = create_tag(dbsession, 'pytest_search', value, 'pytest')['results'][0]
+        manage_tags(dbsession, tag, 'nodes', tagged, 'PUT', 'pytest')
+
+    utcnow = datetime.utcnow()
+    node_group = NodeGroup(name='pytest_search', owner='pytest',
+                           description='pytest', created=utcnow,
+                           updated_by='pytest')
+    dbsession.add(node_group)
+    dbsession.flush()
+    dbsession.execute(node_group_assignments.insert(), [
+        {'node_id': node_id, 'node_group_id': node_group.id}
+        for node_id in node_ids[:10]])
+
+    dbsession.execute(hypervisor_vm_assignments.insert(), [
+        {'hypervisor_id': node_ids[0], 'guest_vm_id': node_id}
+        for node_id in node_ids[1:3]])
+
+    for index, node in enumerate(nodes[:5]):
+        net_if_list = process_network_interfaces(dbsession, [{
+            'name': 'eth0',
+            'unique_id': 'search{0:012x}'.format(index),
+            'ip_address': '10.99.0.{0}'.format(index + 1),
+            'mac_address': 'AA:BB:CC:DD:EE:{0:02X}'.format(index),
+        }], 'pytest')
+        net_ifs_to_node(dbsession, net_if_list, node, 'PUT', 'pytest')
+    dbsession.flush()
+
+    return node_ids
+
+def search(app, dbsession, node_ids, fields, project=False, preload=False):
+    '''Run a node search the way api_read_by_params() does, starting from an
+    empty identity map, and return the results as rendered by the API and the
+    number of queries it took.'''
+
+    dbsession.flush()
+    dbsession.expunge_all()
+    request = DummyRequest(params={'fields': fields})
+    request.registry = app.registry
+
+    def run(dbsession):
+        query = dbsession.query(Node).filter(Node.id.in_(node_ids))
+        if project:
+            query = project_query(query, 'Node', fields)
+        objs = query.order_by(Node.id).all()
+        if preload:
+            preload_relationships(dbsession, 'Node', objs, fields)
+        return json.loads(render('json', objs, request=request))
+
+    return count_queries(dbsession, run)
+
+@pytest.mark.parametrize('fields', FIELDS)
+def test_preloaded_relationships_match_the_lazy_ones(app, dbsession, nodes, fields):
+    lazy, _ = search(app, dbsession, nodes, fields)
+    preloaded, _ = search(app, dbsession, nodes, fields, preload=True)
+
+    assert preloaded == lazy
+
+def test_preloading_takes_a_constant_number_of_queries(app, dbsession, nodes):
+    fields = 'node_groups,tags,network_interfaces,guest_vms'
+
+    _, lazy_few = search(app, dbsession, nodes[:5], fields)
+    _, lazy_many = search(app, dbsession, nodes, fields)
+    _, preloaded_few = search(app, dbsession, nodes[:5], fields, preload=True)
+    _, preloaded_many = search(app, dbsession, nodes, fields, preload=True)
+
+    assert lazy_many > lazy_few
+    assert preloaded_many == preloaded_few
+    # The search, then one query per relationship, including hypervisor.
+    assert preloaded_many == 6
+
+@pytest.mark.parametrize('fields', FIELDS)
+def test_projection_returns_the_same_results(app, dbsession, nodes, fields):
+    full, _ = search(app, dbsession, nodes, fields, preload=True)
+    projected, _ = search(app, dbsession, nodes, fields, project=True, preload=True)
+
+    assert projected == full
+
+def test_projection_skips_unrequested_joins(app, dbsession, nodes):
+    projected, queries = search(app, dbsession, nodes, 'name', project=True)
+
+    assert queries == 1
+    assert sorted(projected[0]) == ['id', 'name', 'unique_id']
+
+    query = project_query(dbsession.query(Node), 'Node', 'name')
+    statement = str(query.statement.compile(dbsession.get_bind()))
+    assert 'JOIN' not in statement.upper()
+    assert 'serial_number' not in statement
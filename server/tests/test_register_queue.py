@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from arsenalweb.models.nodes import Node
+from arsenalweb.views.api import nodes
+from arsenalweb.views.api.register_queue import RegisterQueue
+
+from .helpers import registration_payload, seed_statuses
+
+
+@pytest.fixture
+def register_queue(tmp_path):
+    queue = RegisterQueue()
+    queue.enabled = True
+    queue.path = str(tmp_path / 'register_queue.sqlite')
+
+    yield queue
+
+    queue.stop()
+
+def wait_for(register_queue, condition):
+    for _ in range(50):
+        if condition(register_queue.report()):
+            break
+        time.sleep(0.1)
+    return register_queue.report()
+
+def test_enqueue_coalesces_by_unique_id(register_queue):
+    assert not register_queue.enqueue('abc', {'uptime': '1'}, 'pytest')
+    assert not register_queue.enqueue('def', {'uptime': '1'}, 'pytest')
+    assert register_queue.enqueue('abc', {'uptime': '2'}, 'pytest')
+
+    report = register_queue.report()
+    assert report['depth'] == 2
+    assert report['enqueued'] == 3
+    assert report['coalesced'] == 1
+
+    # abc keeps its place in the queue but carries the latest payload.
+    unique_id, payload, _, _, _ = register_queue.claim()
+    assert (unique_id, payload) == ('abc', {'uptime': '2'})
+    assert register_queue.claim()[0] == 'def'
+    assert register_queue.claim() is None
+    assert register_queue.report()['in_flight'] == 2
+
+def test_in_flight_registrations_are_not_claimed_twice(register_queue):
+    '''A node that registers again while it is being applied is applied
+    again afterwards, never by two workers at once.'''
+
+    register_queue.enqueue('abc', {'uptime': '1'}, 'pytest')
+    unique_id, _, _, _, updated = register_queue.claim()
+
+    assert register_queue.enqueue('abc', {'uptime': '2'}, 'pytest')
+    assert register_queue.claim() is None
+
+    register_queue.finish(unique_id, updated)
+
+    unique_id, payload, _, _, updated = register_queue.claim()
+    assert (unique_id, payload) == ('abc', {'uptime': '2'})
+
+    register_queue.finish(unique_id, updated)
+    assert register_queue.report()['depth'] == 0
+
+def test_claims_of_dead_workers_time_out(register_queue):
+    register_queue.enqueue('abc', {'uptime': '1'}, 'pytest')
+    assert register_queue.claim()[0] == 'abc'
+
+    register_queue.claim_timeout = -1
+
+    assert register_queue.claim()[0] == 'abc'
+
+def test_apply_failures_are_counted(register_queue):
+    '''A registration that fails to apply is dropped and counted.'''
+
+    def apply_func(dbsession, settings, payload, user_id):
+        raise ValueError('bad payload')
+
+    register_queue.enqueue('abc', {}, 'pytest')
+    register_queue.start(None, {}, apply_func)
+
+    report = wait_for(register_queue, lambda report: report['failed'])
+
+    assert report['failed'] == 1
+    assert report['applied'] == 0
+    assert report['depth'] == 0
+
+def test_stop_joins_the_workers(register_queue):
+    register_queue.start(None, {}, None)
+    threads = list(register_queue.threads)
+
+    register_queue.stop()
+
+    assert threads and not any(thread.is_alive() for thread in threads)
+    assert register_queue.report()['workers'] == 0
+
+def test_start_drains_a_queue_left_by_a_restart(app, committed_dbsession,
+                                                register_queue, monkeypatch):
+    '''Registrations already in the queue file are applied once the workers
+    are started at startup, without a new registration arriving.'''
+
+    seed_statuses(committed_dbsession)
+    committed_dbsession.commit()
+
+    payload = registration_payload('pytest-queued')
+    register_queue.enqueue(payload['unique_id'], payload, 'pytest')
+    monkeypatch.setattr(nodes, 'REGISTER_QUEUE', register_queue)
+
+    nodes.start_register_queue(app.registry)
+
+    report = wait_for(register_queue,
+                      lambda report: report['applied'] or report['failed'])
+
+    assert (report['applied'], report['failed'], report['depth']) == (1, 0, 0)
+    query = committed_dbsession.query(Node.name)
+    query = query.filter(Node.unique_id == payload['unique_id'])
+    assert query.all() == [('pytest-queued',)]
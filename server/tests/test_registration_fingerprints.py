@@ -0,0 +1,28 @@
+from arsenalweb.models.hardware_profiles import HardwareProfile
+from arsenalweb.models.nodes import Node
+from arsenalweb.views.api.common import (
+    clear_registration_fingerprints,
+    find_registered_node_ids,
+    )
+
+from .helpers import seed_dimensions
+
+
+def test_only_clears_the_nodes_of_the_deleted_object(dbsession):
+    seed_dimensions(dbsession, 1, 1, 2, 1)
+    nodes = dbsession.query(Node).filter(Node.name.like('bench%')).order_by(Node.id).all()
+    for node in nodes:
+        node.registration_fingerprint = 'pytest'
+    dbsession.flush()
+
+    profile = dbsession.query(HardwareProfile).filter(
+        HardwareProfile.id == nodes[0].hardware_profile_id).one()
+    node_ids = find_registered_node_ids(dbsession, 'HardwareProfile', profile)
+    assert node_ids == [nodes[0].id]
+
+    clear_registration_fingerprints(dbsession, node_ids)
+    dbsession.expire_all()
+    assert [node.registration_fingerprint for node in nodes] == [None, 'pytest']
+
+def test_other_types_are_ignored(dbsession):
+    assert find_registered_node_ids(dbsession, 'Tag', None) is None
@@ -0,0 +1,114 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from arsenalweb.models.common import Base
+from arsenalweb.views.api.reports import db
+from arsenalweb.views.api.reports.db import (
+    RowCountCache,
+    get_row_count_settings,
+    get_row_counts,
+)
+
+
+class DummySession(object):
+    def close(self):
+        pass
+
+@pytest.fixture
+def counter(monkeypatch):
+    '''Make count_rows() report how many times each table was counted.
+    Clearing the returned event holds counting up until it is set again.'''
+
+    counts = itertools.count(1)
+    gate = threading.Event()
+    gate.set()
+
+    def count_rows(dbsession, tables=None):
+        for my_table in tables or ['nodes', 'tags']:
+            gate.wait(5)
+            yield my_table, next(counts)
+
+    monkeypatch.setattr(db, 'count_rows', count_rows)
+    return gate
+
+def wait_for_refresh(cache):
+    for _ in range(50):
+        if not cache.refreshing:
+            break
+        time.sleep(0.1)
+
+def test_first_get_counts_in_the_foreground(counter):
+    cache = RowCountCache()
+
+    snapshot = cache.get(DummySession, 60)
+
+    assert dict((k, v[0]) for k, v in snapshot.items()) == {'nodes': 1, 'tags': 2}
+    assert not cache.refreshing
+
+def test_fresh_counts_are_served_from_the_snapshot(counter):
+    cache = RowCountCache()
+    first = cache.get(DummySession, 60)
+
+    assert cache.get(DummySession, 60) == first
+    assert not cache.refreshing
+
+def test_stale_counts_are_served_while_refreshing(counter):
+    cache = RowCountCache()
+    first = cache.get(DummySession, 60)
+    for my_table, (my_count, counted_at) in first.items():
+        cache.counts[my_table] = (my_count, counted_at - 60)
+
+    counter.clear()
+    stale = cache.get(DummySession, 60)
+    assert dict((k, v[0]) for k, v in stale.items()) == {'nodes': 1, 'tags': 2}
+    assert cache.refreshing
+
+    # Only one refresh runs at a time.
+    assert cache.get(DummySession, 60) == stale
+
+    refreshed_after = time.time()
+    counter.set()
+    wait_for_refresh(cache)
+    fresh = cache.snapshot()
+    assert dict((k, v[0]) for k, v in fresh.items()) == {'nodes': 3, 'tags': 4}
+    assert all(counted_at >= refreshed_after for _, counted_at in fresh.values())
+
+def test_row_count_settings():
+    assert get_row_count_settings({}) == ('cached', 300)
+    assert get_row_count_settings({
+        'arsenal.reports.db.row_counts': 'estimate',
+        'arsenal.reports.db.row_count_ttl': '30',
+    }) == ('estimate', 30)
+    assert get_row_count_settings({
+        'arsenal.reports.db.row_counts': '',
+        'arsenal.reports.db.row_count_ttl': 'soon',
+    }) == ('cached', 300)
+
+def test_exact_counts_are_current(dbsession):
+    row_counts, row_count_ages = get_row_counts(dbsession, None, 'exact', 60)
+
+    assert set(row_counts) == set(Base.metadata.tables)
+    assert set(row_count_ages.values()) == set([0])
+
+def test_cached_counts_come_from_the_snapshot(dbsession, counter, monkeypatch):
+    monkeypatch.setattr(db, 'ROW_COUNT_CACHE', RowCountCache())
+
+    row_counts, row_count_ages = get_row_counts(dbsession, DummySession,
+                                                'cached', 60)
+
+    assert row_counts == {'nodes': 1, 'tags': 2}
+    assert row_count_ages == {'nodes': 0, 'tags': 0}
+
+def test_estimates_fall_back_to_exact_counts(dbsession, monkeypatch):
+    '''Tables without an estimate are counted exactly.'''
+
+    monkeypatch.setattr(db, 'estimate_rows', lambda dbsession: {'nodes': 1000})
+
+    row_counts, row_count_ages = get_row_counts(dbsession, None, 'estimate', 60)
+
+    assert set(row_counts) == set(Base.metadata.tables)
+    assert (row_counts['nodes'], row_count_ages['nodes']) == (1000, None)
+    assert row_count_ages['tags'] == 0
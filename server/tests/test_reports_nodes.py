@@ -0,0 +1,55 @@
+import logging
+import time
+
+import pytest
+
+from arsenalweb.views.api.reports.nodes import build_node_metrics
+
+from .helpers import count_queries, seed_dimensions
+
+LOG = logging.getLogger(__name__)
+
+def test_node_metrics_counts(dbsession):
+    count = seed_dimensions(dbsession, 2, 3, 4, 2)
+
+    metrics = build_node_metrics(dbsession)
+
+    assert metrics['bench_dc_0']['count'] + metrics['bench_dc_1']['count'] == count
+    inservice = metrics['bench_dc_0']['inservice']
+    assert inservice['hardware_profile']['bench_profile_0']['count'] == 1
+    assert inservice['operating_system']['bench_os_0']['count'] == 1
+
+@pytest.mark.parametrize('dims', [
+    (1, 2, 5, 5),
+    (5, 5, 50, 25),
+    (10, 15, 200, 100),
+])
+def test_node_metrics_query_count_is_constant(dbsession, dims):
+    '''The number of queries stays the same however many dimensions there
+    are.'''
+
+    seed_dimensions(dbsession, *dims)
+
+    _, queries = count_queries(dbsession, build_node_metrics)
+
+    assert queries == 5
+
+@pytest.mark.benchmark
+def test_node_metrics_latency(dbsession):
+    '''Time the report on the largest seed. Building it with a query per
+    dimension combination took tens of thousands of queries here, so a
+    second is a generous ceiling.'''
+
+    seed_dimensions(dbsession, 10, 15, 200, 100)
+    build_node_metrics(dbsession)
+
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        build_node_metrics(dbsession)
+        timings.append(time.perf_counter() - start)
+    median = sorted(timings)[len(timings) // 2]
+
+    LOG.info('build_node_metrics median: %.1fms over %s runs',
+             median * 1000, len(timings))
+    assert median < 1.0
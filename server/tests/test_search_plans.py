@@ -0,0 +1,182 @@
+import pytest
+from sqlalchemy import event
+
+from arsenalweb import models
+from arsenalweb.views.api.audit_writer import (
+    add_audit,
+    write_audits,
+    )
+from arsenalweb.views.api.common import (
+    filter_regex,
+    filter_regex_multi_val,
+    parse_regex_literal,
+    )
+from arsenalweb.views.api.nodes import find_node_by_unique_id
+
+from .helpers import seed_dimensions
+
+
+def explain(dbsession, query):
+    '''Run EXPLAIN on a query and return the plan rows as dicts.'''
+
+    statement = query.statement.compile(dialect=dbsession.bind.dialect,
+                                        compile_kwargs={'literal_binds': True})
+    result = dbsession.execute('EXPLAIN {0}'.format(statement))
+    keys = list(result.keys())
+
+    return [dict(zip(keys, row)) for row in result]
+
+def plan_for(dbsession, query, table):
+    '''Return the EXPLAIN row for table.'''
+
+    for row in explain(dbsession, query):
+        if row['table'] == table:
+            return row
+    raise AssertionError('No plan row for table: {0}'.format(table))
+
+@pytest.fixture
+def mysql_dbsession(dbsession):
+    if dbsession.bind.dialect.name != 'mysql':
+        pytest.skip('EXPLAIN plans are only checked on MySQL/MariaDB')
+    return dbsession
+
+@pytest.mark.parametrize('val', [
+    '^web0001.docker$',
+    '^web0001',
+    '^web.*',
+])
+def test_node_name_search_uses_index(mysql_dbsession, val):
+    query = mysql_dbsession.query(models.Node)
+    query = filter_regex(query, 'Node', 'name', val)
+
+    row = plan_for(mysql_dbsession, query, 'nodes')
+    assert row['key'] == 'idx_node_name'
+
+def test_node_name_multi_exact_search_uses_index(mysql_dbsession):
+    query = mysql_dbsession.query(models.Node)
+    query = filter_regex_multi_val(query, 'Node', 'name',
+                                   '^web0001.docker$,^web0002.docker$')
+
+    row = plan_for(mysql_dbsession, query, 'nodes')
+    assert row['key'] == 'idx_node_name'
+
+def test_node_name_regex_falls_back_to_regexp(mysql_dbsession):
+    query = mysql_dbsession.query(models.Node)
+    query = filter_regex(query, 'Node', 'name', 'web00[0-9]+')
+
+    assert 'REGEXP' in str(query.statement.compile(dialect=mysql_dbsession.bind.dialect)).upper()
+
+@pytest.mark.parametrize('pattern,parsed', [
+    ('^web0001.docker$', ('web0001_docker', True, True, None)),
+    (r'^web0001\.docker$', ('web0001.docker', True, True, 'web0001.docker')),
+    ('.*web_1.*', (r'web\_1', False, False, 'web_1')),
+    ('^web', ('web', True, False, 'web')),
+    ('web.*db', None),
+    (r'web\d', None),
+])
+def test_parse_regex_literal(pattern, parsed):
+    assert parse_regex_literal(pattern) == parsed
+
+# Lookup tables small enough that a full scan is the right plan.
+SMALL_TABLES = [
+    'data_centers',
+    'group_perms',
+    'groups',
+    'hardware_profiles',
+    'operating_systems',
+    'statuses',
+    'users',
+]
+
+def capture_selects(dbsession, func):
+    '''Run func() and return the (statement, parameters) of every SELECT
+    with a WHERE clause it executed.'''
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith('SELECT') and ' WHERE ' in statement.upper():
+            statements.append((statement, parameters))
+
+    engine = dbsession.get_bind()
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return statements
+
+def full_scans(dbsession, statements):
+    '''EXPLAIN each statement and return the plan rows that scan a whole
+    table that isn't in SMALL_TABLES.'''
+
+    scans = []
+    conn = dbsession.connection()
+    for statement, parameters in statements:
+        result = conn.exec_driver_sql('EXPLAIN {0}'.format(statement), parameters)
+        keys = list(result.keys())
+        for row in result:
+            row = dict(zip(keys, row))
+            if row['type'] == 'ALL' and row['table'] not in SMALL_TABLES:
+                scans.append((statement, row))
+
+    return scans
+
+@pytest.fixture
+def seeded_dbsession(mysql_dbsession):
+    seed_dimensions(mysql_dbsession, 2, 2, 50, 2)
+    for node in mysql_dbsession.query(models.Node):
+        add_audit(mysql_dbsession, models.NodeAudit, object_id=node.id,
+                  field='pytest', old_value='a', new_value='b',
+                  updated_by='pytest')
+    write_audits(mysql_dbsession)
+    mysql_dbsession.execute('ANALYZE TABLE nodes, nodes_audit, tags')
+    return mysql_dbsession
+
+def test_node_unique_id_lookup_uses_index(seeded_dbsession):
+    query = seeded_dbsession.query(models.Node)
+    query = query.filter(models.Node.unique_id == 'bench0001')
+
+    row = plan_for(seeded_dbsession, query, 'nodes')
+    assert row['key'] == 'idx_node_unique_id'
+
+def test_audit_history_uses_index(seeded_dbsession):
+    query = seeded_dbsession.query(models.NodeAudit)
+    query = query.filter(models.NodeAudit.object_id == 1)
+
+    row = plan_for(seeded_dbsession, query, 'nodes_audit')
+    assert row['key'] == 'idx_nodes_audit_object_id'
+
+def test_tag_name_value_lookup_uses_index(seeded_dbsession):
+    query = seeded_dbsession.query(models.Tag)
+    query = query.filter(models.Tag.name == 'pytest')
+    query = query.filter(models.Tag.value == '1')
+
+    row = plan_for(seeded_dbsession, query, 'tags')
+    assert row['key'] == 'idx_tag_name_value'
+
+@pytest.mark.parametrize('url', [
+    '/api/nodes?unique_id=bench0001&exact_get=true',
+    '/api/nodes?name=bench0001&exact_get=true',
+    '/api/nodes_audit/1',
+    '/api/physical_devices?serial_number=abc123&exact_get=true',
+    '/api/reports/stale_nodes?hours_past=1&status=inservice',
+    '/api/tags?name=pytest&value=1&exact_get=true',
+])
+def test_api_queries_do_not_full_scan(seeded_dbsession, testapp, url):
+    '''Every query the view runs uses an index on anything but the small
+    lookup tables.'''
+
+    statements = capture_selects(seeded_dbsession,
+                                 lambda: testapp.get(url, expect_errors=True))
+
+    assert statements
+    assert full_scans(seeded_dbsession, statements) == []
+
+def test_find_node_by_unique_id_does_not_full_scan(seeded_dbsession):
+    statements = capture_selects(
+        seeded_dbsession,
+        lambda: find_node_by_unique_id(seeded_dbsession, 'bench0001'))
+
+    assert full_scans(seeded_dbsession, statements) == []
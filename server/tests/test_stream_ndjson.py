@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from arsenalweb.views.api import common
+
+from .helpers import seed_dimensions
+
+
+@pytest.fixture
+def nodes(committed_dbsession, monkeypatch):
+    # Several chunks, so the relationships of one chunk are loaded before the
+    # next chunk is read.
+    monkeypatch.setattr(common, 'STREAM_CHUNK_SIZE', 3)
+    count = seed_dimensions(committed_dbsession, 1, 1, 10, 1)
+    committed_dbsession.commit()
+    return count
+
+def stream(testapp, url):
+    resp = testapp.get(url)
+    assert resp.content_type == 'application/x-ndjson'
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+def test_stream_every_chunk(committed_testapp, nodes):
+    results = stream(committed_testapp,
+                     '/api/nodes?name=^bench&format=ndjson&fields=all')
+
+    assert [node['name'] for node in results] == [
+        'bench{0:04d}'.format(i) for i in range(nodes)]
+
+def test_stream_a_page(committed_testapp, nodes):
+    results = stream(committed_testapp,
+                     '/api/nodes?name=^bench&format=ndjson&perpage=4&start=2')
+
+    assert [node['name'] for node in results] == [
+        'bench{0:04d}'.format(i) for i in range(2, 6)]
@@ -1,4 +1,5 @@
 from arsenalweb import models
+from arsenalweb.views import get_nav_urls
 from arsenalweb.views.default import my_view
 from arsenalweb.views.notfound import notfound_view
 
@@ -21,3 +22,13 @@ def test_notfound_view(app_request):
     info = notfound_view(app_request)
     assert app_request.response.status_int == 404
     assert info == {}
+
+def test_get_nav_urls_without_total():
+    nav_urls = get_nav_urls('/nodes', 0, 50, None, {'name': 'web'},
+                            next_cursor='50')
+    assert 'nav_end' not in nav_urls
+    assert nav_urls['nav_next'] == '/nodes?start=50&after=50&name=web'
+    assert nav_urls['next_disable'] is False
+
+    nav_urls = get_nav_urls('/nodes', 50, 50, None, {})
+    assert nav_urls['next_disable'] is True